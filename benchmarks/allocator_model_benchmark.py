@@ -0,0 +1,62 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from opoly.modules.minizinc import LAMPORT_ALLOCATOR_PATH, LAMPORT_ALLOCATOR_INVERSE_PATH, INCLUDE_FOLDER_PATH
+
+MODELS = {
+    "determinant": LAMPORT_ALLOCATOR_PATH,
+    "inverse": LAMPORT_ALLOCATOR_INVERSE_PATH,
+}
+
+
+def flatten_model(model, n, solver, timeout, output_dir):
+    fzn_file = os.path.join(output_dir, f"{os.path.basename(model)}-{n}.fzn")
+    data = f"n={n};tau={[1] * n};"
+    start_time = time.perf_counter()
+    try:
+        subprocess.run(
+            ["minizinc", "--solver", solver, "-c", "-I", INCLUDE_FOLDER_PATH,
+             "-D", data, "--fzn", fzn_file, model],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, None
+    flatten_time = time.perf_counter() - start_time
+    with open(fzn_file) as f:
+        nconstraints = sum(1 for line in f if line.startswith("constraint"))
+    return flatten_time, (os.path.getsize(fzn_file), nconstraints)
+
+
+def run_allocator_model_benchmark(min_n, max_n, solver, timeout):
+    if shutil.which("minizinc") is None:
+        print("FAIL: the minizinc executable was not found")
+        return False
+    print(f"{'n':>3}" + "".join(f"{name:>36}" for name in MODELS))
+    with tempfile.TemporaryDirectory() as output_dir:
+        for n in range(min_n, max_n + 1):
+            row = f"{n:>3}"
+            for model in MODELS.values():
+                flatten_time, size = flatten_model(model, n, solver, timeout, output_dir)
+                if flatten_time is None:
+                    row += f"{'timeout':>36}"
+                else:
+                    row += f"{flatten_time:>10.3f} s {size[0]:>10} B {size[1]:>7} cons"
+            print(row, flush=True)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare flattening time and FlatZinc size of the allocator unimodularity encodings")
+    parser.add_argument("--min-n", type=int, default=2)
+    parser.add_argument("--max-n", type=int, default=8)
+    parser.add_argument("--solver", type=str, default="chuffed")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    ok = run_allocator_model_benchmark(args.min_n, args.max_n, args.solver, args.timeout)
+    sys.exit(0 if ok else 1)
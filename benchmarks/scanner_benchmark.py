@@ -0,0 +1,80 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from opoly.modules.compiler import Compiler
+from opoly.modules.scanner import FourierMotzkinScanner
+
+# Gauss-Seidel nests of increasing depth, the 1d sweep is a 2 deep nest
+BENCHMARKS = {
+    "gauss-seidel-1d": "benchmarks/pseudocode/gauss-seidel-1d.psc",
+    "gauss-seidel-2d": "benchmarks/pseudocode/gauss-seidel-2d.psc",
+    "gauss-seidel-3d": "benchmarks/pseudocode/gauss-seidel-3d.psc",
+}
+SKEWED_INDEXES = "ijkpqr"
+SKEWED_PARAMETERS = "NMLPQR"
+
+
+def skewed_nest(depth):
+    # Rectangular nest with the allocation of the scanner example 5a, whose
+    # eliminations leave many redundant bounds
+    code = "STM a" + "".join(f"[{i}]" for i in SKEWED_INDEXES[:depth]) + " = 0;"
+    for i, n in reversed(list(zip(SKEWED_INDEXES[:depth], SKEWED_PARAMETERS[:depth]))):
+        code = f"FOR {i} FROM 1 TO {n} {{ {code} }}"
+    allocation = np.eye(depth, dtype=int)
+    allocation[0, :] = 1
+    allocation[0, 0] = 2
+    allocation[1, 0] = 1
+    return code, allocation
+
+
+def measure(scanner, loop, allocation, niters):
+    times = []
+    for _ in range(niters):
+        start_time = time.perf_counter()
+        scanner.reindex(loop, allocation, separate_bounds=True)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+def min_max_calls(compiler, scanner, loop, allocation):
+    # fmax and fmin calls of the generated C code, one per redundant term
+    code = compiler.generator("CCODE").generate(scanner.reindex(loop, allocation, separate_bounds=True))
+    return code.count("fmax(") + code.count("fmin(")
+
+
+def run_scanner_benchmark(niters, max_depth):
+    # Only the scan is timed, the allocations of the Gauss-Seidel nests come
+    # from the default compiler. The scanner keeping the redundant bounds is
+    # the plain Fourier-Motzkin elimination.
+    compiler = Compiler()
+    scanners = [FourierMotzkinScanner(), FourierMotzkinScanner(keep_redundant=True)]
+    nests = []
+    for name, path in BENCHMARKS.items():
+        with open(path, "r") as f:
+            loop = compiler.parse(f.read())
+        nests.append((name, loop, compiler.compile_loop(loop).allocation))
+    for depth in range(3, max_depth + 1):
+        code, allocation = skewed_nest(depth)
+        nests.append((f"skewed-{depth}", compiler.parse(code), allocation))
+
+    print(f"{'loop':<18}{'depth':>6}{'scan':>14}{'redundant':>14}{'min/max':>10}{'redundant':>11}")
+    for name, loop, allocation in nests:
+        row = f"{name:<18}{allocation.shape[0]:>6}"
+        for scanner in scanners:
+            row += f"{measure(scanner, loop, allocation, niters) * 1e3:>11.2f} ms"
+        for scanner in scanners:
+            row += f"{min_max_calls(compiler, scanner, loop, allocation):>10}"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the Fourier-Motzkin scan by nest depth, with and without the redundant bounds")
+    parser.add_argument("--niters", type=int, default=20)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+
+    run_scanner_benchmark(args.niters, args.max_depth)
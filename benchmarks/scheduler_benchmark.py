@@ -0,0 +1,67 @@
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from opoly.modules.scheduler import LamportCPScheduler, LamportEnumerationScheduler
+
+# Dependency matrices of the scheduler tests
+DEPENDENCY_MATRICES = {
+    "2d_identity": [[1, 0]],
+    "2d_example1": [[1, 0], [0, 1]],
+    "2d_example2": [[1, -1], [1, 1], [0, 1]],
+    "3d_example4": [[1, 0, 0], [0, 1, 0], [0, 0, 1]],
+    "3d_example5": [[1, 0, 0], [1, -1, 0], [1, 1, 0], [0, 1, 0], [1, 0, -1], [1, 0, 1], [0, 0, 1]],
+}
+
+
+def measure(scheduler, deps, niters):
+    times = []
+    sched = None
+    for _ in range(niters):
+        start_time = time.perf_counter()
+        sched, err = scheduler.schedule(deps)
+        times.append(time.perf_counter() - start_time)
+        if sched is None:
+            return None, err
+    return statistics.median(times), sched
+
+
+def run_scheduler_benchmark(niters, cp_niters):
+    # The CP scheduler is only timed if MiniZinc is available
+    schedulers = [
+        ("enumeration", LamportEnumerationScheduler(), niters),
+        ("cp", LamportCPScheduler(), cp_niters)
+    ]
+    print(f"{'matrix':<14}" + "".join(f"{name:>16}" for name, _, _ in schedulers) + "  schedule")
+    ok = True
+    for name, deps in DEPENDENCY_MATRICES.items():
+        deps = np.array(deps)
+        row = f"{name:<14}"
+        schedules = []
+        for _, scheduler, n in schedulers:
+            median, sched = measure(scheduler, deps, n)
+            if median is None:
+                row += f"{'unavailable':>16}"
+                continue
+            row += f"{median * 1e6:>13.1f} us"
+            schedules.append(sched.tolist())
+        if any(s != schedules[0] for s in schedules):
+            ok = False
+        print(row + f"  {schedules}")
+    if not ok:
+        print("FAIL: the schedulers found different schedules")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the latency of the enumeration and CP schedulers on the test dependency matrices")
+    parser.add_argument("--niters", type=int, default=1000)
+    parser.add_argument("--cp-niters", type=int, default=5)
+    args = parser.parse_args()
+
+    ok = run_scheduler_benchmark(args.niters, args.cp_niters)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,80 @@
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+IMPORT_TIME_REGEX = re.compile(
+    r"^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<indent>\s+)(?P<module>\S+)\s*$")
+HEAVY_MODULES = ("numpy", "sympy", "pymzn")
+
+
+def measure_import_time(module):
+    run_res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    packages = set(m.strip().split(".")[0] for m in module.split(","))
+    total_us = 0
+    imported = set()
+    for line in run_res.stderr.splitlines():
+        match = IMPORT_TIME_REGEX.match(line)
+        if match is None:
+            continue
+        name = match.group("module")
+        imported.add(name)
+        # Top level entries of the package (and of its parent packages)
+        # already include the time of every nested import
+        is_top_level = len(match.group("indent")) == 1
+        if is_top_level and name.split(".")[0] in packages:
+            total_us += int(match.group("cumulative"))
+    return total_us, imported
+
+
+def median_import_time(module, niters):
+    times = []
+    imported = set()
+    for _ in range(niters):
+        print(".", end="", flush=True)
+        total_us, imported = measure_import_time(module)
+        times.append(total_us / 1000)
+    print("")
+    return statistics.median(times), min(times), max(times), imported
+
+
+def run_startup_benchmark(module, max_ratio, budget_ms, niters):
+    # The budget is relative to importing the heavy modules on the same
+    # machine and run, so that the check does not depend on its speed
+    baseline_ms, _, _, _ = median_import_time(", ".join(HEAVY_MODULES), niters)
+    median_ms, min_ms, max_ms, imported = median_import_time(module, niters)
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    ratio = median_ms / baseline_ms
+    print(f"{', '.join(HEAVY_MODULES)}: median import time {baseline_ms:.1f} ms")
+    print(f"{module}: median import time {median_ms:.1f} ms "
+          f"(min {min_ms:.1f} ms, max {max_ms:.1f} ms), {ratio:.2f} of the heavy modules, "
+          f"budget {max_ratio:.2f}")
+    ok = True
+    if ratio > max_ratio:
+        print(f"FAIL: import time exceeds {max_ratio:.2f} of the heavy modules import time")
+        ok = False
+    if budget_ms is not None and median_ms > budget_ms:
+        print(f"FAIL: import time exceeds the budget of {budget_ms:.1f} ms")
+        ok = False
+    if len(heavy) > 0:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that the opoly command line startup stays within an import time budget")
+    parser.add_argument("--module", type=str, default="opoly.scripts.opoly")
+    parser.add_argument("--max-ratio", type=float, default=0.5,
+                        help="the highest import time as a fraction of importing numpy, sympy and pymzn")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="also an absolute import time budget, for a known machine")
+    parser.add_argument("--niters", type=int, default=5)
+    args = parser.parse_args()
+
+    ok = run_startup_benchmark(args.module, args.max_ratio, args.budget_ms, args.niters)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1 @@
+__version__ = "0.1.3"
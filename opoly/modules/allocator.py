@@ -1,25 +1,207 @@
 from abc import ABC
-from datetime import timedelta
 
 import numpy as np
-import pymzn
 
-from opoly.modules.minizinc import LAMPORT_ALLOCATOR_PATH
-from opoly.modules.minizinc.utils import solve_model
+from opoly.modules.minizinc import (
+    LAMPORT_ALLOCATOR_PATH,
+    LAMPORT_ALLOCATOR_INVERSE_PATH,
+    LAMPORT_ALLOCATOR_BATCH_PATH
+)
+from opoly.modules.minizinc.utils import solve_model, scaled_timeout
+from opoly.modules.minizinc.portfolio import SolverPortfolio
+from opoly.modules.memo import LRUMemo, DEFAULT_MEMO_CAPACITY, matrix_key
+from opoly.modules.unimodular import vector_gcd, integer_determinant, unimodular_completion
+
+# The determinant of the Laplace expansion has n! terms, from this size on
+# the inverse matrix encoding is smaller and faster to flatten
+INVERSE_ENCODING_MIN_SIZE = 5
+UNIMODULARITY_ENCODINGS = ("auto", "determinant", "inverse")
 
 
 class LamportCPAllocator(ABC):
 
+    def __init__(self, unimodularity: str = "auto", portfolio: SolverPortfolio = None, timeout: int = None):
+        if unimodularity not in UNIMODULARITY_ENCODINGS:
+            raise ValueError(f"Unknown unimodularity encoding: {unimodularity}")
+        self._unimodularity = unimodularity
+        self._portfolio = portfolio
+        self._timeout = timeout
+
+    def timeout(self, size: int) -> int:
+        # Scaled with the size of the models when not fixed
+        return self._timeout if self._timeout is not None else scaled_timeout(size)
+
+    @property
+    def unimodularity(self) -> str:
+        return self._unimodularity
+
+    def model_path(self, n: int) -> str:
+        unimodularity = self._unimodularity
+        if unimodularity == "auto":
+            unimodularity = "inverse" if n >= INVERSE_ENCODING_MIN_SIZE else "determinant"
+        return LAMPORT_ALLOCATOR_INVERSE_PATH if unimodularity == "inverse" else LAMPORT_ALLOCATOR_PATH
+
     def allocate(self, schedule: np.ndarray) -> (np.ndarray, str):
         if len(schedule.shape) != 1:
             return None, "Schedule must be a one-dimensional vector!"
         sol, err = solve_model(
-            model=LAMPORT_ALLOCATOR_PATH,
+            model=self.model_path(schedule.shape[0]),
             data={
                 "n": schedule.shape[0],
-                "tau": schedule.tolist()
-            }
+                "tau": schedule.tolist(),
+                # Schedules with negative coefficients may need signed rows
+                "signed": bool(np.any(schedule < 0))
+            },
+            # The unimodularity constraints have n^3 products
+            timeout=self.timeout(schedule.shape[0] ** 3),
+            portfolio=self._portfolio
         )
         if sol is None:
             return None, err
-        return np.array(sol["T"]), None
+        return np.array(sol["T"]), err
+
+    def allocate_batch(self, schedules: list[np.ndarray]) -> list[tuple[np.ndarray, str]]:
+        # The instances are independent sub-problems of a single model, which
+        # always uses the inverse encoding since the padding is an identity
+        results = [None] * len(schedules)
+        batch = []
+        for i, schedule in enumerate(schedules):
+            if len(schedule.shape) == 1 and issubclass(schedule.dtype.type, np.integer):
+                batch.append(i)
+            else:
+                results[i] = self.allocate(schedule)
+        if len(batch) == 1:
+            results[batch[0]] = self.allocate(schedules[batch[0]])
+        elif len(batch) > 1:
+            sol, err = solve_model(
+                model=LAMPORT_ALLOCATOR_BATCH_PATH,
+                data=batch_data([schedules[i] for i in batch]),
+                timeout=self.timeout(sum(schedules[i].shape[0] ** 3 for i in batch)),
+                portfolio=self._portfolio
+            )
+            for b, i in enumerate(batch):
+                if sol is None:
+                    # A single unsatisfiable instance makes the whole batch
+                    # unsatisfiable, each one is solved alone to find it
+                    results[i] = self.allocate(schedules[i])
+                else:
+                    n = schedules[i].shape[0]
+                    results[i] = np.array([row[:n] for row in sol["T"][b][:n]]), err
+        return results
+
+
+def batch_data(schedules: list[np.ndarray]) -> dict:
+    # Schedule vectors padded with zeros to the longest one
+    max_n = max(1, max(schedule.shape[0] for schedule in schedules))
+    padded = np.zeros((len(schedules), max_n), dtype=np.int64)
+    for b, schedule in enumerate(schedules):
+        padded[b, :schedule.shape[0]] = schedule
+    return {
+        "k": len(schedules),
+        "n": [schedule.shape[0] for schedule in schedules],
+        "max_n": max_n,
+        "tau": padded.tolist(),
+        "signed": [bool(np.any(schedule < 0)) for schedule in schedules]
+    }
+
+
+class MemoizedAllocator(LamportCPAllocator):
+
+    def __init__(self, allocator: LamportCPAllocator = None, capacity: int = DEFAULT_MEMO_CAPACITY):
+        self._allocator = allocator if allocator is not None else LamportCPAllocator()
+        self._memo = LRUMemo(capacity)
+
+    @property
+    def memo(self) -> LRUMemo:
+        return self._memo
+
+    @property
+    def unimodularity(self) -> str:
+        return self._allocator.unimodularity
+
+    def timeout(self, size: int) -> int:
+        return self._allocator.timeout(size)
+
+    def model_path(self, n: int) -> str:
+        return self._allocator.model_path(n)
+
+    def allocate(self, schedule: np.ndarray) -> (np.ndarray, str):
+        if len(schedule.shape) != 1 or not issubclass(schedule.dtype.type, np.integer):
+            return self._allocator.allocate(schedule)
+        key = matrix_key(schedule)
+        found, allocation = self._memo.get(key)
+        if found:
+            return allocation.copy(), None
+        allocation, err = self._allocator.allocate(schedule)
+        # Allocations not proven optimal may improve with another try
+        if allocation is None or err is not None:
+            return allocation, err
+        self._memo.put(key, allocation.copy())
+        return allocation, None
+
+    def allocate_batch(self, schedules: list[np.ndarray]) -> list[tuple[np.ndarray, str]]:
+        results = [None] * len(schedules)
+        # Only the distinct schedules missing from the memo are solved
+        misses = {}
+        for i, schedule in enumerate(schedules):
+            if len(schedule.shape) != 1 or not issubclass(schedule.dtype.type, np.integer):
+                results[i] = self._allocator.allocate(schedule)
+                continue
+            key = matrix_key(schedule)
+            found, allocation = self._memo.get(key)
+            if found:
+                results[i] = allocation.copy(), None
+            else:
+                misses.setdefault(key, (schedule, []))[1].append(i)
+        solved = self._allocator.allocate_batch([schedule for schedule, _ in misses.values()])
+        for (key, (_, indexes)), (allocation, err) in zip(misses.items(), solved):
+            if allocation is not None and err is None:
+                self._memo.put(key, allocation.copy())
+            for i in indexes:
+                results[i] = (allocation.copy() if allocation is not None else None), err
+        return results
+
+
+class LamportUnimodularAllocator(LamportCPAllocator):
+
+    def __init__(
+        self,
+        fallback: LamportCPAllocator = None,
+        unimodularity: str = "auto",
+        portfolio: SolverPortfolio = None,
+        timeout: int = None
+    ):
+        super().__init__(unimodularity=unimodularity, portfolio=portfolio, timeout=timeout)
+        self._fallback = fallback if fallback is not None else LamportCPAllocator(
+            unimodularity=unimodularity, portfolio=portfolio, timeout=timeout)
+
+    def allocate(self, schedule: np.ndarray) -> (np.ndarray, str):
+        res = self._complete(schedule)
+        if res is None:
+            return self._fallback.allocate(schedule)
+        return res
+
+    def allocate_batch(self, schedules: list[np.ndarray]) -> list[tuple[np.ndarray, str]]:
+        results = [self._complete(schedule) for schedule in schedules]
+        # The schedules without a completion are solved together
+        pending = [i for i, res in enumerate(results) if res is None]
+        if len(pending) > 0:
+            solved = self._fallback.allocate_batch([schedules[i] for i in pending])
+            for i, res in zip(pending, solved):
+                results[i] = res
+        return results
+
+    def _complete(self, schedule: np.ndarray) -> (np.ndarray, str):
+        # Returns None when no completion is found
+        if len(schedule.shape) != 1:
+            return None, "Schedule must be a one-dimensional vector!"
+        if not issubclass(schedule.dtype.type, np.integer):
+            return None, "Schedule must be integers!"
+        tau = [int(v) for v in schedule]
+        # Every row of a unimodular matrix has coprime entries
+        if vector_gcd(tau) != 1:
+            return None, "Unsatisfiable!"
+        allocation = unimodular_completion(tau)
+        if allocation is None or abs(integer_determinant(allocation)) != 1:
+            return None
+        return np.array(allocation), None
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+
+import opoly
+from opoly.statements import ForLoopStatement, AssumptionStatement
+from opoly.modules.generator import PseudoCodeGenerator
+
+DEFAULT_CACHE_DIR = pathlib.Path(
+    os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache")) / "opoly"
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+CACHE_ENTRY_SUFFIX = ".json"
+# Bumped by every change of the generated code, so that the entries written
+# by an older revision of the same package version are not reused
+CODEGEN_REVISION = 5
+# A cache over its size is evicted down to this fraction of it, so that a
+# full cache is not scanned again by every following put
+CACHE_EVICTION_TARGET = 0.9
+
+
+def loop_cache_key(
+    loop: ForLoopStatement,
+    out_format: str,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False
+) -> str:
+    # The pseudocode rendering of the parsed loop is whitespace and
+    # formatting independent, so equivalent sources share the same key
+    normalized_loop = PseudoCodeGenerator().generate(loop)
+    payload = "\n".join([opoly.__version__, str(CODEGEN_REVISION), out_format, normalized_loop])
+    if parameters is not None:
+        # Ranked schedules depend on the representative parameter values
+        payload += "\n" + json.dumps([sorted(parameters.items()), schedule_tolerance])
+    if schedule_objective != "LATENCY":
+        payload += "\n" + schedule_objective
+    if signed_schedules:
+        payload += "\nsigned"
+    if assumptions:
+        # The ASSUME statements of the loop are already in its rendering
+        payload += "\n" + json.dumps([str(assumption) for assumption in assumptions])
+    if split_index_sets:
+        payload += "\nsplit"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompiledLoop():
+
+    def __init__(self,
+                 code: str,
+                 dependencies: list[list[int]] = None,
+                 schedule: list[int] = None,
+                 allocation: list[list[int]] = None
+                 ):
+        self._code = code
+        self._dependencies = dependencies
+        self._schedule = schedule
+        self._allocation = allocation
+
+    @property
+    def code(self) -> str:
+        return self._code
+
+    @property
+    def dependencies(self) -> list[list[int]]:
+        return self._dependencies
+
+    @property
+    def schedule(self) -> list[int]:
+        return self._schedule
+
+    @property
+    def allocation(self) -> list[list[int]]:
+        return self._allocation
+
+    def to_dict(self) -> dict:
+        return {
+            "code": self.code,
+            "dependencies": self.dependencies,
+            "schedule": self.schedule,
+            "allocation": self.allocation
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict) -> CompiledLoop:
+        return cls(
+            code=values["code"],
+            dependencies=values.get("dependencies"),
+            schedule=values.get("schedule"),
+            allocation=values.get("allocation")
+        )
+
+
+class CompilationCache():
+
+    def __init__(self,
+                 directory: pathlib.Path = DEFAULT_CACHE_DIR,
+                 max_size: int = DEFAULT_CACHE_SIZE
+                 ):
+        if max_size <= 0:
+            raise ValueError("Cache size must be positive!")
+        self._directory = pathlib.Path(directory)
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+        # Size of the entries as of the last scan plus the ones put since,
+        # None until the directory is first scanned
+        self._size = None
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return self._directory
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        return self.directory / (key + CACHE_ENTRY_SUFFIX)
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def __contains__(self, key: str) -> bool:
+        # Neither counted as a hit or miss nor refreshing the entry
+        return self._entry_path(key).is_file()
+
+    def get(self, key: str) -> CompiledLoop:
+        path = self._entry_path(key)
+        try:
+            with open(path, "r") as file:
+                entry = CompiledLoop.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError):
+            self._count(hit=False)
+            return None
+        # Entries modification times track the last access for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry
+
+    def put(self, key: str, entry: CompiledLoop):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=".tmp-", suffix=CACHE_ENTRY_SUFFIX)
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(entry.to_dict(), file)
+                file.flush()
+                size = os.fstat(file.fileno()).st_size
+            try:
+                size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            # Atomic on POSIX, concurrent readers see either the old or the new entry
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        # The directory is only scanned when the running size goes over the
+        # budget, which also accounts for the entries of concurrent builds
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            full = self._size is None or self._size > self.max_size
+        if full:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob("*" + CACHE_ENTRY_SUFFIX):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        if total_size > self.max_size:
+            target_size = self.max_size * CACHE_EVICTION_TARGET
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total_size <= target_size:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    # Already evicted by a concurrent build
+                    pass
+                total_size -= size
+        with self._lock:
+            self._size = total_size
+
+    def clear(self):
+        with self._lock:
+            self._size = None
+        for path in self.directory.glob("*" + CACHE_ENTRY_SUFFIX):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 
-from opoly.statements import Statement, ForLoopStatement, AssignmentStatement, divide_assignments, prune_expressions
+from opoly.statements import (
+    Statement, ForLoopStatement, AssignmentStatement, AssumptionStatement, divide_assignments, prune_expressions)
 from opoly.expressions import (
     Expression,
     ConstantExpression,
@@ -111,6 +112,20 @@ def has_same_simple_indexes(var1: VariableExpression, var2: VariableExpression)
             idx.name for idx in var2_indexes)
 
 
+def check_assumptions(loop: ForLoopStatement, assumptions: tuple[AssumptionStatement]) -> (bool, str):
+    # Assumptions constrain the parameters only, never the loop indexes
+    index_names = set(i.name for i in extract_loop_indexes(loop))
+    for assumption in assumptions:
+        variables = extract_variable_expressions(assumption.left_term) + \
+            extract_variable_expressions(assumption.right_term)
+        for var in variables:
+            if var.name in index_names:
+                return False, f"Assumption ({str(assumption)}) is on the loop index {var.name}!"
+            if not var.is_simple():
+                return False, f"Assumption ({str(assumption)}) is not on loop parameters!"
+    return True, None
+
+
 class ForLoopChecker(ABC):
 
     def __init__(self, **params):
@@ -179,4 +194,4 @@ class LamportForLoopChecker(ForLoopChecker):
                 for var2 in same_name_vars:
                     if not has_same_simple_indexes(var1, var2):
                         return False, f"Variable expressions ({str(var1)}) and ({str(var2)}) have the same name but different indexes order!"
-        return (True, None)
+        return check_assumptions(loop, loop.assumptions)
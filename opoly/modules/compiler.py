@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+from opoly.indexes import IndexSet
+from opoly.statements import Statement, ForLoopStatement, AssumptionStatement
+from opoly.modules.parser import ForLoopParser, PseudocodeForLoopParser
+from opoly.modules.checker import ForLoopChecker, LamportForLoopChecker, check_assumptions
+from opoly.modules.detector import LoopDependenciesDetector, LamportLoopDependenciesDetector
+from opoly.modules.generator import CodeGenerator, CCodeGenerator, PseudoCodeGenerator
+from opoly.modules.profiler import profile_stage, profile_count
+
+# numpy, sympy and pymzn are only imported when a loop with dependencies
+# has to be scheduled, to keep the command line startup fast
+if TYPE_CHECKING:
+    import numpy as np
+    from opoly.modules.reducer import DependenciesReducer
+    from opoly.modules.scheduler import LamportCPScheduler
+    from opoly.modules.allocator import LamportCPAllocator
+    from opoly.modules.scanner import FourierMotzkinScanner
+    from opoly.modules.ranker import WavefrontScheduleRanker
+    from opoly.modules.minizinc.portfolio import SolverPortfolio
+
+OUTPUT_FORMATS = ("CCODE", "PSEUDO")
+# LATENCY minimizes the sum of the schedule coefficients, WAVEFRONTS their
+# sum weighted by the extents of the loops, the number of wavefronts
+SCHEDULE_OBJECTIVES = ("LATENCY", "WAVEFRONTS")
+
+
+class CompilationError(Exception):
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self._stage = stage
+
+    @property
+    def stage(self) -> str:
+        return self._stage
+
+
+class CompilationResult():
+
+    def __init__(self,
+                 loop: ForLoopStatement,
+                 dependencies: tuple[IndexSet],
+                 dependency_matrix: np.ndarray,
+                 schedule: np.ndarray,
+                 allocation: np.ndarray,
+                 transformed_loop: Statement,
+                 code: str,
+                 out_format: str,
+                 optimal: bool = True
+                 ):
+        self._loop = loop
+        self._dependencies = dependencies
+        self._dependency_matrix = dependency_matrix
+        self._schedule = schedule
+        self._allocation = allocation
+        self._transformed_loop = transformed_loop
+        self._code = code
+        self._out_format = out_format
+        self._optimal = optimal
+
+    @property
+    def loop(self) -> ForLoopStatement:
+        return self._loop
+
+    @property
+    def dependencies(self) -> tuple[IndexSet]:
+        return self._dependencies
+
+    @property
+    def dependency_matrix(self) -> np.ndarray:
+        return self._dependency_matrix
+
+    @property
+    def schedule(self) -> np.ndarray:
+        return self._schedule
+
+    @property
+    def allocation(self) -> np.ndarray:
+        return self._allocation
+
+    @property
+    def transformed_loop(self) -> Statement:
+        return self._transformed_loop
+
+    @property
+    def code(self) -> str:
+        return self._code
+
+    @property
+    def out_format(self) -> str:
+        return self._out_format
+
+    @property
+    def optimal(self) -> bool:
+        # False when the schedule or allocation is only the best one found in time
+        return self._optimal
+
+
+class Compiler():
+
+    def __init__(self,
+                 parser: ForLoopParser = None,
+                 checker: ForLoopChecker = None,
+                 detector: LoopDependenciesDetector = None,
+                 reducer: DependenciesReducer = None,
+                 scheduler: LamportCPScheduler = None,
+                 allocator: LamportCPAllocator = None,
+                 scanner: FourierMotzkinScanner = None,
+                 out_format: str = "CCODE",
+                 parameters: dict[str, int] = None,
+                 schedule_tolerance: int = 0,
+                 ranker: WavefrontScheduleRanker = None,
+                 schedule_objective: str = "LATENCY",
+                 signed_schedules: bool = False,
+                 assumptions: tuple[AssumptionStatement] = None,
+                 split_index_sets: bool = False,
+                 portfolio: SolverPortfolio = None
+                 ):
+        if out_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {out_format}")
+        if schedule_objective not in SCHEDULE_OBJECTIVES:
+            raise ValueError(f"Unknown schedule objective: {schedule_objective}")
+        self._parser = parser if parser is not None else PseudocodeForLoopParser()
+        self._checker = checker if checker is not None else LamportForLoopChecker()
+        self._detector = detector if detector is not None else LamportLoopDependenciesDetector()
+        self._reducer = reducer
+        self._scheduler = scheduler
+        self._allocator = allocator
+        self._scanner = scanner
+        self._out_format = out_format
+        # Representative parameter values, the optimal schedules are ranked
+        # by their wavefronts for these values when given
+        self._parameters = parameters
+        self._schedule_tolerance = schedule_tolerance
+        self._ranker = ranker
+        self._schedule_objective = schedule_objective
+        # Negative schedule coefficients, for the default scheduler
+        self._signed_schedules = signed_schedules
+        # Facts on the parameters of every loop, besides the ASSUME
+        # statements of the loop itself, that simplify the scanned bounds
+        self._assumptions = tuple(assumptions) if assumptions is not None else ()
+        # Pieces of the loop around the innermost one, for the default scanner
+        self._split_index_sets = split_index_sets
+        # Solvers raced on the models of the default scheduler and allocator
+        self._portfolio = portfolio
+        self._generators = {
+            "CCODE": CCodeGenerator(),
+            "PSEUDO": PseudoCodeGenerator()
+        }
+        self._lock = threading.Lock()
+
+    # The solver backed stages are created on first use, a compiler that
+    # only sees loops without dependencies never imports them
+    @property
+    def reducer(self) -> DependenciesReducer:
+        if self._reducer is None:
+            with self._lock:
+                if self._reducer is None:
+                    from opoly.modules.reducer import LamportDependenciesReducer
+                    self._reducer = LamportDependenciesReducer()
+        return self._reducer
+
+    @property
+    def scheduler(self) -> LamportCPScheduler:
+        if self._scheduler is None:
+            with self._lock:
+                if self._scheduler is None:
+                    from opoly.modules.scheduler import (
+                        LamportCPScheduler,
+                        MemoizedScheduler,
+                        LamportEnumerationScheduler
+                    )
+                    fallback = LamportCPScheduler(self._portfolio, signed=self._signed_schedules)
+                    self._scheduler = MemoizedScheduler(
+                        LamportEnumerationScheduler(fallback=fallback, signed=self._signed_schedules))
+        return self._scheduler
+
+    @property
+    def allocator(self) -> LamportCPAllocator:
+        if self._allocator is None:
+            with self._lock:
+                if self._allocator is None:
+                    from opoly.modules.allocator import MemoizedAllocator, LamportUnimodularAllocator
+                    self._allocator = MemoizedAllocator(LamportUnimodularAllocator(portfolio=self._portfolio))
+        return self._allocator
+
+    @property
+    def scanner(self) -> FourierMotzkinScanner:
+        if self._scanner is None:
+            with self._lock:
+                if self._scanner is None:
+                    from opoly.modules.scanner import FourierMotzkinScanner
+                    self._scanner = FourierMotzkinScanner(split=self._split_index_sets)
+        return self._scanner
+
+    @property
+    def ranker(self) -> WavefrontScheduleRanker:
+        if self._ranker is None:
+            with self._lock:
+                if self._ranker is None:
+                    from opoly.modules.ranker import WavefrontScheduleRanker
+                    self._ranker = WavefrontScheduleRanker()
+        return self._ranker
+
+    @property
+    def out_format(self) -> str:
+        return self._out_format
+
+    @property
+    def parameters(self) -> dict[str, int]:
+        return self._parameters
+
+    @property
+    def schedule_tolerance(self) -> int:
+        return self._schedule_tolerance
+
+    @property
+    def schedule_objective(self) -> str:
+        return self._schedule_objective
+
+    @property
+    def signed_schedules(self) -> bool:
+        return self._signed_schedules
+
+    @property
+    def assumptions(self) -> tuple[AssumptionStatement]:
+        return self._assumptions
+
+    @property
+    def split_index_sets(self) -> bool:
+        return self._split_index_sets
+
+    @property
+    def portfolio(self) -> SolverPortfolio:
+        return self._portfolio
+
+    def generator(self, out_format: str = None) -> CodeGenerator:
+        out_format = out_format if out_format is not None else self._out_format
+        if out_format not in self._generators:
+            raise ValueError(f"Unknown output format: {out_format}")
+        return self._generators[out_format]
+
+    def parse(self, code: str) -> ForLoopStatement:
+        logger = logging.getLogger("logger_opoly")
+        logger.debug("Parsing code")
+        with profile_stage("parse"):
+            loop, err = self._parser.parse_for_loop(code)
+        if loop is None:
+            raise CompilationError("parse", "Error while parsing code: " + err)
+        return loop
+
+    def schedule_weights(self, loop: ForLoopStatement) -> np.ndarray:
+        # Weights of the schedule coefficients, None for the latency
+        if self._schedule_objective == "LATENCY":
+            return None
+        import numpy as np
+        from opoly.modules.extents import loop_extents
+        return np.array(loop_extents(loop, self._parameters))
+
+    def presolve(self, loops: list[ForLoopStatement]):
+        # Schedules and allocates many loops with one solver run per stage,
+        # the memoized solvers then answer their compilations from memory.
+        # Loops that fail are left for their compilation to report.
+        deps_list = []
+        weights_list = []
+        for loop in loops:
+            ok, _ = self._checker.check(loop)
+            if not ok:
+                continue
+            deps = list(self._detector.extract_dependencies(loop))
+            if len(deps) > 0:
+                import numpy as np
+                deps_list.append(self.reducer.reduce(np.array(list(list(d.converted_values) for d in deps))))
+                weights_list.append(self.schedule_weights(loop))
+        if len(deps_list) == 0:
+            return
+        schedules = self.scheduler.schedule_batch(deps_list, weights_list)
+        self.allocator.allocate_batch([schedule for schedule, _ in schedules if schedule is not None])
+
+    def choose_schedule(self, loop: ForLoopStatement, deps: np.ndarray, schedule: np.ndarray) -> np.ndarray:
+        logger = logging.getLogger("logger_opoly")
+        with profile_stage("rank"):
+            candidates = self.scheduler.candidates(deps, self._schedule_tolerance)
+            # The schedule of a weighted objective may have a higher latency
+            if not any((candidate == schedule).all() for candidate in candidates):
+                candidates = [schedule] + candidates
+            if len(candidates) <= 1:
+                return schedule
+            try:
+                ranking = self.ranker.rank(loop, self._parameters, candidates)
+            except ValueError as ex:
+                logger.warning(f"Schedules not ranked: {ex}")
+                return schedule
+        if ranking is None:
+            logger.warning("Schedules not ranked: too many iterations for the given parameters")
+            return schedule
+        profile_count("ranked_schedules", len(ranking))
+        logger.debug(f"Ranking of {len(ranking)} schedules on {self.ranker.threads} threads:")
+        for i, (candidate, score) in enumerate(ranking):
+            logger.debug(f"{i+1}. tau = {candidate.tolist()}: {score}")
+        return ranking[0][0]
+
+    def compile(self, code: str, out_format: str = None) -> CompilationResult:
+        return self.compile_loop(self.parse(code), out_format)
+
+    def compile_loop(self, loop: ForLoopStatement, out_format: str = None) -> CompilationResult:
+        logger = logging.getLogger("logger_opoly")
+        out_format = out_format if out_format is not None else self._out_format
+        generator = self.generator(out_format)
+
+        logger.debug("Checking code")
+        with profile_stage("check"):
+            ok, err = self._checker.check(loop)
+            if ok:
+                ok, err = check_assumptions(loop, self._assumptions)
+        if not ok:
+            raise CompilationError("check", "Error while checking code: " + err)
+
+        logger.debug("Detecting code dependencies")
+        with profile_stage("detect"):
+            deps = tuple(self._detector.extract_dependencies(loop))
+        profile_count("dependencies", len(deps))
+        deps_np = None
+        schedule = None
+        allocation = None
+        transformed_loop = loop
+        optimal = True
+        if len(deps) == 0:
+            logger.warning(
+                "No dependecies found in code. Skipping optimization")
+        else:
+            import numpy as np
+            deps_np = np.array(list(list(d.converted_values)
+                                    for d in deps))
+
+            logger.debug("Reducing dependencies")
+            with profile_stage("reduce"):
+                reduced_deps = self.reducer.reduce(deps_np)
+            removed = deps_np.shape[0] - reduced_deps.shape[0]
+            profile_count("removed_dependencies", removed)
+            logger.debug(f"Removed {removed} of {deps_np.shape[0]} dependencies implied by the others")
+
+            weights = self.schedule_weights(loop)
+            if weights is not None:
+                logger.debug(f"Weighting the schedule by the estimated loop extents {weights.tolist()}")
+            logger.debug("Scheduling loop")
+            with profile_stage("schedule"):
+                schedule, err = self.scheduler.schedule(reduced_deps, weights)
+            if schedule is None:
+                raise CompilationError("schedule", "Error while scheduling loop: " + err)
+            if err is not None:
+                logger.warning("Using the best schedule found in time: " + err)
+                optimal = False
+            if self._parameters is not None:
+                schedule = self.choose_schedule(loop, reduced_deps, schedule)
+
+            logger.debug("Allocating loop")
+            with profile_stage("allocate"):
+                allocation, err = self.allocator.allocate(schedule)
+            if allocation is None:
+                raise CompilationError("allocate", "Error while allocating loop: " + err)
+            if err is not None:
+                logger.warning("Using the best allocation found in time: " + err)
+                optimal = False
+
+            logger.debug("Reindexing loop")
+            with profile_stage("scan"):
+                # C loops declare the bounds of the inner loops once before
+                # them, whichever script compiles the loop
+                try:
+                    transformed_loop = self.scanner.reindex(
+                        loop, allocation, separate_bounds=out_format == "CCODE", assumptions=self._assumptions)
+                except ValueError as ex:
+                    raise CompilationError("scan", f"Error while scanning loop: {ex}")
+
+        logger.debug("Generating code")
+        with profile_stage("generate"):
+            code = generator.generate(transformed_loop)
+        return CompilationResult(
+            loop=loop,
+            dependencies=deps,
+            dependency_matrix=deps_np,
+            schedule=schedule,
+            allocation=allocation,
+            transformed_loop=transformed_loop,
+            code=code,
+            out_format=out_format,
+            optimal=optimal
+        )
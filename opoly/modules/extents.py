@@ -0,0 +1,45 @@
+from opoly.expressions import Expression
+from opoly.statements import ForLoopStatement
+from opoly.modules.checker import extract_loop_indexes, extract_loop_bounds, get_simple_variable_sum_and_constant
+
+# Value assumed for the parameters whose value is not given
+DEFAULT_PARAMETER_VALUE = 100
+
+
+def bound_estimate(
+    bound: Expression,
+    index_ranges: dict[str, tuple[float, float]],
+    parameters: dict[str, int],
+    default_value: int
+) -> float:
+    # A bound on an outer index takes the middle of its range, the mean
+    # value of the bound over the iterations of the outer loop
+    if bound.is_constant():
+        return bound.value
+    if bound.is_variable():
+        var, const = bound, 0
+    else:
+        var, const = get_simple_variable_sum_and_constant(bound)
+        const = const.value
+    if var.name in index_ranges:
+        lower, upper = index_ranges[var.name]
+        return (lower + upper) / 2 + const
+    return parameters.get(var.name, default_value) + const
+
+
+def loop_extents(
+    loop: ForLoopStatement,
+    parameters: dict[str, int] = None,
+    default_value: int = DEFAULT_PARAMETER_VALUE
+) -> list[int]:
+    # Estimated number of iterations of every loop of the nest, from the
+    # given parameter values or <default_value> for the missing ones
+    parameters = parameters if parameters is not None else {}
+    index_ranges = {}
+    extents = []
+    for index, (lower, upper) in zip(extract_loop_indexes(loop), extract_loop_bounds(loop)):
+        lower_value = bound_estimate(lower, index_ranges, parameters, default_value)
+        upper_value = bound_estimate(upper, index_ranges, parameters, default_value)
+        index_ranges[index.name] = (lower_value, upper_value)
+        extents.append(max(1, round(upper_value - lower_value + 1)))
+    return extents
@@ -0,0 +1,209 @@
+from fractions import Fraction
+
+import numpy as np
+
+from opoly.modules.profiler import profile_count
+
+# Coefficients above this magnitude are combined as python integers, the
+# products of two of them could overflow the int64 of numpy
+MAX_INT64_COEFFICIENT = 2**31
+
+
+def as_exact(system: np.ndarray) -> np.ndarray:
+    # int64 rows while every combination of two rows fits, python integers
+    # in an object array otherwise
+    if system.size == 0 or int(np.abs(system).max()) < MAX_INT64_COEFFICIENT:
+        return system.astype(np.int64)
+    return system.astype(object)
+
+
+def normalize_rows(system: np.ndarray) -> np.ndarray:
+    # Divides every row by the gcd of its coefficients, a positive multiple
+    # of an inequality has the same solutions
+    if system.shape[0] == 0:
+        return system
+    gcds = np.gcd.reduce(np.abs(system), axis=1)
+    gcds[gcds == 0] = 1
+    return as_exact(system // gcds[:, None])
+
+
+def eliminate(
+    system: np.ndarray,
+    histories: np.ndarray,
+    column: int,
+    n_indexes: int = None
+) -> (np.ndarray, np.ndarray):
+    # Fourier-Motzkin elimination of the variable of <column> from the rows
+    # of system·(x, p, 1) >= 0: the rows without the variable are kept and
+    # every lower bound row is combined with every upper bound row. The
+    # history of a row marks the original rows it combines. With
+    # <n_indexes>, the combinations left without indexes, among the first
+    # <n_indexes> columns, only constrain the parameters and are dropped.
+    coefficients = system[:, column]
+    lowers = coefficients > 0
+    uppers = coefficients < 0
+    combined = (
+        (-system[uppers, column])[None, :, None] * system[lowers][:, None, :]
+        + system[lowers, column][:, None, None] * system[uppers][None, :, :]
+    ).reshape(-1, system.shape[1])
+    combined_histories = (
+        histories[lowers][:, None, :] | histories[uppers][None, :, :]
+    ).reshape(-1, histories.shape[1])
+    if n_indexes is not None:
+        with_indexes = np.any(combined[:, :n_indexes] != 0, axis=1)
+        combined = combined[with_indexes]
+        combined_histories = combined_histories[with_indexes]
+    kept = coefficients == 0
+    return (
+        normalize_rows(np.vstack([system[kept], combined])),
+        np.vstack([histories[kept], combined_histories])
+    )
+
+
+def remove_dominated(
+    system: np.ndarray,
+    histories: np.ndarray,
+    eliminated: int
+) -> (np.ndarray, np.ndarray):
+    # Rows combining more than <eliminated> + 1 original rows are implied by
+    # the others (Chernikov's rule), and of the rows with the same variable
+    # coefficients only the one with the smallest constant is needed
+    keep = histories.sum(axis=1) <= eliminated + 1
+    tightest = {}
+    for k in np.flatnonzero(keep):
+        coefficients = tuple(system[k, :-1])
+        if coefficients in tightest and system[tightest[coefficients], -1] <= system[k, -1]:
+            keep[k] = False
+            continue
+        if coefficients in tightest:
+            keep[tightest[coefficients]] = False
+        tightest[coefficients] = k
+    return system[keep], histories[keep]
+
+
+def is_feasible(system: np.ndarray) -> bool:
+    # Whether system·(y, 1) >= 0 has a rational solution, eliminating every
+    # variable, the one with the fewest combinations first
+    system = normalize_rows(as_exact(system))
+    histories = np.eye(system.shape[0], dtype=bool)
+    eliminated = 0
+    while True:
+        variables = system[:, :-1]
+        used = np.flatnonzero(np.any(variables != 0, axis=0))
+        if len(used) == 0:
+            return bool(np.all(system[:, -1] >= 0))
+        combinations = [np.sum(variables[:, c] > 0) * np.sum(variables[:, c] < 0) for c in used]
+        system, histories = eliminate(system, histories, used[np.argmin(combinations)])
+        eliminated += 1
+        system, histories = remove_dominated(system, histories, eliminated)
+
+
+def is_implied(system: np.ndarray, row: np.ndarray) -> bool:
+    # Whether system·(y, 1) >= 0 implies row·(y, 1) >= 0 over the rationals,
+    # that is whether system·(y, t) >= 0, t >= 1 and -row·(y, t) >= 1 are
+    # infeasible: scaled by t, the strict row·(y, 1) < 0 is a plain inequality
+    n_columns = system.shape[1]
+    extended = np.zeros((system.shape[0] + 2, n_columns + 1), dtype=object)
+    extended[:-2, :n_columns] = system
+    extended[-2, n_columns - 1:] = [1, -1]
+    extended[-1, :n_columns] = -row
+    extended[-1, n_columns] = -1
+    return not is_feasible(extended)
+
+
+def remove_redundant(
+    system: np.ndarray,
+    histories: np.ndarray,
+    eliminated: int
+) -> (np.ndarray, np.ndarray):
+    # The rows left by the syntactic checks are removed one at a time when
+    # the other rows imply them, an exact check of the same polyhedron. By
+    # Farkas' lemma the only row bounding a variable from one side is never
+    # implied by the others, its check is skipped.
+    system, histories = remove_dominated(system, histories, eliminated)
+    signs = np.sign(system[:, :-1]).astype(np.int64)
+    lowers = np.sum(signs > 0, axis=0)
+    uppers = np.sum(signs < 0, axis=0)
+    keep = np.ones(system.shape[0], dtype=bool)
+    for k in range(system.shape[0]):
+        if np.any((signs[k] > 0) & (lowers == 1)) or np.any((signs[k] < 0) & (uppers == 1)):
+            continue
+        keep[k] = False
+        if not is_implied(system[keep], system[k]):
+            keep[k] = True
+    return system[keep], histories[keep]
+
+
+def remove_implied_bounds(system: np.ndarray, column: int, context: np.ndarray) -> np.ndarray:
+    # Rows bounding the variable of <column> without the ones implied by the
+    # others and by the <context> rows, which the outer loops and the
+    # parameters already satisfy
+    bounds = system[system[:, column] != 0]
+    signs = np.sign(bounds[:, column]).astype(np.int64)
+    keep = np.ones(bounds.shape[0], dtype=bool)
+    for k in range(bounds.shape[0]):
+        if np.sum(signs == signs[k]) == 1:
+            continue
+        keep[k] = False
+        if not is_implied(np.vstack([bounds[keep], context]), bounds[k]):
+            keep[k] = True
+    return bounds[keep]
+
+
+def variable_bounds(
+    system: np.ndarray,
+    column: int
+) -> (list[tuple[Fraction, ...]], list[tuple[Fraction, ...]]):
+    # Lower and upper bounds of the variable of <column> as the coefficients
+    # of all the columns, a·x + r >= 0 is x >= -r/a for a > 0 and x <= -r/a
+    # for a < 0, the coefficient of the variable itself is zero
+    lower_bounds = []
+    upper_bounds = []
+    for row in system:
+        a = int(row[column])
+        if a == 0:
+            continue
+        bound = tuple(Fraction(-int(c), a) if k != column else Fraction(0) for k, c in enumerate(row))
+        if a > 0:
+            lower_bounds.append(bound)
+        else:
+            upper_bounds.append(bound)
+    return lower_bounds, upper_bounds
+
+
+def fourier_motzkin_bounds(
+    system: np.ndarray,
+    n_indexes: int,
+    last_index: int = 0,
+    keep_redundant: bool = False
+) -> dict[int, (list[tuple[Fraction, ...]], list[tuple[Fraction, ...]])]:
+    # Bounds of the indexes from the last one to <last_index>, each one in
+    # terms of the outer indexes and of the parameters, for the system of
+    # integer inequalities system·(x, p, 1) >= 0 with the <n_indexes>
+    # indexes x in its first columns. The redundant rows are removed after
+    # every elimination, and the bounds implied by the constraints of the
+    # outer loops and of the parameters are dropped, unless <keep_redundant>.
+    system = normalize_rows(as_exact(np.asarray(system)))
+    histories = np.eye(system.shape[0], dtype=bool)
+    levels = []
+    for eliminated, column in enumerate(range(n_indexes - 1, last_index - 1, -1)):
+        if eliminated > 0:
+            system, histories = eliminate(system, histories, column + 1, n_indexes)
+            profile_count("fm_eliminations")
+        if not keep_redundant:
+            rows = system.shape[0]
+            system, histories = remove_redundant(system, histories, eliminated)
+            profile_count("fm_redundant", rows - system.shape[0])
+        profile_count("fm_inequalities", system.shape[0])
+        levels.append((column, system))
+    bounds = {}
+    for k, (column, system) in enumerate(levels):
+        if not keep_redundant:
+            # The system of the next outer loop is the projection of this
+            # one, the outermost loop only has the rows without its index
+            context = levels[k + 1][1] if k + 1 < len(levels) else system[system[:, column] == 0]
+            rows = np.count_nonzero(system[:, column])
+            system = remove_implied_bounds(system, column, context)
+            profile_count("fm_redundant", rows - system.shape[0])
+        bounds[column] = variable_bounds(system, column)
+    return bounds
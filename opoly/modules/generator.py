@@ -1,6 +1,14 @@
 from abc import ABC, abstractmethod
 
-from opoly.statements import Statement, StatementType, ForLoopStatement, DeclarationStatement, AssignmentStatement
+from opoly.statements import (
+    Statement,
+    StatementType,
+    ForLoopStatement,
+    DeclarationStatement,
+    AssignmentStatement,
+    AssumptionStatement,
+    BlockStatement
+)
 
 
 class CodeGenerator(ABC):
@@ -15,10 +23,11 @@ class PseudoCodeGenerator(CodeGenerator):
     INDENTATION_SPACES = " " * 4
 
     def generate_for_loop(self, stmt: ForLoopStatement, level=0) -> str:
+        assumptions = "".join(self.generate_assumption(a, level=level) + "\n" for a in stmt.assumptions)
         conc = f" CONC" if stmt._is_parallel else ""
         head = f"FOR{conc} {stmt.index} FROM {stmt.lowerbound} TO {stmt.upperbound} STEP {stmt.step} " + "{\n"
         body = f"\n".join([self.generate(t, level=level+1) for t in stmt.body])
-        return (self.INDENTATION_SPACES * level) + head + body + "\n" + (self.INDENTATION_SPACES * level) + "}"
+        return assumptions + (self.INDENTATION_SPACES * level) + head + body + "\n" + (self.INDENTATION_SPACES * level) + "}"
 
     def generate_declaration(self, stmt: DeclarationStatement, level=0) -> str:
         head = f"VAR {stmt.variable}"
@@ -28,6 +37,12 @@ class PseudoCodeGenerator(CodeGenerator):
     def generate_assignment(self, stmt: AssignmentStatement, level=0) -> str:
         return (self.INDENTATION_SPACES * level) + f"STM {stmt.left_term} = {stmt.right_term};"
 
+    def generate_assumption(self, stmt: AssumptionStatement, level=0) -> str:
+        return (self.INDENTATION_SPACES * level) + f"ASSUME {stmt};"
+
+    def generate_block(self, stmt: BlockStatement, level=0) -> str:
+        return "\n".join([self.generate(t, level=level) for t in stmt.body])
+
     def generate(self, stmt: Statement, level=0) -> str:
         if stmt.stype == StatementType.FOR_LOOP:
             return self.generate_for_loop(stmt, level=level)
@@ -35,6 +50,10 @@ class PseudoCodeGenerator(CodeGenerator):
             return self.generate_declaration(stmt, level=level)
         if stmt.stype == StatementType.ASSIGNMENT:
             return self.generate_assignment(stmt, level=level)
+        if stmt.stype == StatementType.ASSUMPTION:
+            return self.generate_assumption(stmt, level=level)
+        if stmt.stype == StatementType.BLOCK:
+            return self.generate_block(stmt, level=level)
         return None
 
 class CCodeGenerator(CodeGenerator):
@@ -42,11 +61,13 @@ class CCodeGenerator(CodeGenerator):
     INDENTATION_SPACES = " " * 4
 
     def generate_for_loop(self, stmt: ForLoopStatement, level=0) -> str:
+        # The loop bounds are only valid for the assumed parameter values
+        assumptions = "".join(self.generate_assumption(a, level=level) + "\n" for a in stmt.assumptions)
         omp_directive = (self.INDENTATION_SPACES * level) + "#pragma omp parallel for\n" if stmt.is_parallel else ""
         step = f"{stmt.index}++" if stmt.step.is_constant() and stmt.step.value == 1 else f"{stmt.index} += {stmt.step}"
         head = (self.INDENTATION_SPACES * level) + f"for(int {stmt.index} = {stmt.lowerbound}; {stmt.index} <= {stmt.upperbound}; {step}) " + "{\n"
         body = f"\n".join([self.generate(t, level=level+1) for t in stmt.body])
-        return omp_directive + head + body + "\n" + (self.INDENTATION_SPACES * level) + "}"
+        return assumptions + omp_directive + head + body + "\n" + (self.INDENTATION_SPACES * level) + "}"
 
     def generate_declaration(self, stmt: DeclarationStatement, level=0) -> str:
         head = f"{stmt.var_type} {stmt.variable}"
@@ -56,6 +77,12 @@ class CCodeGenerator(CodeGenerator):
     def generate_assignment(self, stmt: AssignmentStatement, level=0) -> str:
         return (self.INDENTATION_SPACES * level) + f"{stmt.left_term} = {stmt.right_term};"
 
+    def generate_assumption(self, stmt: AssumptionStatement, level=0) -> str:
+        return (self.INDENTATION_SPACES * level) + f"// assume {stmt}"
+
+    def generate_block(self, stmt: BlockStatement, level=0) -> str:
+        return "\n".join([self.generate(t, level=level) for t in stmt.body])
+
     def generate(self, stmt: Statement, level=0) -> str:
         if stmt.stype == StatementType.FOR_LOOP:
             return self.generate_for_loop(stmt, level=level)
@@ -63,4 +90,8 @@ class CCodeGenerator(CodeGenerator):
             return self.generate_declaration(stmt, level=level)
         if stmt.stype == StatementType.ASSIGNMENT:
             return self.generate_assignment(stmt, level=level)
+        if stmt.stype == StatementType.ASSUMPTION:
+            return self.generate_assumption(stmt, level=level)
+        if stmt.stype == StatementType.BLOCK:
+            return self.generate_block(stmt, level=level)
         return None
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+DEFAULT_MEMO_CAPACITY = 1024
+
+
+def canonical_dependencies(deps: np.ndarray) -> np.ndarray:
+    # Schedules only depend on the set of dependency vectors,
+    # so rows are deduplicated and lexicographically sorted
+    return np.unique(deps.astype(np.int64), axis=0)
+
+
+def matrix_key(mat: np.ndarray) -> tuple:
+    mat = np.ascontiguousarray(mat, dtype=np.int64)
+    return (mat.shape, mat.tobytes())
+
+
+class LRUMemo():
+
+    def __init__(self, capacity: int = DEFAULT_MEMO_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("Memo capacity must be positive!")
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total > 0 else 0.0
+
+    def get(self, key) -> (bool, object):
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
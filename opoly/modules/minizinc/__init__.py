@@ -1,4 +1,8 @@
-from pkg_resources import resource_filename, resource_dir
-LAMPORT_SCHEDULER_PATH = resource_filename(__name__, "models/lamport_scheduler.mzn")
-LAMPORT_ALLOCATOR_PATH = resource_filename(__name__, "models/lamport_allocator.mzn")
-INCLUDE_FOLDER_PATH = resource_filename(__name__, "libraries/")
\ No newline at end of file
+from importlib.resources import files
+
+LAMPORT_SCHEDULER_PATH = str(files(__name__) / "models" / "lamport_scheduler.mzn")
+LAMPORT_SCHEDULER_BATCH_PATH = str(files(__name__) / "models" / "lamport_scheduler_batch.mzn")
+LAMPORT_ALLOCATOR_PATH = str(files(__name__) / "models" / "lamport_allocator.mzn")
+LAMPORT_ALLOCATOR_INVERSE_PATH = str(files(__name__) / "models" / "lamport_allocator_inverse.mzn")
+LAMPORT_ALLOCATOR_BATCH_PATH = str(files(__name__) / "models" / "lamport_allocator_batch.mzn")
+INCLUDE_FOLDER_PATH = str(files(__name__) / "libraries") + "/"
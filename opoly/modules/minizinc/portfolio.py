@@ -0,0 +1,237 @@
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from collections import Counter
+
+import opoly.modules.minizinc as minizinc
+from opoly.modules.minizinc.utils import parse_statistics
+from opoly.modules.profiler import profile_solver_run
+
+# Solvers raced by default, each one by its MiniZinc identifiers
+DEFAULT_PORTFOLIO = (
+    ("chuffed", "org.chuffed.chuffed"),
+    ("gecode", "org.gecode.gecode"),
+    ("cbc", "coin-bc", "org.minizinc.mip.coin-bc"),
+    ("or-tools", "com.google.or-tools", "com.google.ortools.sat"),
+)
+DEFAULT_MIN_RACES = 5
+DEFAULT_CONFIDENCE = 0.8
+
+SOLUTION_SEPARATOR = "----------"
+SEARCH_COMPLETE = "=========="
+STATUS_LINES = {
+    "=====UNSATISFIABLE=====": "UNSATISFIABLE",
+    "=====UNKNOWN=====": "UNKNOWN",
+    "=====ERROR=====": "ERROR",
+}
+# Races without a proof report the most useful of the other outcomes
+UNPROVEN_STATUS_RANK = {"UNKNOWN": 0, "ERROR": 1, "SATISFIED": 2}
+# Field of the json solutions holding their objective with --output-objective
+OBJECTIVE_FIELD = "_objective"
+
+
+def installed_solvers() -> list[set[str]]:
+    if shutil.which("minizinc") is None:
+        return []
+    try:
+        run_res = subprocess.run(
+            ["minizinc", "--solvers-json"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        solvers = json.loads(run_res.stdout)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return []
+    return [{solver["id"]} | set(solver.get("tags", [])) for solver in solvers]
+
+
+def parse_output(output: str) -> (str, dict):
+    # Returns the status of a "--output-mode json" run and its last solution
+    status = "UNKNOWN"
+    solution = None
+    block = []
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("%"):
+            continue
+        if line == SOLUTION_SEPARATOR:
+            solution = json.loads("\n".join(block))
+            status = "SATISFIED"
+            block = []
+        elif line == SEARCH_COMPLETE:
+            status = "OPTIMAL_SOLUTION" if solution is not None else "UNKNOWN"
+        elif line in STATUS_LINES:
+            status = STATUS_LINES[line]
+        else:
+            block.append(line)
+    return status, solution
+
+
+def solution_objective(solution: dict, statistics: dict):
+    # Every model minimizes, solvers which do not print the objective rank last
+    if solution is None:
+        return None
+    return solution.pop(OBJECTIVE_FIELD, statistics.get("objective"))
+
+
+def better_objective(objective, best) -> bool:
+    if objective is None:
+        return False
+    return best is None or objective < best
+
+
+def instance_shape(model: str, data: dict) -> str:
+    # Instances of the same model with the same sizes share their best solver
+    sizes = ",".join(f"{name}={value}" for name, value in sorted(data.items()) if isinstance(value, int))
+    return f"{os.path.splitext(os.path.basename(model))[0]}({sizes})"
+
+
+class SolverPortfolio():
+
+    def __init__(self,
+                 solvers: list[str] = None,
+                 min_races: int = DEFAULT_MIN_RACES,
+                 confidence: float = DEFAULT_CONFIDENCE,
+                 state_file: str = None
+                 ):
+        self._solvers = solvers
+        self._min_races = min_races
+        self._confidence = confidence
+        self._state_file = state_file
+        self._wins = {}
+        self._lock = threading.Lock()
+        if state_file is not None and os.path.exists(state_file):
+            with open(state_file) as file:
+                self._wins = {shape: Counter(wins) for shape, wins in json.load(file).items()}
+
+    @property
+    def solvers(self) -> list[str]:
+        # Only the solvers installed locally are raced
+        if self._solvers is None:
+            installed = installed_solvers()
+            self._solvers = [names[0] for names in DEFAULT_PORTFOLIO
+                             if any(set(names) & ids for ids in installed)]
+        return self._solvers
+
+    def wins(self, shape: str) -> dict[str, int]:
+        with self._lock:
+            return dict(self._wins.get(shape, {}))
+
+    def preferred_solver(self, shape: str) -> str:
+        with self._lock:
+            wins = self._wins.get(shape)
+            if wins is None or sum(wins.values()) < self._min_races:
+                return None
+            solver, count = wins.most_common(1)[0]
+            return solver if count / sum(wins.values()) >= self._confidence else None
+
+    def record_win(self, shape: str, solver: str):
+        with self._lock:
+            self._wins.setdefault(shape, Counter())[solver] += 1
+            if self._state_file is not None:
+                state = {s: dict(wins) for s, wins in self._wins.items()}
+                # Processes sharing the state file each write their own copy
+                tmp_file = f"{self._state_file}.{os.getpid()}.tmp"
+                with open(tmp_file, "w") as file:
+                    json.dump(state, file)
+                os.replace(tmp_file, self._state_file)
+
+    def solve(self, model: str, data: dict, timeout: int = 5) -> (dict, str):
+        if len(self.solvers) == 0:
+            return None, "An error occurred!\nNo MiniZinc solver of the portfolio is installed"
+        shape = instance_shape(model, data)
+        preferred = self.preferred_solver(shape)
+        solvers = [preferred] if preferred is not None else self.solvers
+        winner, status, solution, statistics = self._race(model, data, solvers, timeout)
+        if winner is None and preferred is not None:
+            # The learned default did not make it, every solver gets a chance
+            winner, status, solution, statistics = self._race(model, data, self.solvers, timeout)
+        if winner is not None:
+            self.record_win(shape, winner)
+        if status == "ERROR":
+            return None, f"An error occurred!\n{statistics.get('error', '')}"
+        if status == "UNSATISFIABLE":
+            return None, "Unsatisfiable!"
+        if status == "SATISFIED":
+            return solution, "Solution not proven optimal!"
+        if status != "OPTIMAL_SOLUTION":
+            return None, "Solution not found in time!"
+        return solution, None
+
+    def _command(self, model: str, data: dict, solver: str, timeout: int) -> list[str]:
+        import pymzn
+        return [
+            "minizinc", "--solver", solver,
+            "--time-limit", str(int(timeout * 1000)),
+            "--output-mode", "json", "--output-objective", "-s", "-a",
+            "-I", minizinc.INCLUDE_FOLDER_PATH,
+            "-D", " ".join(pymzn.dict2dzn(data)),
+            model
+        ]
+
+    def _race(self, model: str, data: dict, solvers: list[str], timeout: int) -> (str, str, dict, dict):
+        results = queue.Queue()
+        processes = {}
+        start_time = time.perf_counter()
+
+        def run(solver):
+            try:
+                stdout, stderr = processes[solver].communicate()
+            except OSError as ex:
+                stdout, stderr = "", str(ex)
+            results.put((solver, stdout, stderr))
+
+        threads = []
+        for solver in solvers:
+            try:
+                processes[solver] = subprocess.Popen(
+                    self._command(model, data, solver, timeout),
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            except OSError as ex:
+                results.put((solver, "", str(ex)))
+                continue
+            thread = threading.Thread(target=run, args=(solver,), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        winner = None
+        status, solution, statistics = "UNKNOWN", None, {}
+        objective = None
+        try:
+            for _ in solvers:
+                solver, stdout, stderr = results.get()
+                run_status, run_solution = parse_output(stdout)
+                if run_status == "UNKNOWN" and processes.get(solver) is not None and \
+                        processes[solver].returncode not in (0, None):
+                    run_status = "ERROR"
+                run_statistics = parse_statistics(stdout, stderr)
+                run_objective = solution_objective(run_solution, run_statistics)
+                profile_solver_run({
+                    "model": os.path.splitext(os.path.basename(model))[0],
+                    "solver": solver,
+                    "wall_time": time.perf_counter() - start_time,
+                    "status": run_status,
+                    "nodes": run_statistics.get("nodes"),
+                    "solve_time": run_statistics.get("solveTime"),
+                    "statistics": run_statistics,
+                    "portfolio": list(solvers)
+                })
+                # Optimality and unsatisfiability are proofs, the first one ends the race
+                if run_status in ("OPTIMAL_SOLUTION", "UNSATISFIABLE"):
+                    winner, status, solution, statistics = solver, run_status, run_solution, run_statistics
+                    break
+                # Without a proof, a solution found in time is better than none
+                # and among those the one with the lowest objective is kept
+                if UNPROVEN_STATUS_RANK[run_status] > UNPROVEN_STATUS_RANK[status] or \
+                        (run_status == status == "SATISFIED" and better_objective(run_objective, objective)):
+                    status, solution, statistics = run_status, run_solution, dict(run_statistics, error=stderr)
+                    objective = run_objective
+        finally:
+            for process in processes.values():
+                if process.poll() is None:
+                    process.kill()
+            for thread in threads:
+                thread.join()
+        return winner, status, solution, statistics
@@ -1,28 +1,153 @@
-from pkg_resources import resource_filename
+from __future__ import annotations
 
-import pymzn
+import contextvars
+import copy
+import math
+import os
+import re
+import threading
+import time
 
 import opoly.modules.minizinc as minizinc
+from opoly.modules.profiler import profile_solver_run
+
+MZN_STAT_REGEX = re.compile(r"^%%%mzn-stat:?\s*(?P<name>\w+)=(?P<value>.*)$")
+
+# Timeouts in seconds grow by one second every TIMEOUT_SIZE_STEP elements
+# of the model, so that small models never wait for large ones' timeout
+MIN_TIMEOUT = 1
+MAX_TIMEOUT = 30
+TIMEOUT_SIZE_STEP = 10
+
+_ACTIVE_BUDGET = contextvars.ContextVar("opoly_active_budget", default=None)
+
+
+def scaled_timeout(size: int) -> int:
+    return min(MAX_TIMEOUT, MIN_TIMEOUT + math.ceil(size / TIMEOUT_SIZE_STEP))
+
+
+class SolverBudget():
+
+    def __init__(self, seconds: float):
+        self._remaining = seconds
+        self._lock = threading.Lock()
+        self._tokens = []
+
+    @property
+    def remaining(self) -> float:
+        with self._lock:
+            return max(0.0, self._remaining)
+
+    def spend(self, seconds: float):
+        with self._lock:
+            self._remaining -= seconds
+
+    def __enter__(self) -> SolverBudget:
+        self._tokens.append(_ACTIVE_BUDGET.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _ACTIVE_BUDGET.reset(self._tokens.pop())
+
+
+def active_budget() -> SolverBudget:
+    return _ACTIVE_BUDGET.get()
+
+
+def parse_statistics(*logs: str) -> dict:
+    statistics = {}
+    for log in logs:
+        for line in (log or "").splitlines():
+            match = MZN_STAT_REGEX.match(line.strip())
+            if match is None:
+                continue
+            value = match.group("value").strip().strip('"')
+            try:
+                value = int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            statistics[match.group("name")] = value
+    return statistics
+
+
+def statistics_solver(solver):
+    # The solver with the -s flag of minizinc, which prints the nodes and
+    # the solve time as %%%mzn-stat lines
+    solver_args = solver.args
+
+    def args(*args, **kwargs):
+        flags = list(solver_args(*args, **kwargs))
+        return flags if "-s" in flags or "--statistics" in flags else ["-s"] + flags
+
+    solver = copy.copy(solver)
+    solver.args = args
+    return solver
 
 
 def solve_model(
     model: str,
     data: dict,
-    solver=pymzn.chuffed,
-    timeout: int = 5
-) -> (pymzn.Solutions, str):
+    solver=None,
+    timeout: int = 5,
+    portfolio=None
+) -> (dict, str):
+    # A solution whose optimality was not proven in time is still returned,
+    # together with a warning in place of the error
+    budget = active_budget()
+    if budget is not None:
+        # The regions of a file share their solving time
+        if budget.remaining <= 0:
+            return None, "Solution not found in time!"
+        timeout = min(timeout, math.ceil(budget.remaining))
+    start_time = time.perf_counter()
+    try:
+        if portfolio is not None:
+            return portfolio.solve(model, data, timeout)
+        return _solve_model(model, data, solver, timeout)
+    finally:
+        if budget is not None:
+            budget.spend(time.perf_counter() - start_time)
+
+
+def _solve_model(model: str, data: dict, solver, timeout: int) -> (dict, str):
+    # pymzn is only needed when a model is actually solved
+    import pymzn
+    if solver is None:
+        solver = pymzn.chuffed
+    run_statistics = {
+        "model": os.path.splitext(os.path.basename(model))[0],
+        "solver": solver.solver_id
+    }
+    start_time = time.perf_counter()
     try:
         sols = pymzn.minizinc(
             mzn=model,
             data=data,
-            solver=solver,
+            solver=statistics_solver(solver),
             timeout=timeout,
-            include=minizinc.INCLUDE_FOLDER_PATH
+            include=minizinc.INCLUDE_FOLDER_PATH,
+            all_solutions=True
         )
     except Exception as ex:
+        run_statistics["wall_time"] = time.perf_counter() - start_time
+        run_statistics["status"] = "ERROR"
+        profile_solver_run(run_statistics)
         return None, f"An error occurred!\n{ex}"
-    if sols.status in (pymzn.Status.UNKNOWN, pymzn.Status.INCOMPLETE):
-        return None, "Solution not found in time!"
+    run_statistics["wall_time"] = time.perf_counter() - start_time
+    run_statistics["status"] = sols.status.name
+    statistics = parse_statistics(sols.log, sols.stderr)
+    run_statistics["nodes"] = statistics.get("nodes")
+    run_statistics["solve_time"] = statistics.get("solveTime")
+    run_statistics["statistics"] = statistics
+    profile_solver_run(run_statistics)
     if sols.status == pymzn.Status.UNSATISFIABLE:
         return None, "Unsatisfiable!"
-    return sols[0], None
+    if sols.status in (pymzn.Status.UNKNOWN, pymzn.Status.INCOMPLETE):
+        if len(sols) == 0:
+            return None, "Solution not found in time!"
+        # Intermediate solutions improve the objective, the last is the best
+        return sols[-1], "Solution not proven optimal!"
+    return sols[-1], None
@@ -3,10 +3,11 @@ import re
 
 from opoly.expressions import (
     Expression, ConstantExpression, VariableExpression, GroupingExpression, FunctionExpression, UnaryExpression)
-from opoly.statements import Statement, ForLoopStatement, AssignmentStatement
+from opoly.statements import Statement, ForLoopStatement, AssignmentStatement, AssumptionStatement
 
 FUNCTION_EXPRESSION_REGEX = re.compile(r"^(?P<name>\w+)\((?P<terms>.*)\)")
 FUNCTION_TERMS_EXPRESSION_REGEX = re.compile(r"^(?P<term>[^,\s].*?)(,|$)")
+ASSUMPTION_REGEX = re.compile(r"^(?P<left>[^<>=]+?)\s*(?P<rel>>=|<=|==)\s*(?P<right>[^<>=]+)$")
 UNARY_OPERATORS = [
     "-"
 ]
@@ -230,6 +231,19 @@ def parse_assignment_statement(code: str) -> (AssignmentStatement, str):
     return AssignmentStatement(left_expr, right_expr), None
 
 
+def parse_assumption_statement(code: str) -> (AssumptionStatement, str):
+    match = ASSUMPTION_REGEX.match(code.strip())
+    if match is None:
+        return None, "Expected assumption <expression> >=, <= or == <expression>"
+    left_expr, rem = parse_expression(match.group("left").strip())
+    if left_expr is None:
+        return None, rem
+    right_expr, rem = parse_expression(match.group("right").strip())
+    if right_expr is None:
+        return None, rem
+    return AssumptionStatement(left_expr, match.group("rel"), right_expr), None
+
+
 class ForLoopParser(ABC):
 
     @abstractmethod
@@ -247,6 +261,10 @@ class PseudocodeForLoopParser(ABC):
         r"^STM\s+(?P<ass>.*?\s*=\s*.*?);.*"
     )
 
+    ASSUMPTION_REGEX = re.compile(
+        r"^ASSUME\s+(?P<assume>[^;]*);\s*"
+    )
+
     def parse_loop_body(self, code: str) -> (tuple[Statement], str):
         code = code.strip()
         body_stmts = []
@@ -274,8 +292,22 @@ class PseudocodeForLoopParser(ABC):
                 return None, f"Unsupported statement: {code}"
         return body_stmts, None
 
+    def parse_assumptions(self, code: str) -> (tuple[AssumptionStatement], str):
+        # Assumptions on the parameters, "ASSUME n >= 3;", before the loop
+        assumptions = []
+        while (match := self.ASSUMPTION_REGEX.match(code)) is not None:
+            assumption, err = parse_assumption_statement(match.group("assume"))
+            if assumption is None:
+                return None, err
+            assumptions.append(assumption)
+            code = code[match.span()[1]:]
+        return tuple(assumptions), code
+
     def parse_for_loop(self, code: str) -> (ForLoopStatement, str):
         code = re.sub(r"\s+", " ", code.strip())
+        assumptions, code = self.parse_assumptions(code)
+        if assumptions is None:
+            return None, code
         # Parse header
         if len(code) == 0:
             return None, "Expected loop header"
@@ -318,11 +350,13 @@ class PseudocodeForLoopParser(ABC):
                 index=idx_var_expr,
                 lowerbound=lb_expr,
                 upperbound=ub_expr,
-                step=step_expr
+                step=step_expr,
+                assumptions=assumptions
             ), None
         return ForLoopStatement(
             body=body,
             index=idx_var_expr,
             lowerbound=lb_expr,
-            upperbound=ub_expr
+            upperbound=ub_expr,
+            assumptions=assumptions
         ), None
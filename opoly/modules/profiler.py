@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import os
+import time
+import tracemalloc
+
+import opoly
+
+_ACTIVE_PROFILER = contextvars.ContextVar("opoly_active_profiler", default=None)
+_ACTIVE_REGION = contextvars.ContextVar("opoly_active_region", default=None)
+
+
+class RegionProfile():
+
+    def __init__(self, name: str):
+        self._name = name
+        self._stages = []
+        self._counters = {}
+        self._solver_runs = []
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def stages(self) -> list[dict]:
+        return self._stages
+
+    @property
+    def counters(self) -> dict[str, int]:
+        return self._counters
+
+    @property
+    def solver_runs(self) -> list[dict]:
+        return self._solver_runs
+
+    def to_dict(self) -> dict:
+        return {
+            "region": self.name,
+            "stages": self.stages,
+            "counters": self.counters,
+            "solver_runs": self.solver_runs
+        }
+
+
+class Profiler():
+
+    def __init__(self, trace_memory: bool = True):
+        self._trace_memory = trace_memory
+        self._regions = []
+        self._tokens = []
+
+    @property
+    def regions(self) -> list[RegionProfile]:
+        return self._regions
+
+    def __enter__(self) -> Profiler:
+        self._tokens.append(_ACTIVE_PROFILER.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _ACTIVE_PROFILER.reset(self._tokens.pop())
+
+    @contextlib.contextmanager
+    def region(self, name: str = None):
+        region = RegionProfile(name if name is not None else f"#{len(self._regions) + 1}")
+        self._regions.append(region)
+        token = _ACTIVE_REGION.set(region)
+        try:
+            yield region
+        finally:
+            _ACTIVE_REGION.reset(token)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        region = _ACTIVE_REGION.get()
+        if region is None:
+            with self.region() as region:
+                with self.stage(name):
+                    yield
+            return
+        started_tracing = False
+        if self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        start_times = os.times()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            stage = {
+                "stage": name,
+                "wall_time": time.perf_counter() - start_wall,
+                "cpu_time": time.process_time() - start_cpu
+            }
+            # Solvers run as subprocesses, their time is only visible once waited for
+            end_times = os.times()
+            stage["child_cpu_time"] = ((end_times.children_user - start_times.children_user) +
+                                       (end_times.children_system - start_times.children_system))
+            if self._trace_memory:
+                stage["peak_memory"] = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            region.stages.append(stage)
+
+    def count(self, name: str, value: int = 1):
+        region = _ACTIVE_REGION.get()
+        if region is not None:
+            region.counters[name] = region.counters.get(name, 0) + value
+
+    def record_solver_run(self, statistics: dict):
+        region = _ACTIVE_REGION.get()
+        if region is not None:
+            region.solver_runs.append(statistics)
+
+    def to_dict(self) -> dict:
+        regions = [region.to_dict() for region in self.regions]
+        totals = {}
+        for region in regions:
+            for stage in region["stages"]:
+                stage_totals = totals.setdefault(stage["stage"], {})
+                for key, value in stage.items():
+                    if key == "stage":
+                        continue
+                    if key == "peak_memory":
+                        stage_totals[key] = max(stage_totals.get(key, 0), value)
+                    else:
+                        stage_totals[key] = stage_totals.get(key, 0) + value
+        return {
+            "version": opoly.__version__,
+            "regions": regions,
+            "totals": totals
+        }
+
+    def to_json(self, indent: int = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+
+def active_profiler() -> Profiler:
+    return _ACTIVE_PROFILER.get()
+
+
+def profile_region(name: str = None):
+    profiler = _ACTIVE_PROFILER.get()
+    return profiler.region(name) if profiler is not None else contextlib.nullcontext()
+
+
+def profile_stage(name: str):
+    profiler = _ACTIVE_PROFILER.get()
+    return profiler.stage(name) if profiler is not None else contextlib.nullcontext()
+
+
+def profile_count(name: str, value: int = 1):
+    profiler = _ACTIVE_PROFILER.get()
+    if profiler is not None:
+        profiler.count(name, value)
+
+
+def profile_solver_run(statistics: dict):
+    profiler = _ACTIVE_PROFILER.get()
+    if profiler is not None:
+        profiler.record_solver_run(statistics)
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+
+from opoly.expressions import Expression
+from opoly.statements import ForLoopStatement
+from opoly.modules.checker import extract_loop_indexes, extract_loop_bounds, get_simple_variable_sum_and_constant
+
+MAX_RANKED_POINTS = 1_000_000
+
+
+class ScheduleScore():
+
+    def __init__(self, wavefronts: int, max_width: int, parallel_steps: int):
+        self._wavefronts = wavefronts
+        self._max_width = max_width
+        self._parallel_steps = parallel_steps
+
+    @property
+    def wavefronts(self) -> int:
+        return self._wavefronts
+
+    @property
+    def max_width(self) -> int:
+        return self._max_width
+
+    @property
+    def parallel_steps(self) -> int:
+        return self._parallel_steps
+
+    def key(self) -> tuple[int, int]:
+        return (self._parallel_steps, self._wavefronts)
+
+    def __str__(self):
+        return (f"wavefronts={self._wavefronts}, max width={self._max_width}, "
+                f"parallel steps={self._parallel_steps}")
+
+
+def bound_values(
+    bound: Expression,
+    points: np.ndarray,
+    index_positions: dict[str, int],
+    parameters: dict[str, int]
+) -> np.ndarray:
+    # Values of a loop bound for every partial iteration point
+    if bound.is_constant():
+        return np.full(points.shape[0], bound.value, dtype=np.int64)
+    if bound.is_variable():
+        var, const = bound, 0
+    else:
+        var, const = get_simple_variable_sum_and_constant(bound)
+        const = const.value
+    if var.name in index_positions:
+        return points[:, index_positions[var.name]] + const
+    if var.name not in parameters:
+        raise ValueError(f"Missing value of parameter {var.name}")
+    return np.full(points.shape[0], parameters[var.name] + const, dtype=np.int64)
+
+
+def iteration_points(loop: ForLoopStatement, parameters: dict[str, int], max_points: int = MAX_RANKED_POINTS) -> np.ndarray:
+    # All the iteration points of the loop nest as rows, or None if there are
+    # more than <max_points>, built one index at a time
+    points = np.zeros((1, 0), dtype=np.int64)
+    index_positions = {}
+    for pos, (index, (lower, upper)) in enumerate(zip(extract_loop_indexes(loop), extract_loop_bounds(loop))):
+        lowers = bound_values(lower, points, index_positions, parameters)
+        uppers = bound_values(upper, points, index_positions, parameters)
+        counts = np.maximum(uppers - lowers + 1, 0)
+        total = int(counts.sum())
+        if total > max_points:
+            return None
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        points = np.hstack([
+            np.repeat(points, counts, axis=0),
+            (np.repeat(lowers, counts) + offsets)[:, None]
+        ])
+        index_positions[index.name] = pos
+    return points
+
+
+class WavefrontScheduleRanker():
+
+    def __init__(self, threads: int = None, max_points: int = MAX_RANKED_POINTS):
+        self._threads = threads if threads is not None else os.cpu_count() or 1
+        self._max_points = max_points
+
+    @property
+    def threads(self) -> int:
+        return self._threads
+
+    def score(self, points: np.ndarray, schedule: np.ndarray) -> ScheduleScore:
+        # Every value of tau·x is a wavefront of the sequential loop, ended by
+        # a barrier, whose points are shared by the threads
+        if points.shape[0] == 0:
+            return ScheduleScore(0, 0, 0)
+        times = points @ schedule.astype(np.int64)
+        widths = np.bincount(times - times.min())
+        return ScheduleScore(
+            wavefronts=len(widths),
+            max_width=int(widths.max()),
+            parallel_steps=int(np.maximum(1, -(-widths // self._threads)).sum())
+        )
+
+    def rank(
+        self,
+        loop: ForLoopStatement,
+        parameters: dict[str, int],
+        schedules: list[np.ndarray]
+    ) -> list[tuple[np.ndarray, ScheduleScore]]:
+        # Best schedules first, ties keep the order of the given schedules.
+        # Returns None when the loop has too many points to be ranked.
+        points = iteration_points(loop, parameters, self._max_points)
+        if points is None:
+            return None
+        scored = [(schedule, self.score(points, schedule)) for schedule in schedules]
+        return sorted(scored, key=lambda s: s[1].key())
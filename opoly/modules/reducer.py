@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class DependenciesReducer(ABC):
+
+    @abstractmethod
+    def reduce(self, deps: np.ndarray) -> np.ndarray:
+        pass
+
+
+def primitive_rows(deps: np.ndarray) -> np.ndarray:
+    # Positive multiples of a row constrain a schedule like the row itself
+    gcds = np.gcd.reduce(np.abs(deps), axis=1)
+    gcds[gcds == 0] = 1
+    return deps // gcds[:, None]
+
+
+def implied_by_pairs(rows: np.ndarray, dots: np.ndarray, k: int, generators: np.ndarray) -> bool:
+    # Whether rows[k] = l * rows[i] + m * rows[j] with l, m >= 0 for two
+    # generators i and j, solving the normal equations of every pair exactly:
+    # det * rows[k] = l' * rows[i] + m' * rows[j] with det > 0
+    gen = np.flatnonzero(generators)
+    if len(gen) < 2:
+        return False
+    i, j = np.triu_indices(len(gen), k=1)
+    i, j = gen[i], gen[j]
+    det = dots[i, i] * dots[j, j] - dots[i, j] ** 2
+    lam = dots[j, j] * dots[i, k] - dots[i, j] * dots[j, k]
+    mu = dots[i, i] * dots[j, k] - dots[i, j] * dots[i, k]
+    candidates = (det > 0) & (lam >= 0) & (mu >= 0)
+    if not candidates.any():
+        return False
+    i, j, det, lam, mu = i[candidates], j[candidates], det[candidates], lam[candidates], mu[candidates]
+    residuals = det[:, None] * rows[k] - lam[:, None] * rows[i] - mu[:, None] * rows[j]
+    return bool(np.any(np.all(residuals == 0, axis=1)))
+
+
+class LamportDependenciesReducer(DependenciesReducer):
+
+    def reduce(self, deps: np.ndarray) -> np.ndarray:
+        # Removes the dependencies whose D·tau > 0 constraint is implied by the
+        # others: duplicates, positive multiples and nonnegative combinations
+        # of two other dependencies. The rows are also sorted, so equivalent
+        # dependency matrices are reduced to the same one.
+        if len(deps.shape) != 2 or not issubclass(deps.dtype.type, np.integer) or deps.shape[0] == 0:
+            return deps
+        rows = np.unique(primitive_rows(deps.astype(np.int64)), axis=0)
+        dots = rows @ rows.T
+        # Zero rows are never satisfied, they are neither implied nor implying
+        keep = np.any(rows != 0, axis=1)
+        zero_rows = ~keep
+        for k in range(rows.shape[0]):
+            if not keep[k]:
+                continue
+            generators = keep.copy()
+            generators[k] = False
+            # Each row is checked against the rows still kept, so the cone
+            # of the kept rows never changes
+            if implied_by_pairs(rows, dots, k, generators):
+                keep[k] = False
+        return rows[keep | zero_rows]
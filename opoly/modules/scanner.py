@@ -1,129 +1,311 @@
+from fractions import Fraction
+
 import numpy as np
 import sympy as sp
-from sympy.solvers.inequalities import reduce_inequalities
 
-from opoly.expressions import ConstantExpression, VariableExpression
-from opoly.statements import ForLoopStatement, DeclarationStatement
+from opoly.expressions import (
+    Expression,
+    ConstantExpression,
+    VariableExpression,
+    GroupingExpression,
+    FunctionExpression,
+    UnaryExpression,
+    extract_variable_expressions
+)
+from opoly.statements import ForLoopStatement, DeclarationStatement, AssumptionStatement, BlockStatement
 from opoly.modules.checker import (
     extract_loop_indexes,
     extract_loop_bounds,
     get_simple_variable_sum_and_constant,
     get_inner_loop_statements
 )
-from opoly.modules.parser import parse_expression
-
-def reduce_ineq(
-    ineq: sp.core.relational._Inequality,
-    var: sp.core.symbol.Symbol
-) -> sp.core.relational._Inequality:
-    interval = reduce_inequalities(ineq, [var])
-    args = interval.args if isinstance(interval, sp.And) else [interval]
-    for inter in args:
-        if not inter.lhs.has(var):
-            inter = inter.canonical
-        if not (inter.has(sp.oo) or inter.has(-sp.oo)):
-            return inter
-
-
-def fourier_motzkin_eliminate_var(
-    inequalites: tuple[sp.core.relational._Inequality],
-    var: sp.core.symbol.Symbol,
-    all_vars: tuple[sp.core.symbol.Symbol]
-) -> tuple[sp.core.relational._Inequality]:
-    less_exprs = []
-    great_exprs = []
-    zero_ineqs = []
-    for ineq in inequalites:
-        if var in ineq.free_symbols:
-            ineq = reduce_ineq(ineq, var)
-            if isinstance(ineq, sp.core.relational.GreaterThan):
-                great_exprs.append(ineq.rhs)
-            else:
-                less_exprs.append(ineq.rhs)
-        else:
-            zero_ineqs.append(ineq)
-    new_ineqs = []
-    for ge in great_exprs:
-        for le in less_exprs:
-            diff = ge - le
-            if any(diff.has(v) for v in all_vars):
-                new_ineqs.append(ge <= le)
-    return tuple(zero_ineqs + new_ineqs)
-
-
-def extract_var_bounds(
-    ineqs: tuple[sp.core.relational._Inequality],
-    var: sp.core.symbol.Symbol
-) -> (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr]):
-    lower_bounds = []
-    upper_bounds = []
-    for ineq in ineqs:
-        if var in ineq.free_symbols:
-            ineq = reduce_ineq(ineq, var)
-            if ineq.has(var):
-                bound = sp.together(ineq.rhs)
-                if isinstance(ineq, sp.core.relational.GreaterThan):
-                    lower_bounds.append(bound)
-                else:
-                    upper_bounds.append(bound)
-    return (tuple(lower_bounds), tuple(upper_bounds))
+from opoly.modules.fourier_motzkin import fourier_motzkin_bounds, is_feasible
+from opoly.modules.unimodular import integer_inverse
+
+def inequality_rows(
+    exprs: list[sp.core.expr.Expr],
+    columns: tuple[sp.core.symbol.Symbol]
+) -> np.ndarray:
+    # Integer coefficients of the linear expressions <exprs> >= 0 over the
+    # <columns> symbols and a last constant column
+    positions = {symbol: k for k, symbol in enumerate(columns)}
+    rows = []
+    for expr in exprs:
+        row = [sp.Integer(0)] * (len(columns) + 1)
+        for term, coeff in sp.expand(expr).as_coefficients_dict().items():
+            row[positions[term] if term != 1 else len(columns)] += coeff
+        denominator = sp.ilcm(*(sp.fraction(c)[1] for c in row))
+        rows.append([int(c * denominator) for c in row])
+    return np.array(rows, dtype=object).reshape(len(exprs), len(columns) + 1)
+
+
+def bound_expression(
+    bound: tuple[Fraction, ...],
+    columns: tuple[sp.core.symbol.Symbol]
+) -> sp.core.expr.Expr:
+    expr = sp.Rational(bound[-1].numerator, bound[-1].denominator)
+    for symbol, coeff in zip(columns, bound):
+        if coeff != 0:
+            expr += sp.Rational(coeff.numerator, coeff.denominator) * symbol
+    return sp.together(expr)
 
 
 def fourier_motzkin(
-    ineqs: tuple[sp.core.relational._Inequality],
+    exprs: list[sp.core.expr.Expr],
     all_vars: tuple[sp.core.symbol.Symbol],
-    last_index: int = 0
+    last_index: int = 0,
+    keep_redundant: bool = False
 ) -> dict[sp.core.symbol.Symbol, (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr])]:
-    dim = len(all_vars)
-    bounds_dict = {}
-    curr_index = dim - 1
+    # Bounds of the variables of the inequalities <exprs> >= 0, eliminated
+    # as integer matrices and converted to sympy only once at the end
+    parameters = set().union(*(expr.free_symbols for expr in exprs)) - set(all_vars)
+    columns = tuple(all_vars) + tuple(sorted(parameters, key=lambda p: p.name))
+    bounds = fourier_motzkin_bounds(
+        inequality_rows(exprs, columns), len(all_vars), last_index, keep_redundant)
+    return {
+        all_vars[k]: (
+            tuple(bound_expression(b, columns) for b in lower_bounds),
+            tuple(bound_expression(b, columns) for b in upper_bounds)
+        )
+        for k, (lower_bounds, upper_bounds) in bounds.items()
+    }
+
 
-    while curr_index > last_index:
-        curr_var = all_vars[curr_index]
-        bounds_dict[curr_var] = extract_var_bounds(ineqs, curr_var)
-        ineqs = fourier_motzkin_eliminate_var(ineqs, curr_var, all_vars)
-        curr_index -= 1
+def has_denominator(expr: sp.core.expr.Expr) -> bool:
+    # Bounds with rational coefficients or constants, also negative ones
+    # of reversed and skewed loops, are not integers for every value
+    _, denominator = expr.as_numer_denom()
+    return denominator != 1
 
-    last_var = all_vars[last_index]
-    bounds_dict[last_var] = extract_var_bounds(ineqs, last_var)
-    return bounds_dict
+
+def min_max(func: type, bounds: tuple[sp.core.expr.Expr], evaluate: bool) -> sp.core.expr.Expr:
+    # Without evaluation sympy does not compare every pair of bounds, the
+    # bounds of a system without redundant rows are all needed anyway
+    if not evaluate and len(bounds) == 1:
+        return bounds[0]
+    return func(*bounds, evaluate=evaluate)
 
 
 def enclose_bounds(
     bounds_dict: dict[sp.core.symbol.Symbol,
-                      (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr])]
+                      (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr])],
+    evaluate: bool = True
 ) -> dict[sp.core.symbol.Symbol, (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr])]:
     enclosed_bounds_dict = {}
     for var, bounds in bounds_dict.items():
         lowers, uppers = bounds
-        to_ceil = any(map(lambda l: isinstance(l, sp.core.mul.Mul) and
-                                    any(map(lambda ll: ll.is_rational and not ll.is_integer, l.as_two_terms())),
-                          lowers))
-        to_floor = any(map(lambda u: isinstance(u, sp.core.mul.Mul) and
-                                     any(map(lambda uu: uu.is_rational and not uu.is_integer, u.as_two_terms())),
-                           uppers))
+        to_ceil = any(map(has_denominator, lowers))
+        to_floor = any(map(has_denominator, uppers))
+        lower = min_max(sp.Max, lowers, evaluate)
+        upper = min_max(sp.Min, uppers, evaluate)
         enclosed_bounds_dict[var] = (
-            sp.ceiling(sp.Max(*lowers)) if to_ceil else sp.Max(*lowers),
-            sp.floor(sp.Min(*uppers)) if to_floor else sp.Min(*uppers)
+            sp.ceiling(lower) if to_ceil else lower,
+            sp.floor(upper) if to_floor else upper
         )
     return enclosed_bounds_dict
 
 
-def reindex(T_inv: np.array, x: sp.Matrix, ls: sp.Matrix, us: sp.Matrix):
+def reindex_system(
+    T_inv: np.array,
+    x: sp.Matrix,
+    ls: sp.Matrix,
+    us: sp.Matrix,
+    context: tuple[sp.core.expr.Expr] = ()
+) -> list[sp.core.expr.Expr]:
+    # Expressions >= 0 of the reindexed loop bounds, after the <context>
     system = T_inv * x
-    ineqs = []
+    exprs = list(context)
     for i, t in enumerate(system):
-        ineqs.append(t >= ls[i])
-        ineqs.append(t <= us[i])
+        exprs.append(t - ls[i])
+        exprs.append(us[i] - t)
+    return exprs
+
+
+def reindex(
+    T_inv: np.array,
+    x: sp.Matrix,
+    ls: sp.Matrix,
+    us: sp.Matrix,
+    keep_redundant: bool = False,
+    context: tuple[sp.core.expr.Expr] = ()
+):
+    # The <context> expressions >= 0 on the parameters take part in the
+    # elimination, the bounds they make inactive are removed as redundant
+    exprs = reindex_system(T_inv, x, ls, us, context)
     all_vars = tuple(xx for xx in x)
-    bounds = fourier_motzkin(ineqs, all_vars)
-    return enclose_bounds(bounds)
+    bounds = fourier_motzkin(exprs, all_vars, keep_redundant=keep_redundant)
+    return enclose_bounds(bounds, evaluate=keep_redundant)
+
+
+def strictly_positive(expr: sp.core.expr.Expr) -> sp.core.expr.Expr:
+    # expr > 0 as an expression >= 0: with integer variables, the multiple
+    # of <expr> with integer coefficients is at least 1
+    expr = sp.expand(expr)
+    denominator = sp.ilcm(1, *(sp.fraction(c)[1] for c in expr.as_coefficients_dict().values()))
+    return sp.expand(expr * denominator) - 1
+
+
+def split_bounds(
+    exprs: list[sp.core.expr.Expr],
+    all_vars: tuple[sp.core.symbol.Symbol],
+    bounds: dict[sp.core.symbol.Symbol, (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr])],
+    keep_redundant: bool = False
+) -> list[dict[sp.core.symbol.Symbol, (tuple[sp.core.expr.Expr], tuple[sp.core.expr.Expr])]]:
+    # Index-set splitting of the loop around the innermost one, whose
+    # iterations are split into the pieces where one lower and one upper
+    # bound of the innermost index are the active ones: the innermost loop
+    # of a piece has that single pair of affine bounds. The bounds of the
+    # split loop come from the elimination of its own and of the innermost
+    # index, the outer indexes are parameters constrained by their loops.
+    # None when the innermost loop has a single pair of bounds or two of
+    # its bounds on the same side are parallel along the split index.
+    if len(all_vars) < 2:
+        return None
+    split, inner = all_vars[-2], all_vars[-1]
+    lowers, uppers = bounds[inner]
+    if len(lowers) == 1 and len(uppers) == 1:
+        return None
+    lower_slopes = [sp.expand(lower).coeff(split) for lower in lowers]
+    upper_slopes = [sp.expand(upper).coeff(split) for upper in uppers]
+    if len(set(lower_slopes)) < len(lowers) or len(set(upper_slopes)) < len(uppers):
+        return None
+    # Along the split index the maximum of the lower bounds moves to the
+    # steeper ones and the minimum of the upper bounds to the flatter ones,
+    # pieces sorted by the sum of their positions follow the split index
+    lowers = [lower for _, lower in sorted(zip(lower_slopes, lowers), key=lambda p: p[0])]
+    uppers = [upper for _, upper in sorted(zip(upper_slopes, uppers), key=lambda p: -p[0])]
+    outer = []
+    for var in all_vars[:-2]:
+        var_lowers, var_uppers = bounds[var]
+        outer.extend(var - lower for lower in var_lowers)
+        outer.extend(upper - var for upper in var_uppers)
+    pieces = []
+    for a, lower in enumerate(lowers):
+        for b, upper in enumerate(uppers):
+            # Ties go to the first bound, every iteration is in one piece
+            region = [strictly_positive(lower - other) if j < a else lower - other
+                      for j, other in enumerate(lowers) if j != a]
+            region += [strictly_positive(other - upper) if j < b else other - upper
+                       for j, other in enumerate(uppers) if j != b]
+            system = list(exprs) + outer + region
+            columns = tuple(sorted(set().union(*(expr.free_symbols for expr in system)), key=lambda v: v.name))
+            if not is_feasible(inequality_rows(system, columns)):
+                continue
+            piece = fourier_motzkin(system, all_vars[-2:], keep_redundant=keep_redundant)
+            piece[inner] = ((lower,), (upper,))
+            pieces.append((a + b, piece))
+    pieces.sort(key=lambda p: p[0])
+    return [piece for _, piece in pieces]
+
+
+def assumption_expressions(assumptions: tuple[AssumptionStatement]) -> tuple[sp.core.expr.Expr]:
+    # Linear expressions >= 0 equivalent to the assumptions, an equality is
+    # the pair of opposite inequalities
+    exprs = []
+    for assumption in assumptions:
+        variables = extract_variable_expressions(assumption.left_term) + \
+            extract_variable_expressions(assumption.right_term)
+        symbols = {v.name: sp.Symbol(v.name, integer=True) for v in variables}
+        try:
+            left = sp.sympify(str(assumption.left_term), locals=symbols)
+            right = sp.sympify(str(assumption.right_term), locals=symbols)
+            poly = sp.Poly(left - right, *symbols.values()) if len(symbols) > 0 else None
+        except (sp.SympifyError, sp.PolynomialError, TypeError):
+            poly = None
+        if poly is None or poly.total_degree() > 1 or not all(c.is_Rational for c in poly.coeffs()):
+            raise ValueError(f"Assumption ({str(assumption)}) is not linear in the parameters")
+        diff = sp.expand(left - right)
+        if assumption.relation in (">=", "=="):
+            exprs.append(diff)
+        if assumption.relation in ("<=", "=="):
+            exprs.append(-diff)
+    return tuple(exprs)
+
+
+# C functions of the sympy functions allowed in a scanned bound
+C_FUNCTIONS = {
+    sp.Max: "fmax",
+    sp.Min: "fmin",
+    sp.floor: "floor",
+    sp.ceiling: "ceil"
+}
+
+
+def group(expr: Expression) -> Expression:
+    return expr if expr.is_single() else GroupingExpression([expr], [])
+
+
+def negate(expr: Expression) -> Expression:
+    return UnaryExpression(group(expr), "-")
+
+
+def to_expression(expr: sp.core.expr.Expr) -> Expression:
+    # Structural conversion of a bound to the expression the parser would
+    # give for its C code. A rational expression is divided by its positive
+    # integer denominator as a double only once, so floor and ceil of an
+    # integer quotient are exact
+    numerator, denominator = expr.as_numer_denom() if expr.is_Add or expr.is_Mul or expr.is_Rational \
+        else (expr, sp.Integer(1))
+    if denominator != 1:
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+        return Expression([group(to_expression(numerator)), ConstantExpression(float(denominator))], ["/"])
+    if expr.is_Integer:
+        value = int(expr)
+        return ConstantExpression(value) if value >= 0 else negate(ConstantExpression(-value))
+    if expr.is_Symbol:
+        return VariableExpression(expr.name)
+    if expr.is_Add:
+        terms, operators = [], []
+        for k, term in enumerate(expr.as_ordered_terms()):
+            negative = term.could_extract_minus_sign()
+            if k == 0:
+                # A product carries the sign on its coefficient
+                terms.append(to_expression(term))
+            else:
+                terms.append(to_expression(-term if negative else term))
+                operators.append("-" if negative else "+")
+        return Expression(terms, operators)
+    if expr.is_Mul:
+        coeff, rest = expr.as_coeff_Mul()
+        factors = [group(to_expression(f)) for f in rest.as_ordered_factors()]
+        if abs(coeff) != 1:
+            factors.insert(0, ConstantExpression(abs(int(coeff))))
+        if coeff < 0:
+            factors[0] = negate(factors[0])
+        return factors[0] if len(factors) == 1 else Expression(factors, ["*"] * (len(factors) - 1))
+    if expr.func in (sp.Max, sp.Min):
+        # fmax and fmin take two arguments, more of them are nested
+        args = [to_expression(arg) for arg in expr.args]
+        nested = args[-1]
+        for arg in reversed(args[:-1]):
+            nested = FunctionExpression(C_FUNCTIONS[expr.func], (arg, nested))
+        return nested
+    if expr.func in C_FUNCTIONS:
+        return FunctionExpression(C_FUNCTIONS[expr.func], tuple(to_expression(arg) for arg in expr.args))
+    raise ValueError(f"Unsupported bound term ({expr})")
+
 
 def invert_integer_matrix(mat: np.ndarray):
-    return np.linalg.inv(mat).round().astype(int)
+    return np.array(integer_inverse(np.asarray(mat).tolist()), dtype=int)
 
 class FourierMotzkinScanner():
 
+    def __init__(self, keep_redundant: bool = False, split: bool = False):
+        # The redundant bounds of every elimination are kept, for comparison
+        self._keep_redundant = keep_redundant
+        # The loop around the innermost one is split into the pieces where
+        # the innermost bounds need no fmax and fmin
+        self._split = split
+
+    @property
+    def keep_redundant(self) -> bool:
+        return self._keep_redundant
+
+    @property
+    def split(self) -> bool:
+        return self._split
+
     def generate_reversed_index_declarations(self, old_indexes, new_indexes, inverted_allocation):
         declarations = []
         inverted_indexes = inverted_allocation * new_indexes
@@ -131,7 +313,7 @@ class FourierMotzkinScanner():
             declarations.append(DeclarationStatement(
                 var_type="int",
                 variable=old_idx,
-                initialization=parse_expression(sp.ccode(inverted_indexes[i]))[0]
+                initialization=to_expression(inverted_indexes[i])
             ))
         return tuple(declarations)
 
@@ -154,7 +336,17 @@ class FourierMotzkinScanner():
                     res.append(sp.var(v.name, integer=True) + c.value)
         return sp.Matrix(res)
 
-    def reindex(self, loop: ForLoopStatement, allocation: np.ndarray, separate_bounds: bool = False) -> ForLoopStatement:
+    def reindex(
+        self,
+        loop: ForLoopStatement,
+        allocation: np.ndarray,
+        separate_bounds: bool = False,
+        assumptions: tuple[AssumptionStatement] = ()
+    ) -> ForLoopStatement or BlockStatement:
+        # The assumptions of the loop and the given ones hold for the
+        # parameters, they are also declared on the reindexed loop. A split
+        # outermost loop gives the block of its pieces.
+        assumptions = tuple(loop.assumptions) + tuple(assumptions)
         old_indexes = extract_loop_indexes(loop)
         new_indexes = list(VariableExpression("new_" + i.name) for i in old_indexes) #pylint: disable=no-member
         indexes = sp.Matrix(list(
@@ -165,54 +357,80 @@ class FourierMotzkinScanner():
         inv_indexes = inverted_allocation * indexes
         ls = self.extract_bounds(lower_bounds, old_indexes, inv_indexes)
         us = self.extract_bounds(upper_bounds, old_indexes, inv_indexes)
-        new_bounds = reindex(
-            inverted_allocation,
+        exprs = reindex_system(inverted_allocation, indexes, ls, us, assumption_expressions(assumptions))
+        all_vars = tuple(indexes)
+        bounds = fourier_motzkin(exprs, all_vars, keep_redundant=self._keep_redundant)
+        new_bounds = enclose_bounds(bounds, evaluate=self._keep_redundant)
+        pieces = split_bounds(exprs, all_vars, bounds, self._keep_redundant) if self._split else None
+        statements = get_inner_loop_statements(loop)
+
+        reverse_declarations = self.generate_reversed_index_declarations(
+            old_indexes,
             indexes,
-            ls,
-            us
+            inverted_allocation
         )
-        statements = get_inner_loop_statements(loop)
+        body = list(reverse_declarations) + list(statements)
+        levels = range(len(all_vars))
+        if pieces:
+            # The innermost loops of the pieces have affine bounds, only
+            # the split loops may need their bounds declared separately
+            split = len(all_vars) - 2
+            split_loops = []
+            for p, piece in enumerate(pieces):
+                piece_bounds = enclose_bounds(piece, evaluate=self._keep_redundant)
+                inner_loop = self.loop_nest(all_vars, piece_bounds, [split + 1], body)
+                split_loops.extend(self.loop_nest(
+                    all_vars,
+                    piece_bounds,
+                    [split],
+                    inner_loop,
+                    separate_bounds=separate_bounds,
+                    assumptions=assumptions if p == 0 else (),
+                    suffix=f"_{p}" if len(pieces) > 1 else ""
+                ))
+            body = split_loops
+            levels = range(split)
+        nest = self.loop_nest(all_vars, new_bounds, levels, body, separate_bounds, assumptions)
+        return nest[0] if len(nest) == 1 else BlockStatement(tuple(nest))
 
-        last_loop = None
-        last_bounds = None
-        for i, new_idx in reversed(list(enumerate(indexes))):
-            lb, _ = parse_expression(sp.ccode(new_bounds[new_idx][0]))
-            ub, _ = parse_expression(sp.ccode(new_bounds[new_idx][1]))
-
-            if last_loop is None:
-                reverse_declarations = self.generate_reversed_index_declarations(
-                    old_indexes,
-                    indexes,
-                    inverted_allocation
-                )
-                body = list(reverse_declarations) + list(statements)
-            else:
-                body = [last_loop]
-            
-            if last_bounds is not None:
-                body = last_bounds + body
-            
+    def loop_nest(
+        self,
+        indexes: tuple[sp.core.symbol.Symbol],
+        bounds: dict[sp.core.symbol.Symbol, (sp.core.expr.Expr, sp.core.expr.Expr)],
+        levels: list[int],
+        body: list,
+        separate_bounds: bool = False,
+        assumptions: tuple[AssumptionStatement] = (),
+        suffix: str = ""
+    ) -> list:
+        # The loops of the <levels> of the nest around <body>, the outermost
+        # one after the declarations of its bounds when they are separate
+        statements = list(body)
+        for i in reversed(levels):
+            index = indexes[i]
+            lb = to_expression(bounds[index][0])
+            ub = to_expression(bounds[index][1])
+            declarations = []
             if i >= 1 and separate_bounds:
                 lb_decl = DeclarationStatement(
                     var_type="int",
-                    variable=VariableExpression(new_indexes[i].name + "_lb"),
+                    variable=VariableExpression(index.name + "_lb" + suffix),
                     initialization=lb
                 )
                 ub_decl = DeclarationStatement(
                     var_type="int",
-                    variable=VariableExpression(new_indexes[i].name + "_ub"),
+                    variable=VariableExpression(index.name + "_ub" + suffix),
                     initialization=ub
                 )
                 lb = lb_decl.variable
                 ub = ub_decl.variable
-                last_bounds = [lb_decl, ub_decl]
-
-            
-            last_loop = ForLoopStatement(
-                body=tuple(body),
-                index=VariableExpression(repr(new_idx)),
+                declarations = [lb_decl, ub_decl]
+            statements = declarations + [ForLoopStatement(
+                body=tuple(statements),
+                index=VariableExpression(index.name),
                 lowerbound=lb,
                 upperbound=ub,
-                is_parallel=(i == 1)
-            )
-        return last_loop
+                is_parallel=(i == 1),
+                assumptions=assumptions if i == 0 else ()
+            )]
+        return statements
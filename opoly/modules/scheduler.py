@@ -1,28 +1,356 @@
 from abc import ABC
-from datetime import timedelta
+import functools
+import itertools
+import math
 
 import numpy as np
-import pymzn
 
-from opoly.modules.minizinc import LAMPORT_SCHEDULER_PATH
-from opoly.modules.minizinc.utils import solve_model
+from opoly.modules.minizinc import LAMPORT_SCHEDULER_PATH, LAMPORT_SCHEDULER_BATCH_PATH
+from opoly.modules.minizinc.utils import solve_model, scaled_timeout
+from opoly.modules.minizinc.portfolio import SolverPortfolio
+from opoly.modules.memo import LRUMemo, DEFAULT_MEMO_CAPACITY, canonical_dependencies, matrix_key
+
+DEFAULT_MAX_CANDIDATES = 1_000_000
 
 
 class LamportCPScheduler(ABC):
 
-    def schedule(self, deps: np.ndarray) -> (np.ndarray, str):
+    def __init__(self, portfolio: SolverPortfolio = None, timeout: int = None, signed: bool = False):
+        self._portfolio = portfolio
+        self._timeout = timeout
+        self._signed = signed
+
+    @property
+    def signed(self) -> bool:
+        # Whether the schedules may have negative coefficients
+        return self._signed
+
+    def timeout(self, size: int) -> int:
+        # Scaled with the size of the dependency matrices when not fixed
+        return self._timeout if self._timeout is not None else scaled_timeout(size)
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        # With <weights> the weighted sum of the coefficients is minimized
+        # instead of the latency
         if len(deps.shape) != 2:
             return None, "Dependencies must be a matrix!"
         if not issubclass(deps.dtype.type, np.integer):
             return None, "Dependencies must be integers!"
+        if not valid_weights(deps, weights):
+            return None, "Weights must be positive integers, one for each index!"
         sol, err = solve_model(
             model=LAMPORT_SCHEDULER_PATH,
             data={
                 "r": deps.shape[0],
                 "n": deps.shape[1],
-                "D": deps.tolist()
-            }
+                "D": deps.tolist(),
+                "w": unit_weights(deps, weights).tolist(),
+                "signed": self._signed
+            },
+            timeout=self.timeout(deps.size),
+            portfolio=self._portfolio
         )
         if sol is None:
             return None, err
-        return np.array(sol["tau"]), None
+        return np.array(sol["tau"]), err
+
+    def candidates(self, deps: np.ndarray, tolerance: int = 0) -> list[np.ndarray]:
+        # The schedules whose latency is within <tolerance> of the minimal one,
+        # only the optimal schedule found by the solver for the CP model
+        schedule, _ = self.schedule(deps)
+        return [schedule] if schedule is not None else []
+
+    def schedule_batch(
+        self,
+        deps_list: list[np.ndarray],
+        weights_list: list[np.ndarray] = None
+    ) -> list[tuple[np.ndarray, str]]:
+        # The instances are independent sub-problems of a single model, so
+        # MiniZinc is started and flattens a model once for the whole batch
+        weights_list = weights_list if weights_list is not None else [None] * len(deps_list)
+        results = [None] * len(deps_list)
+        batch = []
+        for i, (deps, weights) in enumerate(zip(deps_list, weights_list)):
+            if len(deps.shape) == 2 and issubclass(deps.dtype.type, np.integer) and valid_weights(deps, weights):
+                batch.append(i)
+            else:
+                results[i] = self.schedule(deps, weights)
+        if len(batch) == 1:
+            results[batch[0]] = self.schedule(deps_list[batch[0]], weights_list[batch[0]])
+        elif len(batch) > 1:
+            sol, err = solve_model(
+                model=LAMPORT_SCHEDULER_BATCH_PATH,
+                data=batch_data([deps_list[i] for i in batch], [weights_list[i] for i in batch], self._signed),
+                timeout=self.timeout(sum(deps_list[i].size for i in batch)),
+                portfolio=self._portfolio
+            )
+            for b, i in enumerate(batch):
+                if sol is None:
+                    # A single unsatisfiable instance makes the whole batch
+                    # unsatisfiable, each one is solved alone to find it
+                    results[i] = self.schedule(deps_list[i], weights_list[i])
+                else:
+                    results[i] = np.array(sol["tau"][b][:deps_list[i].shape[1]]), err
+        return results
+
+
+def valid_weights(deps: np.ndarray, weights: np.ndarray) -> bool:
+    if weights is None:
+        return True
+    return weights.shape == (deps.shape[1],) and issubclass(weights.dtype.type, np.integer) and \
+        bool(np.all(weights > 0))
+
+
+def unit_weights(deps: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+    # Unit weights minimize the latency
+    return weights.astype(np.int64) if weights is not None else np.ones(deps.shape[1], dtype=np.int64)
+
+
+def normalized_weights(weights: np.ndarray) -> np.ndarray:
+    # Weights scaled by a positive factor have the same optimal schedules,
+    # and equal weights the same ones as the latency
+    if weights is None:
+        return None
+    weights = weights.astype(np.int64) // np.gcd.reduce(weights.astype(np.int64))
+    return weights if np.any(weights != 1) else None
+
+
+def batch_data(deps_list: list[np.ndarray], weights_list: list[np.ndarray] = None, signed: bool = False) -> dict:
+    # Dependency matrices padded with zeros to the largest one
+    weights_list = weights_list if weights_list is not None else [None] * len(deps_list)
+    max_r = max(1, max(deps.shape[0] for deps in deps_list))
+    max_n = max(1, max(deps.shape[1] for deps in deps_list))
+    padded = np.zeros((len(deps_list), max_r, max_n), dtype=np.int64)
+    padded_weights = np.ones((len(deps_list), max_n), dtype=np.int64)
+    for b, (deps, weights) in enumerate(zip(deps_list, weights_list)):
+        padded[b, :deps.shape[0], :deps.shape[1]] = deps
+        padded_weights[b, :deps.shape[1]] = unit_weights(deps, weights)
+    return {
+        "k": len(deps_list),
+        "n": [deps.shape[1] for deps in deps_list],
+        "r": [deps.shape[0] for deps in deps_list],
+        "max_n": max_n,
+        "max_r": max_r,
+        "D": padded.tolist(),
+        "w": padded_weights.tolist(),
+        "signed": signed
+    }
+
+
+def schedule_key(deps: np.ndarray, weights: np.ndarray = None) -> tuple:
+    return matrix_key(deps) if weights is None else (matrix_key(deps), matrix_key(weights))
+
+
+class MemoizedScheduler(LamportCPScheduler):
+
+    def __init__(self, scheduler: LamportCPScheduler = None, capacity: int = DEFAULT_MEMO_CAPACITY):
+        self._scheduler = scheduler if scheduler is not None else LamportCPScheduler()
+        self._memo = LRUMemo(capacity)
+
+    @property
+    def memo(self) -> LRUMemo:
+        return self._memo
+
+    @property
+    def signed(self) -> bool:
+        return self._scheduler.signed
+
+    def timeout(self, size: int) -> int:
+        return self._scheduler.timeout(size)
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        if len(deps.shape) != 2 or not issubclass(deps.dtype.type, np.integer) or \
+                not valid_weights(deps, weights):
+            return self._scheduler.schedule(deps, weights)
+        canonical_deps = canonical_dependencies(deps)
+        weights = normalized_weights(weights)
+        key = schedule_key(canonical_deps, weights)
+        found, schedule = self._memo.get(key)
+        if found:
+            return schedule.copy(), None
+        schedule, err = self._scheduler.schedule(canonical_deps, weights)
+        # Schedules not proven optimal may improve with another try
+        if schedule is None or err is not None:
+            return schedule, err
+        self._memo.put(key, schedule.copy())
+        return schedule, None
+
+    def candidates(self, deps: np.ndarray, tolerance: int = 0) -> list[np.ndarray]:
+        return self._scheduler.candidates(deps, tolerance)
+
+    def schedule_batch(
+        self,
+        deps_list: list[np.ndarray],
+        weights_list: list[np.ndarray] = None
+    ) -> list[tuple[np.ndarray, str]]:
+        weights_list = weights_list if weights_list is not None else [None] * len(deps_list)
+        results = [None] * len(deps_list)
+        # Only the distinct dependence patterns missing from the memo are solved
+        misses = {}
+        for i, (deps, weights) in enumerate(zip(deps_list, weights_list)):
+            if len(deps.shape) != 2 or not issubclass(deps.dtype.type, np.integer) or \
+                    not valid_weights(deps, weights):
+                results[i] = self._scheduler.schedule(deps, weights)
+                continue
+            canonical_deps = canonical_dependencies(deps)
+            weights = normalized_weights(weights)
+            key = schedule_key(canonical_deps, weights)
+            found, schedule = self._memo.get(key)
+            if found:
+                results[i] = schedule.copy(), None
+            else:
+                misses.setdefault(key, (canonical_deps, weights, []))[2].append(i)
+        solved = self._scheduler.schedule_batch(
+            [canonical_deps for canonical_deps, _, _ in misses.values()],
+            [weights for _, weights, _ in misses.values()]
+        )
+        for (key, (_, _, indexes)), (schedule, err) in zip(misses.items(), solved):
+            if schedule is not None and err is None:
+                self._memo.put(key, schedule.copy())
+            for i in indexes:
+                results[i] = (schedule.copy() if schedule is not None else None), err
+        return results
+
+
+
+@functools.lru_cache(maxsize=256)
+def compositions(total: int, parts: int) -> np.ndarray:
+    # All the vectors of <parts> nonnegative integers summing to <total>,
+    # in lexicographic order, as the rows of a read-only matrix
+    if parts == 1:
+        res = np.array([[total]], dtype=np.int64)
+    else:
+        bars = np.array(list(itertools.combinations(range(total + parts - 1), parts - 1)),
+                        dtype=np.int64).reshape(-1, parts - 1)
+        edges = np.hstack([
+            np.full((bars.shape[0], 1), -1, dtype=np.int64),
+            bars,
+            np.full((bars.shape[0], 1), total + parts - 1, dtype=np.int64)
+        ])
+        res = np.diff(edges, axis=1) - 1
+    res.setflags(write=False)
+    return res
+
+
+@functools.lru_cache(maxsize=256)
+def signed_compositions(total: int, parts: int) -> np.ndarray:
+    # All the vectors of <parts> integers whose absolute values sum to
+    # <total>, by increasing number of negative entries, then in the
+    # lexicographic order of their absolute values
+    comps = compositions(total, parts)
+    signs = sorted(itertools.product((1, -1), repeat=parts), key=lambda sign: sign.count(-1))
+    blocks = []
+    for sign in signs:
+        sign = np.array(sign, dtype=np.int64)
+        # Zero entries are not negated, or the vectors would be repeated
+        blocks.append(comps[np.all((sign > 0) | (comps > 0), axis=1)] * sign)
+    res = np.vstack(blocks)
+    res.setflags(write=False)
+    return res
+
+
+class LamportEnumerationScheduler(LamportCPScheduler):
+
+    def __init__(
+        self,
+        max_candidates: int = DEFAULT_MAX_CANDIDATES,
+        fallback: LamportCPScheduler = None,
+        signed: bool = False
+    ):
+        super().__init__(signed=signed)
+        self._max_candidates = max_candidates
+        self._fallback = fallback if fallback is not None else LamportCPScheduler(signed=signed)
+
+    def _layer(self, total: int, n: int) -> np.ndarray:
+        # The candidate schedules of latency <total>
+        return signed_compositions(total, n) if self._signed else compositions(total, n)
+
+    def _layer_size(self, total: int, n: int) -> int:
+        # An upper bound of the number of candidates of latency <total>
+        return math.comb(total + n - 1, n - 1) * (2 ** n if self._signed else 1)
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        res = self._enumerate(deps, weights)
+        if res[0] is None and res[1] is None:
+            return self._fallback.schedule(deps, weights)
+        return res
+
+    def candidates(self, deps: np.ndarray, tolerance: int = 0) -> list[np.ndarray]:
+        # Ordered by increasing latency, ties lexicographically
+        if len(deps.shape) != 2 or not issubclass(deps.dtype.type, np.integer):
+            return []
+        deps = deps.astype(np.int64)
+        if deps.shape[0] > 0 and np.any(np.all(deps <= 0 if not self._signed else deps == 0, axis=1)):
+            return []
+        n = deps.shape[1]
+        found = []
+        min_total = None
+        candidates = 0
+        total = 0
+        while min_total is None or total <= min_total + tolerance:
+            candidates += self._layer_size(total, n)
+            if candidates > self._max_candidates:
+                return self._fallback.candidates(deps, tolerance)
+            taus = self._layer(total, n)
+            valid = np.all(deps @ taus.T > 0, axis=0)
+            if valid.any():
+                found.extend(tau.copy() for tau in taus[valid])
+                min_total = min_total if min_total is not None else total
+            total += 1
+        return found
+
+    def schedule_batch(
+        self,
+        deps_list: list[np.ndarray],
+        weights_list: list[np.ndarray] = None
+    ) -> list[tuple[np.ndarray, str]]:
+        weights_list = weights_list if weights_list is not None else [None] * len(deps_list)
+        results = [self._enumerate(deps, weights) for deps, weights in zip(deps_list, weights_list)]
+        # The dependencies with too many candidates are solved together
+        pending = [i for i, res in enumerate(results) if res[0] is None and res[1] is None]
+        if len(pending) > 0:
+            solved = self._fallback.schedule_batch(
+                [deps_list[i] for i in pending], [weights_list[i] for i in pending])
+            for i, res in zip(pending, solved):
+                results[i] = res
+        return results
+
+    def _enumerate(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        # Returns (None, None), neither a schedule nor an error, when there
+        # are too many candidate schedules to enumerate
+        if len(deps.shape) != 2:
+            return None, "Dependencies must be a matrix!"
+        if not issubclass(deps.dtype.type, np.integer):
+            return None, "Dependencies must be integers!"
+        if not valid_weights(deps, weights):
+            return None, "Weights must be positive integers, one for each index!"
+        deps = deps.astype(np.int64)
+        weights = unit_weights(deps, weights)
+        # A dependency without positive entries cannot be satisfied
+        # by a nonnegative schedule, a zero one by any schedule
+        if deps.shape[0] > 0 and np.any(np.all(deps <= 0 if not self._signed else deps == 0, axis=1)):
+            return None, "Unsatisfiable!"
+        n = deps.shape[1]
+        min_weight = int(weights.min()) if n > 0 else 1
+        # Schedules are tried by increasing latency, every schedule of a
+        # latency costs at least latency * min_weight, so the search stops
+        # once no other schedule can cost less than the best one. Ties are
+        # broken by the lowest latency, then the fewest negative coefficients
+        # and the lexicographically smallest.
+        best = None
+        best_cost = None
+        candidates = 0
+        total = 0
+        while best_cost is None or total * min_weight < best_cost:
+            candidates += self._layer_size(total, n)
+            if candidates > self._max_candidates:
+                return None, None
+            taus = self._layer(total, n)
+            valid = taus[np.all(deps @ taus.T > 0, axis=0)]
+            if valid.shape[0] > 0:
+                costs = np.abs(valid) @ weights
+                k = int(np.argmin(costs))
+                if best_cost is None or costs[k] < best_cost:
+                    best, best_cost = valid[k].copy(), int(costs[k])
+            total += 1
+        return best, None
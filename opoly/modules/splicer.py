@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import contextlib
+import mmap
+import re
+from typing import BinaryIO, Iterator
+
+PRAGMA_PREFIX = b"#pragma"
+PRAGMA_POLY_REGEX = re.compile(rb"#pragma\s+omp\s+parallel\s+poly")
+PRAGMA_END_REGEX = re.compile(rb"#pragma\s+end")
+CHUNK_SIZE = 64 * 1024
+
+
+class PragmaRegion():
+
+    def __init__(self,
+                 start: int,
+                 end: int,
+                 code: str,
+                 line: int,
+                 end_line: int,
+                 indentation: str = ""
+                 ):
+        self._start = start
+        self._end = end
+        self._code = code
+        self._line = line
+        self._end_line = end_line
+        self._indentation = indentation
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def code(self) -> str:
+        return self._code
+
+    @property
+    def line(self) -> int:
+        return self._line
+
+    @property
+    def end_line(self) -> int:
+        return self._end_line
+
+    @property
+    def indentation(self) -> str:
+        return self._indentation
+
+
+@contextlib.contextmanager
+def map_file(file: BinaryIO):
+    file.seek(0, 2)
+    if file.tell() == 0:
+        # Empty files cannot be memory-mapped
+        yield b""
+        return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        yield buffer
+
+
+def count_newlines(buffer, start: int, end: int) -> int:
+    count = 0
+    for chunk_start in range(start, end, CHUNK_SIZE):
+        count += buffer[chunk_start:min(chunk_start + CHUNK_SIZE, end)].count(b"\n")
+    return count
+
+
+def find_pragma(buffer, regex: re.Pattern, pos: int) -> re.Match:
+    # Only the positions of the #pragma prefix are tried, so every byte
+    # of the input is looked at a bounded number of times
+    while True:
+        pos = buffer.find(PRAGMA_PREFIX, pos)
+        if pos < 0:
+            return None
+        match = regex.match(buffer, pos)
+        if match is not None:
+            return match
+        pos += len(PRAGMA_PREFIX)
+
+
+def line_indentation(buffer, pos: int) -> str:
+    line_start = buffer.rfind(b"\n", 0, pos) + 1
+    prefix = buffer[line_start:pos]
+    return prefix.decode("utf-8") if len(prefix.strip()) == 0 else ""
+
+
+def find_pragma_regions(buffer) -> Iterator[PragmaRegion]:
+    pos = 0
+    line = 1
+    while True:
+        start_match = find_pragma(buffer, PRAGMA_POLY_REGEX, pos)
+        if start_match is None:
+            return
+        end_match = find_pragma(buffer, PRAGMA_END_REGEX, start_match.end())
+        if end_match is None:
+            return
+        line += count_newlines(buffer, pos, start_match.start())
+        end_line = line + count_newlines(buffer, start_match.start(), end_match.start())
+        yield PragmaRegion(
+            start=start_match.start(),
+            end=end_match.end(),
+            code=buffer[start_match.end():end_match.start()].decode("utf-8"),
+            line=line,
+            end_line=end_line,
+            indentation=line_indentation(buffer, start_match.start())
+        )
+        pos = end_match.start()
+        line = end_line
+
+
+def copy_range(buffer, output: BinaryIO, start: int, end: int):
+    for chunk_start in range(start, end, CHUNK_SIZE):
+        output.write(buffer[chunk_start:min(chunk_start + CHUNK_SIZE, end)])
+
+
+def line_marker(line: int, filename: str) -> str:
+    escaped_filename = filename.replace("\\", "\\\\").replace('"', '\\"')
+    return f'#line {line} "{escaped_filename}"'
+
+
+def splice_regions(
+    buffer,
+    output: BinaryIO,
+    regions: list[PragmaRegion],
+    replacements: list[str],
+    filename: str = None
+):
+    pos = 0
+    for region, replacement in zip(regions, replacements):
+        if replacement is None:
+            # The region is kept as it is
+            continue
+        copy_range(buffer, output, pos, region.start)
+        # The first line is already indented by the original source
+        lines = replacement.split("\n")
+        if filename is not None:
+            lines = [line_marker(region.line, filename)] + lines
+        new_code = ("\n" + region.indentation).join(lines)
+        if filename is not None:
+            # Resynchronize the line numbers with the rest of the pragma end line
+            new_code += "\n" + region.indentation + line_marker(region.end_line, filename) + "\n"
+        output.write(new_code.encode("utf-8"))
+        pos = region.end
+    copy_range(buffer, output, pos, len(buffer))
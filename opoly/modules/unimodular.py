@@ -0,0 +1,174 @@
+from fractions import Fraction
+import math
+
+
+def vector_gcd(vec: list[int]) -> int:
+    res = 0
+    for v in vec:
+        res = math.gcd(res, v)
+    return res
+
+
+def integer_determinant(mat: list[list[int]]) -> int:
+    # Fraction-free Bareiss elimination, every intermediate value is an integer
+    n = len(mat)
+    if n == 0:
+        return 1
+    m = [list(row) for row in mat]
+    sign = 1
+    prev = 1
+    for k in range(n - 1):
+        if m[k][k] == 0:
+            swap = next((i for i in range(k + 1, n) if m[i][k] != 0), None)
+            if swap is None:
+                return 0
+            m[k], m[swap] = m[swap], m[k]
+            sign = -sign
+        for i in range(k + 1, n):
+            for j in range(k + 1, n):
+                m[i][j] = (m[i][j] * m[k][k] - m[i][k] * m[k][j]) // prev
+        prev = m[k][k]
+    return sign * m[n - 1][n - 1]
+
+
+def integer_inverse(mat: list[list[int]]) -> list[list[int]]:
+    n = len(mat)
+    aug = [[Fraction(v) for v in row] + [Fraction(int(i == j)) for j in range(n)]
+           for i, row in enumerate(mat)]
+    for col in range(n):
+        pivot = next((i for i in range(col, n) if aug[i][col] != 0), None)
+        if pivot is None:
+            raise ValueError("Matrix is singular!")
+        aug[col], aug[pivot] = aug[pivot], aug[col]
+        pivot_value = aug[col][col]
+        aug[col] = [v / pivot_value for v in aug[col]]
+        for i in range(n):
+            if i != col and aug[i][col] != 0:
+                factor = aug[i][col]
+                aug[i] = [v - factor * p for v, p in zip(aug[i], aug[col])]
+    inverse = [row[n:] for row in aug]
+    if any(v.denominator != 1 for row in inverse for v in row):
+        raise ValueError("Matrix inverse is not integer!")
+    return [[int(v) for v in row] for row in inverse]
+
+
+def two_support_solutions(a: int, b: int, signed: bool = False) -> list[tuple[int, int]]:
+    # Nonnegative (x, y) with a*y - b*x = +-1, or of any sign if <signed>,
+    # the cheapest solution of every family has |x| <= |a| or |y| <= |b|,
+    # larger ones are never better
+    solutions = set()
+    for s in (1, -1):
+        if b == 0:
+            if a * a == 1:
+                solutions.add((0, s * a))
+            continue
+        if a == 0:
+            if b * b == 1:
+                solutions.add((-s * b, 0))
+            continue
+        for y in range(-abs(b) if signed else 0, abs(b) + 1):
+            if (a * y - s) % b == 0:
+                solutions.add(((a * y - s) // b, y))
+        for x in range(-abs(a) if signed else 0, abs(a) + 1):
+            if (b * x + s) % a == 0:
+                solutions.add((x, (b * x + s) // a))
+    # Nonnegative solutions first, so they win the ties of cost
+    return sorted(((x, y) for x, y in solutions if signed or (x >= 0 and y >= 0)),
+                  key=lambda sol: (min(sol) < 0, sol))
+
+
+def allocation_cost(rows: list[list[int]]) -> int:
+    # Objective of the allocator model, rows start from the second one
+    return sum(abs(v) * (1 + abs(i - j))
+               for i, row in enumerate(rows, start=1)
+               for j, v in enumerate(row))
+
+
+def arrange_rows(n: int, special_row: list[int], unit_columns: list[int]) -> list[list[int]]:
+    # Unit rows are cheapest in the same order as their columns, only the
+    # position of the special row has to be searched
+    best_rows = None
+    best_cost = None
+    for pos in range(n - 1):
+        columns = iter(unit_columns)
+        rows = []
+        for i in range(n - 1):
+            if i == pos:
+                rows.append(special_row)
+            else:
+                col = next(columns)
+                rows.append([int(j == col) for j in range(n)])
+        cost = allocation_cost(rows)
+        if best_cost is None or cost < best_cost:
+            best_rows, best_cost = rows, cost
+    return best_rows
+
+
+def gcd_completion(tau: list[int]) -> list[list[int]]:
+    # Completes a tau of coprime entries into a unimodular matrix by
+    # extended GCD column operations: they reduce tau to a unit vector,
+    # tau V = e1, so tau is the first row of the inverse of V. Columns where
+    # tau is zero get unit rows. A nonnegative tau gets nonnegative rows,
+    # adding to each row a multiple of tau, which keeps the determinant.
+    n = len(tau)
+    support = [j for j in range(n) if tau[j] != 0]
+    a = [tau[j] for j in support]
+    m = len(a)
+    v = [[int(i == j) for j in range(m)] for i in range(m)]
+    while sum(1 for x in a if x != 0) > 1:
+        i = min((k for k in range(m) if a[k] != 0), key=lambda k: abs(a[k]))
+        for j in range(m):
+            if j != i and a[j] != 0:
+                q = a[j] // a[i]
+                a[j] -= q * a[i]
+                for row in v:
+                    row[j] -= q * row[i]
+    i = next(k for k in range(m) if a[k] != 0)
+    for row in v:
+        row[0], row[i] = row[i] * a[i], row[0]
+    sub_rows = integer_inverse(v)[1:]
+    if not any(x < 0 for x in tau):
+        t = [tau[j] for j in support]
+        for row in sub_rows:
+            k = max([0] + [-(row[c] // t[c]) for c in range(m) if row[c] < 0])
+            row[:] = [x + k * y for x, y in zip(row, t)]
+    rows = []
+    for row in sub_rows:
+        full_row = [0] * n
+        for c, j in enumerate(support):
+            full_row[j] = row[c]
+        rows.append(full_row)
+    rows += [[int(i == j) for i in range(n)] for j in range(n) if tau[j] == 0]
+    return [list(tau)] + rows
+
+
+def unimodular_completion(tau: list[int]) -> list[list[int]]:
+    # Completes tau with nonnegative rows into a unimodular matrix: one row
+    # supported on two columns p and q whose 2x2 minor with tau is +-1, and
+    # unit vectors for every other column. A +-1 entry of tau is the case
+    # of a unit vector pivot. A tau with negative entries is completed with
+    # signed rows, like the allocator model does. A tau of coprime entries
+    # without a coprime pair is completed by extended GCD, any other tau
+    # has no completion and None is returned.
+    n = len(tau)
+    signed = any(v < 0 for v in tau)
+    if n == 1:
+        return [list(tau)] if abs(tau[0]) == 1 else None
+    best = None
+    best_cost = None
+    for p in range(n):
+        for q in range(n):
+            if p == q or math.gcd(tau[p], tau[q]) != 1:
+                continue
+            unit_columns = [j for j in range(n) if j not in (p, q)]
+            for x, y in two_support_solutions(tau[p], tau[q], signed):
+                special_row = [0] * n
+                special_row[p] = x
+                special_row[q] = y
+                rows = arrange_rows(n, special_row, unit_columns)
+                cost = allocation_cost(rows)
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = [list(tau)] + rows, cost
+    if best is None and vector_gcd(tau) == 1:
+        return gcd_completion(tau)
+    return best
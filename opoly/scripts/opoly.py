@@ -1,77 +1,219 @@
+from __future__ import annotations
+
 import argparse
+import contextlib
+import functools
 import pathlib
 import logging
 import re
+import sys
+from typing import TYPE_CHECKING
+
+from opoly.modules.compiler import Compiler, CompilationError
+from opoly.modules.cache import (
+    CompilationCache,
+    CompiledLoop,
+    loop_cache_key,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_SIZE
+)
+from opoly.modules.profiler import Profiler, profile_region, profile_stage, profile_count
+from opoly.scripts.utils import setup_logger, parse_parameter, parse_assumption
+from opoly.scripts.opoly_server import request_compile, DEFAULT_SOCKET_PATH
+
+# What the solver portfolio learned is kept next to the cache, not in it,
+# where it would be evicted as an entry
+DEFAULT_PORTFOLIO_STATE = DEFAULT_CACHE_DIR.with_name("opoly-portfolio.json")
+
+# numpy, sympy and pymzn are only imported when a loop with dependencies
+# has to be scheduled, to keep the command line startup fast
+if TYPE_CHECKING:
+    from opoly.statements import AssumptionStatement
+    from opoly.modules.scheduler import LamportCPScheduler
+    from opoly.modules.allocator import LamportCPAllocator
+
+
+# Shared by every loop compiled in this process, so that each distinct
+# dependence pattern is solved only once
+@functools.lru_cache(maxsize=None)
+def _default_compiler(signed_schedules: bool, portfolio: pathlib.Path) -> Compiler:
+    solver_portfolio = None
+    if portfolio is not None:
+        # The models are raced by the portfolio, which learns into the given state file
+        from opoly.modules.minizinc.portfolio import SolverPortfolio
+        pathlib.Path(portfolio).parent.mkdir(parents=True, exist_ok=True)
+        solver_portfolio = SolverPortfolio(state_file=str(portfolio))
+    return Compiler(signed_schedules=signed_schedules, portfolio=solver_portfolio)
+
+
+def default_compiler(signed_schedules: bool = False, portfolio: pathlib.Path = None) -> Compiler:
+    return _default_compiler(signed_schedules, portfolio)
+
+
+def default_scheduler(signed_schedules: bool = False, portfolio: pathlib.Path = None) -> LamportCPScheduler:
+    return default_compiler(signed_schedules, portfolio).scheduler
 
-import numpy as np
 
-from opoly.modules.parser import PseudocodeForLoopParser
-from opoly.modules.checker import LamportForLoopChecker
-from opoly.modules.detector import LamportLoopDependenciesDetector
-from opoly.modules.scheduler import LamportCPScheduler
-from opoly.modules.allocator import LamportCPAllocator
-from opoly.modules.scanner import FourierMotzkinScanner
-from opoly.modules.generator import CCodeGenerator, PseudoCodeGenerator
+def default_allocator(portfolio: pathlib.Path = None) -> LamportCPAllocator:
+    return default_compiler(portfolio=portfolio).allocator
+
+
+def make_compiler(
+    scheduler: LamportCPScheduler = None,
+    allocator: LamportCPAllocator = None,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    portfolio: pathlib.Path = None
+) -> Compiler:
+    if scheduler is None and allocator is None and parameters is None and schedule_objective == "LATENCY" and \
+            not assumptions and not split_index_sets:
+        return default_compiler(signed_schedules, portfolio)
+    # The solvers are still shared with the default compiler
+    return Compiler(
+        scheduler=scheduler if scheduler is not None else default_scheduler(signed_schedules, portfolio),
+        allocator=allocator if allocator is not None else default_allocator(portfolio),
+        parameters=parameters,
+        schedule_tolerance=schedule_tolerance,
+        schedule_objective=schedule_objective,
+        signed_schedules=signed_schedules,
+        assumptions=assumptions,
+        split_index_sets=split_index_sets
+    )
+
+
+def compile_loop(
+    code: str,
+    out_format: str = "CCODE",
+    cache: CompilationCache = None,
+    scheduler: LamportCPScheduler = None,
+    allocator: LamportCPAllocator = None,
+    name: str = None,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    compiler: Compiler = None,
+    portfolio: pathlib.Path = None
+) -> (CompiledLoop, str):
+    # Callers compiling many loops with the same options pass their compiler
+    if compiler is None:
+        compiler = make_compiler(
+            scheduler, allocator, parameters, schedule_tolerance, schedule_objective, signed_schedules,
+            assumptions, split_index_sets, portfolio)
+    with profile_region(name):
+        try:
+            return _compile_loop(compiler, code, out_format, cache), None
+        except CompilationError as ex:
+            return None, str(ex)
+
+
+def _compile_loop(
+    compiler: Compiler,
+    code: str,
+    out_format: str,
+    cache: CompilationCache
+) -> CompiledLoop:
+    logger = logging.getLogger("logger_opoly")
+
+    loop = compiler.parse(code)
+    key = None
+    if cache is not None:
+        with profile_stage("cache_lookup"):
+            key = loop_cache_key(
+                loop, out_format, compiler.parameters, compiler.schedule_tolerance, compiler.schedule_objective,
+                compiler.signed_schedules, compiler.assumptions, compiler.split_index_sets)
+            compiled = cache.get(key)
+        if compiled is not None:
+            logger.debug("Compiled loop found in cache")
+            profile_count("cache_hits")
+            return compiled
+
+    result = compiler.compile_loop(loop, out_format)
+    compiled = CompiledLoop(
+        code=result.code,
+        dependencies=list(list(d.converted_values) for d in result.dependencies),
+        schedule=result.schedule.tolist() if result.schedule is not None else None,
+        allocation=result.allocation.tolist() if result.allocation is not None else None
+    )
+    # Loops not proven optimal are compiled again next time
+    if cache is not None and result.optimal:
+        logger.debug("Storing compiled loop in cache")
+        cache.put(key, compiled)
+    return compiled
+
+
+def write_profile(profiler: Profiler, profile_file: pathlib.Path):
+    if str(profile_file) == "-":
+        print(profiler.to_json(indent=4), file=sys.stderr)
+    else:
+        with open(profile_file, "w") as file:
+            file.write(profiler.to_json(indent=4))
 
 
 def opoly(
     input_file: pathlib.Path,
     output_file: pathlib.Path = None,
     out_format: str = "CCODE",
-    verbose: bool = False
+    verbose: bool = False,
+    cache_dir: pathlib.Path = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    socket_path: pathlib.Path = DEFAULT_SOCKET_PATH,
+    profile_file: pathlib.Path = None,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    portfolio: pathlib.Path = None
 ):
-    logger = logging.getLogger("logger_opoly")
-    sh = logging.StreamHandler()
-    sh_formatter = logging.Formatter("%(levelname)s - %(message)s")
-    sh.setFormatter(sh_formatter)
-    logger.addHandler(sh)
-    if verbose:
-        logger.setLevel(logging.DEBUG)
-    else:
-        logger.setLevel(logging.INFO)
+    logger = setup_logger(verbose)
     try:
         logger.debug("Reading input file")
         with open(input_file, "r") as file:
             code = file.read()
 
-        logger.debug("Parsing code")
-        loop, err = PseudocodeForLoopParser().parse_for_loop(code)
-        if loop is None:
-            logger.error("Error while parsing code: " + err)
-            return
-
-        logger.debug("Checking code")
-        ok, err = LamportForLoopChecker().check(loop)
-        if not ok:
-            logger.error("Error while checking code: " + err)
-            return
-
-        logger.debug("Detecting code dependencies")
-        deps = LamportLoopDependenciesDetector().extract_dependencies(loop)
-        if len(deps) == 0:
-            logger.warning(
-                "No dependecies found in code. Skipping optimization")
-        else:
-            deps_np = np.array(list(list(d.converted_values)
-                                    for d in deps))
+        cache = None
+        if cache_dir is not None:
+            cache = CompilationCache(cache_dir, cache_size)
 
-            logger.debug("Scheduling loop")
-            schedule, err = LamportCPScheduler().schedule(deps_np)
-            if schedule is None:
-                logger.error("Error while scheduling loop: " + err)
+        response = None
+        # Profiling measures this process and the server neither ranks nor
+        # weights schedules nor knows the assumptions nor splits loops nor
+        # races solvers, so the server is not used for them
+        if socket_path is not None and profile_file is None and parameters is None and \
+                schedule_objective == "LATENCY" and not signed_schedules and not assumptions and \
+                not split_index_sets and portfolio is None:
+            response = request_compile(code, out_format, socket_path, cache=cache, verbose=verbose)
+        if response is not None:
+            logger.debug(f"Compiled by server on {socket_path}")
+            for diagnostic in response["diagnostics"]:
+                logger.log(logging.getLevelName(diagnostic["level"]), diagnostic["message"])
+            if response["error"] is not None:
+                logger.error(response["error"])
                 return
-
-            logger.debug("Allocating loop")
-            allocation, err = LamportCPAllocator().allocate(schedule)
-            if allocation is None:
-                logger.error("Error while allocating loop: " + err)
+            new_code = response["code"]
+        else:
+            profiler = Profiler() if profile_file is not None else None
+            with profiler or contextlib.nullcontext():
+                compiled, err = compile_loop(
+                    code, out_format, cache, parameters=parameters, schedule_tolerance=schedule_tolerance,
+                    schedule_objective=schedule_objective, signed_schedules=signed_schedules,
+                    assumptions=assumptions, split_index_sets=split_index_sets, portfolio=portfolio)
+            if profiler is not None:
+                write_profile(profiler, profile_file)
+            if cache is not None:
+                logger.debug(f"Cache hits: {cache.hits}, misses: {cache.misses}")
+            if compiled is None:
+                logger.error(err)
                 return
-
-            logger.debug("Reindexing loop")
-            loop = FourierMotzkinScanner().reindex(loop, allocation, separate_bounds=out_format == "CCODE")
-        logger.debug("Generating code")
-        generator = CCodeGenerator() if out_format == "CCODE" else PseudoCodeGenerator()
-        new_code = generator.generate(loop)
+            new_code = compiled.code
 
         if output_file is None:
             print(new_code)
@@ -85,12 +227,18 @@ def opoly(
 
 
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        from opoly.scripts.opoly_server import main as serve_main
+        serve_main(sys.argv[2:])
+        return
     argument_parser = argparse.ArgumentParser(
+        epilog="run 'opoly serve -h' for the resident compile server options",
         description="A simple OpenMP polyhedral compiler for C programs"
     )
     argument_parser.add_argument(
         "file",
         type=pathlib.Path,
+        nargs="?",
         help="the source file containing opoly loops"
     )
     argument_parser.add_argument(
@@ -111,12 +259,151 @@ def main():
         action="store_true",
         help="make output verbose"
     )
+    argument_parser.add_argument(
+        "-c", "--cache",
+        type=pathlib.Path,
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        metavar="<dir>",
+        help=f"cache compiled loops into <dir>, default {DEFAULT_CACHE_DIR}"
+    )
+    argument_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        metavar="<MiB>",
+        help="maximum size of the cache in MiB, default 64"
+    )
+    argument_parser.add_argument(
+        "--socket",
+        type=pathlib.Path,
+        default=DEFAULT_SOCKET_PATH,
+        metavar="<path>",
+        help=f"compile with the 'opoly serve' server listening on <path> if running, default {DEFAULT_SOCKET_PATH}"
+    )
+    argument_parser.add_argument(
+        "--no-server",
+        action="store_true",
+        help="always compile in this process, even if a server is running"
+    )
+    argument_parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        nargs="?",
+        const="-",
+        metavar="<file>",
+        help="write per-stage timings, memory and solver statistics as JSON into <file>, default stderr"
+    )
+    argument_parser.add_argument(
+        "--param",
+        type=parse_parameter,
+        action="append",
+        metavar="<name>=<value>",
+        help="a representative value (or <low>..<high> range of values) of a loop parameter, when given "
+             "the optimal schedules are ranked by their wavefronts for these values, can be repeated"
+    )
+    argument_parser.add_argument(
+        "--schedule-tolerance",
+        type=int,
+        default=0,
+        metavar="<n>",
+        help="with --param, also rank the schedules up to <n> over the minimal latency, default 0"
+    )
+    argument_parser.add_argument(
+        "--schedule-objective",
+        type=str,
+        choices=["LATENCY", "WAVEFRONTS"],
+        default="LATENCY",
+        help="minimize the schedule LATENCY or the WAVEFRONTS estimated from the loop extents "
+             "(given by --param), default LATENCY"
+    )
+    argument_parser.add_argument(
+        "--signed-schedules",
+        action="store_true",
+        help="allow negative schedule coefficients, that reverse or skew the loops backwards"
+    )
+    argument_parser.add_argument(
+        "--assume",
+        type=parse_assumption,
+        action="append",
+        metavar="<assumption>",
+        help="a fact on the loop parameters, like 'n >= 3' or 'm == n', that drops the loop bounds it makes "
+             "inactive, as an ASSUME statement of the loop, can be repeated"
+    )
+    argument_parser.add_argument(
+        "--split-index-sets",
+        action="store_true",
+        help="split the loop around the innermost one into the ranges where the innermost bounds "
+             "need no fmax and fmin"
+    )
+    argument_parser.add_argument(
+        "--portfolio",
+        type=pathlib.Path,
+        nargs="?",
+        const=DEFAULT_PORTFOLIO_STATE,
+        metavar="<file>",
+        help="race the installed MiniZinc solvers on each model and learn the fastest one for each size of "
+             f"model into <file>, default {DEFAULT_PORTFOLIO_STATE}"
+    )
+    argument_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="read JSON records {id, pseudocode, format} from stdin, one per line, "
+             "and write one JSON result per record to stdout"
+    )
+    argument_parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="with --batch, write the results as soon as they are ready instead of in input order"
+    )
+    argument_parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=4,
+        metavar="<n>",
+        help="with --batch, number of records compiled concurrently, default 4"
+    )
     args = argument_parser.parse_args()
+    if args.batch:
+        if args.file is not None or args.output is not None or args.profile is not None:
+            argument_parser.error("--batch reads from stdin and writes to stdout, "
+                                  "file, --output and --profile cannot be given")
+        from opoly.scripts.opoly_batch import opoly_batch_stdio
+        opoly_batch_stdio(
+            args.jobs,
+            not args.unordered,
+            args.verbose,
+            args.cache,
+            args.cache_size * 1024 * 1024,
+            {
+                "parameters": dict(args.param) if args.param is not None else None,
+                "schedule_tolerance": args.schedule_tolerance,
+                "schedule_objective": args.schedule_objective,
+                "signed_schedules": args.signed_schedules,
+                "assumptions": args.assume,
+                "split_index_sets": args.split_index_sets,
+                "portfolio": args.portfolio
+            }
+        )
+        return
+    if args.file is None:
+        argument_parser.error("the following arguments are required: file")
     opoly(
         args.file,
         args.output,
         args.format,
-        args.verbose
+        args.verbose,
+        args.cache,
+        args.cache_size * 1024 * 1024,
+        None if args.no_server else args.socket,
+        args.profile,
+        dict(args.param) if args.param is not None else None,
+        args.schedule_tolerance,
+        args.schedule_objective,
+        args.signed_schedules,
+        args.assume,
+        args.split_index_sets,
+        args.portfolio
     )
 
 
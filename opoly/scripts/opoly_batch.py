@@ -0,0 +1,121 @@
+import json
+import logging
+import pathlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TextIO
+
+from opoly.scripts.opoly_server import compile_with_diagnostics
+from opoly.scripts.utils import setup_logger
+
+DEFAULT_BATCH_WORKERS = 4
+# Records read ahead of the oldest one not yet written, per worker
+MAX_PENDING_PER_WORKER = 4
+OUTPUT_FORMATS = ("CCODE", "PSEUDO")
+
+
+class BatchWriter():
+
+    def __init__(self, output: TextIO, ordered: bool = True, on_emit=None):
+        self._output = output
+        self._ordered = ordered
+        self._on_emit = on_emit
+        self._lock = threading.Lock()
+        self._next_index = 0
+        self._pending = {}
+
+    def write(self, index: int, result: dict):
+        with self._lock:
+            if not self._ordered:
+                self._emit(result)
+                return
+            self._pending[index] = result
+            # Results that completed early wait for all the previous ones
+            while self._next_index in self._pending:
+                self._emit(self._pending.pop(self._next_index))
+                self._next_index += 1
+
+    def _emit(self, result: dict):
+        try:
+            self._output.write(json.dumps(result) + "\n")
+            self._output.flush()
+        finally:
+            if self._on_emit is not None:
+                self._on_emit()
+
+
+def compile_record(line: str, cache=None, compiler=None) -> dict:
+    try:
+        record = json.loads(line)
+    except ValueError as ex:
+        return {"id": None, "error": f"Malformed record: {ex}", "diagnostics": []}
+    if not isinstance(record, dict):
+        return {"id": None, "error": "Malformed record: not an object", "diagnostics": []}
+    record_id = record.get("id")
+    if "pseudocode" not in record:
+        return {"id": record_id, "error": "Missing pseudocode in record", "diagnostics": []}
+    out_format = record.get("format", "CCODE")
+    if out_format not in OUTPUT_FORMATS:
+        return {"id": record_id, "error": f"Unknown format: {out_format}", "diagnostics": []}
+    result = {"id": record_id}
+    result.update(compile_with_diagnostics(record["pseudocode"], out_format, cache, compiler))
+    return result
+
+
+def opoly_batch(
+    input_stream: TextIO,
+    output_stream: TextIO,
+    workers: int = DEFAULT_BATCH_WORKERS,
+    ordered: bool = True,
+    cache=None,
+    options: dict = None
+) -> int:
+    # Import the compile pipeline once, every record then runs warm
+    from opoly.scripts.opoly import make_compiler
+    compiler = make_compiler(**(options or {}))
+
+    # A slot is freed when its result is written, not when it is compiled,
+    # so results waiting for a slow earlier record are bounded too
+    slots = threading.BoundedSemaphore(max(1, workers) * MAX_PENDING_PER_WORKER)
+    writer = BatchWriter(output_stream, ordered, slots.release)
+
+    def run(index: int, line: str):
+        try:
+            result = compile_record(line, cache, compiler)
+        except Exception as ex:
+            result = {"id": None, "error": f"An unexpected error as occourred: {ex}", "diagnostics": []}
+        writer.write(index, result)
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for line in input_stream:
+            if len(line.strip()) == 0:
+                continue
+            slots.acquire()
+            executor.submit(run, count, line)
+            count += 1
+    return count
+
+
+def opoly_batch_stdio(
+    workers: int = DEFAULT_BATCH_WORKERS,
+    ordered: bool = True,
+    verbose: bool = False,
+    cache_dir: pathlib.Path = None,
+    cache_size: int = None,
+    options: dict = None
+):
+    # Diagnostics are already part of every result
+    logger = setup_logger(verbose, logging.NOTSET if verbose else logging.ERROR)
+
+    cache = None
+    if cache_dir is not None:
+        from opoly.modules.cache import CompilationCache, DEFAULT_CACHE_SIZE
+        cache = CompilationCache(cache_dir, cache_size or DEFAULT_CACHE_SIZE)
+
+    try:
+        count = opoly_batch(sys.stdin, sys.stdout, workers, ordered, cache, options)
+    except KeyboardInterrupt:
+        return
+    logger.debug(f"Compiled {count} records")
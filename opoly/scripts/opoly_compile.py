@@ -1,118 +1,464 @@
 import argparse
+import concurrent.futures
+import contextlib
+import hashlib
+import os
 import pathlib
 import logging
-import re
+import sys
+import tempfile
+import time
 
-import numpy as np
+from opoly.statements import AssumptionStatement
+from opoly.modules.cache import CompilationCache, loop_cache_key, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from opoly.modules.compiler import Compiler, CompilationError
+from opoly.modules.minizinc.utils import SolverBudget
+from opoly.modules.profiler import Profiler, RegionProfile
+from opoly.modules.splicer import PragmaRegion, find_pragma_regions, map_file, splice_regions
+from opoly.scripts.opoly import (
+    compile_loop,
+    make_compiler,
+    write_profile,
+    DEFAULT_PORTFOLIO_STATE
+)
+from opoly.scripts.utils import setup_logger, parse_parameter, parse_assumption
 
-from opoly.modules.parser import PseudocodeForLoopParser
-from opoly.modules.checker import LamportForLoopChecker
-from opoly.modules.detector import LamportLoopDependenciesDetector
-from opoly.modules.scheduler import LamportCPScheduler
-from opoly.modules.allocator import LamportCPAllocator
-from opoly.modules.scanner import FourierMotzkinScanner
-from opoly.modules.generator import CCodeGenerator, PseudoCodeGenerator
 
+OUTPUT_PREFIX = "omp-"
+DEFAULT_SOURCE_GLOB = "*.c"
+DEFAULT_WATCH_INTERVAL = 0.1
 
-def opoly_compile(
-    input_file: pathlib.Path,
-    output_file: pathlib.Path = None,
-    out_format: str = "CCODE",
-    verbose: bool = False
+
+class RegionCompiler():
+
+    def __init__(self, compiler: Compiler, cache: CompilationCache = None, profiling: bool = False):
+        self._compiler = compiler
+        self._cache = cache
+        self._profiling = profiling
+        # Solving time budgets of the files of the current run, by file
+        self._budgets = {}
+        self._budget_run = None
+
+    @property
+    def compiler(self) -> Compiler:
+        return self._compiler
+
+    @property
+    def cache(self) -> CompilationCache:
+        return self._cache
+
+    def budget(self, budget: tuple) -> SolverBudget:
+        # The regions of a file compiled by the same process share its budget
+        run, input_file, seconds = budget
+        if run != self._budget_run:
+            self._budgets.clear()
+            self._budget_run = run
+        if input_file not in self._budgets:
+            self._budgets[input_file] = SolverBudget(seconds)
+        return self._budgets[input_file]
+
+    def compile(self, task: tuple) -> (str, str, RegionProfile):
+        code, out_format, name, budget = task
+        profiler = Profiler() if self._profiling else None
+        budget = self.budget(budget) if budget is not None else None
+        try:
+            with profiler or contextlib.nullcontext(), budget or contextlib.nullcontext():
+                compiled, err = compile_loop(code, out_format, self.cache, name=name, compiler=self.compiler)
+        except Exception as ex:
+            compiled, err = None, f"An unexpected error as occourred: {ex}"
+        region_profile = profiler.regions[0] if profiler is not None and len(profiler.regions) > 0 else None
+        return compiled.code if compiled is not None else None, err, region_profile
+
+    def presolve(self, tasks: list[tuple]):
+        # Regions compiled in this process share the memoized solvers of the
+        # default compiler, the problems of all of them are solved in one batch
+        compiler = self.compiler
+        loops = []
+        for code, out_format, *_ in tasks:
+            try:
+                loop = compiler.parse(code)
+            except CompilationError:
+                continue
+            if self.cache is not None and loop_cache_key(
+                    loop, out_format, compiler.parameters, compiler.schedule_tolerance,
+                    compiler.schedule_objective, compiler.signed_schedules, compiler.assumptions,
+                    compiler.split_index_sets) in self.cache:
+                continue
+            loops.append(loop)
+        compiler.presolve(loops)
+
+
+# The region compiler of this process, set up once by each worker
+_region_compiler = None
+
+
+def init_region_compiler(
+    cache_dir: pathlib.Path,
+    cache_size: int,
+    profiling: bool,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    portfolio: pathlib.Path = None
 ):
+    global _region_compiler
+    _region_compiler = RegionCompiler(
+        make_compiler(
+            parameters=parameters,
+            schedule_tolerance=schedule_tolerance,
+            schedule_objective=schedule_objective,
+            signed_schedules=signed_schedules,
+            assumptions=assumptions,
+            split_index_sets=split_index_sets,
+            portfolio=portfolio
+        ),
+        CompilationCache(cache_dir, cache_size) if cache_dir is not None else None,
+        profiling
+    )
+
+
+def region_compiler() -> RegionCompiler:
+    # Regions compiled without an executor set up get the default options
+    if _region_compiler is None:
+        init_region_compiler(None, DEFAULT_CACHE_SIZE, False)
+    return _region_compiler
+
+
+def compile_region(task: tuple) -> (str, str, RegionProfile):
+    return region_compiler().compile(task)
+
+
+def output_path(input_file: pathlib.Path) -> pathlib.Path:
+    return input_file.parent / (OUTPUT_PREFIX + input_file.name)
+
+
+def collect_source_files(paths: list[pathlib.Path], pattern: str = DEFAULT_SOURCE_GLOB) -> list[pathlib.Path]:
+    files = []
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.is_dir():
+            # Outputs of previous runs live next to their inputs
+            files.extend(f for f in sorted(path.rglob(pattern))
+                         if f.is_file() and not f.name.startswith(OUTPUT_PREFIX))
+        else:
+            files.append(path)
+    return files
+
+
+def is_single_file(input_files: list[pathlib.Path]) -> bool:
+    return len(input_files) == 1 and not pathlib.Path(input_files[0]).is_dir()
+
+
+def source_file_state(input_file) -> tuple:
+    # Of a path or of an open file descriptor
+    stat = os.stat(input_file)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def scan_source_file(input_file: pathlib.Path) -> (tuple, list[PragmaRegion]):
+    # The state of the file the regions were found in, checked again
+    # before splicing since their offsets only hold for these contents
+    with open(input_file, "rb") as file, map_file(file) as buffer:
+        return source_file_state(file.fileno()), list(find_pragma_regions(buffer))
+
+
+def region_key(code: str, out_format: str) -> str:
+    return hashlib.sha256("\n".join([out_format, code]).encode("utf-8")).hexdigest()
+
+
+def scan_source_files(files: list[pathlib.Path]) -> list[tuple[pathlib.Path, tuple, list[PragmaRegion]]]:
     logger = logging.getLogger("logger_opoly")
-    sh = logging.StreamHandler()
-    sh_formatter = logging.Formatter("%(levelname)s - %(message)s")
-    sh.setFormatter(sh_formatter)
-    logger.addHandler(sh)
-    if verbose:
-        logger.setLevel(logging.DEBUG)
-    else:
-        logger.setLevel(logging.INFO)
-    try:
-        logger.debug("Reading input file")
-        with open(input_file, "r") as file:
-            input_code = file.read()
-
-        logger.debug("Scanning input file")
-        omp_poly_dir_regex = re.compile(
-            r"#pragma\s+omp\s+parallel\s+poly(?P<code>(.|\s)*?)#pragma\s+end")
-        last_pos = 0
-        code_list = []
-        matches = []
-        while True:
-            match = omp_poly_dir_regex.search(input_code, pos=last_pos)
-            if match is None:
-                break
-            code_list.append(match.group("code"))
+    file_regions = []
+    for input_file in files:
+        state, regions = scan_source_file(input_file)
+        for i, region in enumerate(regions):
             logger.info(
-                f"Found code #{len(code_list)}: " + match.group("code"))
-            matches.append(match)
-            last_pos = match.end()+1
+                f"Found code #{i+1} in {input_file} at line {region.line}: " + region.code)
+        if len(regions) == 0:
+            logger.debug(f"No code found in {input_file}")
+            continue
+        file_regions.append((input_file, state, regions))
+    return file_regions
 
-        if len(matches) == 0:
-            logging.warning("No code found. Aborting")
-            return
 
+def compile_source_files(
+    file_regions: list[tuple[pathlib.Path, tuple, list[PragmaRegion]]],
+    out_format: str = "CCODE",
+    output_file: pathlib.Path = None,
+    single_file: bool = True,
+    line_markers: bool = True,
+    executor: concurrent.futures.Executor = None,
+    profiler: Profiler = None,
+    memo=None,
+    time_budget: float = None
+) -> bool:
+    logger = logging.getLogger("logger_opoly")
+    run = time.time_ns()
+    # Regions whose text did not change since they were last compiled are reused
+    known = {}
+    tasks = []
+    for input_file, _, regions in file_regions:
+        for region in regions:
+            key = region_key(region.code, out_format)
+            if memo is not None and key not in known:
+                found, result = memo.get(key)
+                if found:
+                    known[key] = result
+            if key not in known:
+                budget = (run, str(input_file), time_budget) if time_budget is not None else None
+                tasks.append((region.code, out_format, f"{input_file}:{region.line}", budget))
+    logger.debug(f"Compiling {len(tasks)} regions")
+    # A batch mixes the regions of many files, whose budgets are separate
+    if executor is None and len(tasks) > 1 and time_budget is None:
+        try:
+            region_compiler().presolve(tasks)
+        except Exception as ex:
+            logger.debug(f"Regions could not be solved in a batch: {ex}")
+
+    ok = True
+    # Results come back in submission order whatever the order they
+    # complete in, so the outputs do not depend on the scheduling
+    results = executor.map(compile_region, tasks) if executor is not None else map(compile_region, tasks)
+    for input_file, state, regions in file_regions:
         new_loops = []
-        for i, code in enumerate(code_list):
-            logger.info(f"Processing code #{i+1}")
-            logger.debug("Parsing code")
-            loop, err = PseudocodeForLoopParser().parse_for_loop(code)
-            if loop is None:
-                logger.error(f"Error while parsing code #{i+1}: " + err)
-                return
-            logger.debug("Checking code")
-            ok, err = LamportForLoopChecker().check(loop)
-            if not ok:
-                logger.error(f"Error while checking code #{i+1}: " + err)
-                return
-            logger.debug("Detecting dependencies")
-            deps = LamportLoopDependenciesDetector().extract_dependencies(loop)
-            if len(deps) == 0:
-                logger.warning(
-                    f"No dependecies found for code #{i+1}. Skipping optimization")
+        for i, region in enumerate(regions):
+            key = region_key(region.code, out_format)
+            if key in known:
+                new_loop, err = known[key]
             else:
-                deps_np = np.array(list(list(d.converted_values)
-                                        for d in deps))
-                logger.debug("Scheduling loop")
-                schedule, err = LamportCPScheduler().schedule(deps_np)
-                if schedule is None:
-                    logger.error(f"Error while scheduling loop #{i+1}: " + err)
-                    return
-                logger.debug("Allocating loop")
-                allocation, err = LamportCPAllocator().allocate(schedule)
-                if allocation is None:
-                    logger.error(f"Error while allocating loop #{i+1}: " + err)
-                    return
-                logger.debug("Reindexing loop")
-                loop = FourierMotzkinScanner().reindex(loop, allocation)
-            logger.debug("Generating code")
-            generator = CCodeGenerator() if out_format == "CCODE" else PseudoCodeGenerator()
-            new_loop_code = generator.generate(loop)
-            new_loops.append(new_loop_code)
-            logger.debug(f"Loop #{i+1} done")
-
-        # TODO replace old code with new code
+                logger.debug(f"Processing code #{i+1} in {input_file}")
+                new_loop, err, region_profile = next(results)
+                if region_profile is not None:
+                    profiler.regions.append(region_profile)
+                if memo is not None and new_loop is not None:
+                    memo.put(key, (new_loop, err))
+            if new_loop is None:
+                logger.error(f"{input_file}:{region.line}: code #{i+1}: " + err)
+                logger.warning(f"Keeping the original code #{i+1} in {input_file}")
+                ok = False
+            new_loops.append(new_loop)
+
+        logger.debug(f"Writing output of {input_file}")
+        filename = str(input_file) if line_markers and out_format == "CCODE" else None
+        file_output = output_file if single_file else output_path(input_file)
+        with open(input_file, "rb") as file, map_file(file) as buffer:
+            if source_file_state(file.fileno()) != state:
+                logger.error(f"{input_file} changed while it was compiled, its output is not written")
+                ok = False
+                continue
+            write_spliced_output(buffer, regions, new_loops, file_output, filename)
+    return ok
+
+
+def region_executor(
+    jobs: int,
+    cache_dir: pathlib.Path,
+    cache_size: int,
+    profiling: bool,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    portfolio: pathlib.Path = None
+):
+    initargs = (
+        cache_dir, cache_size, profiling, parameters, schedule_tolerance, schedule_objective, signed_schedules,
+        assumptions, split_index_sets, portfolio)
+    if jobs > 1:
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_region_compiler,
+            initargs=initargs
+        )
+    init_region_compiler(*initargs)
+    return None
+
+
+def opoly_compile(
+    input_files: list[pathlib.Path],
+    output_file: pathlib.Path = None,
+    out_format: str = "CCODE",
+    verbose: bool = False,
+    cache_dir: pathlib.Path = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    profile_file: pathlib.Path = None,
+    line_markers: bool = True,
+    jobs: int = 1,
+    pattern: str = DEFAULT_SOURCE_GLOB,
+    time_budget: float = None,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    portfolio: pathlib.Path = None
+) -> bool:
+    logger = setup_logger(verbose)
+    if isinstance(input_files, (str, os.PathLike)):
+        input_files = [input_files]
+    try:
+        files = collect_source_files(input_files, pattern)
+        # A single input file is written to the output file or to the standard
+        # output, everything else is written next to its input
+        single_file = is_single_file(input_files)
+        if output_file is not None and not single_file:
+            logger.error("An output file can only be given for a single input file")
+            return False
+
+        logger.debug("Scanning input files")
+        file_regions = scan_source_files(files)
+        if len(file_regions) == 0:
+            logging.warning("No code found. Aborting")
+            return True
+
+        profiler = Profiler() if profile_file is not None else None
+        executor = region_executor(
+            jobs, cache_dir, cache_size, profiler is not None, parameters, schedule_tolerance, schedule_objective,
+            signed_schedules, assumptions, split_index_sets, portfolio)
+        try:
+            with executor or contextlib.nullcontext():
+                ok = compile_source_files(
+                    file_regions, out_format, output_file, single_file, line_markers, executor, profiler,
+                    time_budget=time_budget)
+        finally:
+            if profiler is not None:
+                write_profile(profiler, profile_file)
+
+        if executor is None:
+            cache = region_compiler().cache
+            if cache is not None:
+                logger.debug(f"Cache hits: {cache.hits}, misses: {cache.misses}")
+            compiler = region_compiler().compiler
+            logger.debug(f"Schedule memo hit rate: {compiler.scheduler.memo.hit_rate:.2%}, "
+                         f"allocation memo hit rate: {compiler.allocator.memo.hit_rate:.2%}")
+        return ok
 
     except Exception as ex:
         logger.error(f"An unexpected error as occourred: {ex}")
+        return False
+
+
+def opoly_watch(
+    input_files: list[pathlib.Path],
+    output_file: pathlib.Path = None,
+    out_format: str = "CCODE",
+    verbose: bool = False,
+    cache_dir: pathlib.Path = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    line_markers: bool = True,
+    jobs: int = 1,
+    pattern: str = DEFAULT_SOURCE_GLOB,
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    max_polls: int = None,
+    time_budget: float = None,
+    parameters: dict[str, int] = None,
+    schedule_tolerance: int = 0,
+    schedule_objective: str = "LATENCY",
+    signed_schedules: bool = False,
+    assumptions: tuple[AssumptionStatement] = None,
+    split_index_sets: bool = False,
+    portfolio: pathlib.Path = None
+):
+    logger = setup_logger(verbose)
+    if isinstance(input_files, (str, os.PathLike)):
+        input_files = [input_files]
+    single_file = is_single_file(input_files)
+    if output_file is not None and not single_file:
+        logger.error("An output file can only be given for a single input file")
+        return
+    if output_file is not None and pathlib.Path(output_file).resolve() == pathlib.Path(input_files[0]).resolve():
+        logger.error("The output file cannot be the watched input file")
+        return
+
+    from opoly.modules.memo import LRUMemo
+    memo = LRUMemo()
+    states = {}
+    polls = 0
+    executor = region_executor(
+        jobs, cache_dir, cache_size, False, parameters, schedule_tolerance, schedule_objective, signed_schedules,
+        assumptions, split_index_sets, portfolio)
+    try:
+        with executor or contextlib.nullcontext():
+            logger.info("Watching for changes, press Ctrl-C to stop")
+            while max_polls is None or polls < max_polls:
+                polls += 1
+                changed = []
+                files = collect_source_files(input_files, pattern)
+                for input_file in files:
+                    try:
+                        state = source_file_state(input_file)
+                    except OSError:
+                        states.pop(input_file, None)
+                        continue
+                    if states.get(input_file) != state:
+                        states[input_file] = state
+                        changed.append(input_file)
+                if len(changed) > 0:
+                    start_time = time.perf_counter()
+                    try:
+                        compile_source_files(
+                            scan_source_files(changed), out_format, output_file,
+                            single_file, line_markers, executor, memo=memo, time_budget=time_budget)
+                    except Exception as ex:
+                        logger.error(f"An unexpected error as occourred: {ex}")
+                    logger.info(f"Updated {len(changed)} files in "
+                                f"{(time.perf_counter() - start_time) * 1000:.1f} ms")
+                if max_polls is None or polls < max_polls:
+                    time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def write_spliced_output(
+    buffer,
+    regions: list[PragmaRegion],
+    new_loops: list[str],
+    output_file: pathlib.Path = None,
+    filename: str = None
+):
+    if output_file is None:
+        splice_regions(buffer, sys.stdout.buffer, regions, new_loops, filename)
+        sys.stdout.buffer.flush()
+        return
+    # Written next to the output and renamed, so that the output is never
+    # left half written and it can also replace the input file
+    output_file = pathlib.Path(output_file)
+    fd, tmp_path = tempfile.mkstemp(dir=output_file.parent, prefix=".opoly-")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            splice_regions(buffer, output, regions, new_loops, filename)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
-def main():
+def main(argv: list[str] = None):
     argument_parser = argparse.ArgumentParser(
         description="A simple OpenMP polyhedral compiler for C programs"
     )
     argument_parser.add_argument(
-        "file",
+        "files",
         type=pathlib.Path,
-        help="the source file containing opoly loops"
+        nargs="+",
+        metavar="file",
+        help="the source files containing opoly loops, directories are searched recursively"
     )
     argument_parser.add_argument(
         "-o", "--output",
         type=pathlib.Path,
         metavar="<file>",
-        help="place the output into <file>"
+        help="place the output into <file>, only with a single input file, "
+             f"by default other inputs are written next to them prefixed with {OUTPUT_PREFIX}"
     )
     argument_parser.add_argument(
         "-f", "--format",
@@ -126,13 +472,165 @@ def main():
         action="store_true",
         help="make output verbose"
     )
-    args = argument_parser.parse_args()
-    opoly_compile(
-        args.file,
+    argument_parser.add_argument(
+        "-c", "--cache",
+        type=pathlib.Path,
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        metavar="<dir>",
+        help=f"cache compiled loops into <dir>, default {DEFAULT_CACHE_DIR}"
+    )
+    argument_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        metavar="<MiB>",
+        help="maximum size of the cache in MiB, default 64"
+    )
+    argument_parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        nargs="?",
+        const="-",
+        metavar="<file>",
+        help="write per-region timings, memory and solver statistics as JSON into <file>, default stderr"
+    )
+    argument_parser.add_argument(
+        "--no-line-markers",
+        action="store_true",
+        help="do not emit #line markers around the generated loops"
+    )
+    argument_parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        metavar="<N>",
+        help="compile the loops in <N> parallel processes, default 1"
+    )
+    argument_parser.add_argument(
+        "--glob",
+        type=str,
+        default=DEFAULT_SOURCE_GLOB,
+        metavar="<pattern>",
+        help=f"the source files searched in directories, default {DEFAULT_SOURCE_GLOB}"
+    )
+    argument_parser.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="<seconds>",
+        help="the solving time shared by the loops of each file, the loops left without time are kept as they are"
+    )
+    argument_parser.add_argument(
+        "--param",
+        type=parse_parameter,
+        action="append",
+        metavar="<name>=<value>",
+        help="a representative value (or <low>..<high> range of values) of a loop parameter, when given "
+             "the optimal schedules are ranked by their wavefronts for these values, can be repeated"
+    )
+    argument_parser.add_argument(
+        "--schedule-tolerance",
+        type=int,
+        default=0,
+        metavar="<n>",
+        help="with --param, also rank the schedules up to <n> over the minimal latency, default 0"
+    )
+    argument_parser.add_argument(
+        "--schedule-objective",
+        type=str,
+        choices=["LATENCY", "WAVEFRONTS"],
+        default="LATENCY",
+        help="minimize the schedule LATENCY or the WAVEFRONTS estimated from the loop extents "
+             "(given by --param), default LATENCY"
+    )
+    argument_parser.add_argument(
+        "--signed-schedules",
+        action="store_true",
+        help="allow negative schedule coefficients, that reverse or skew the loops backwards"
+    )
+    argument_parser.add_argument(
+        "--assume",
+        type=parse_assumption,
+        action="append",
+        metavar="<assumption>",
+        help="a fact on the loop parameters, like 'n >= 3' or 'm == n', that drops the loop bounds it makes "
+             "inactive, as an ASSUME statement of every loop, can be repeated"
+    )
+    argument_parser.add_argument(
+        "--split-index-sets",
+        action="store_true",
+        help="split the loop around the innermost one into the ranges where the innermost bounds "
+             "need no fmax and fmin"
+    )
+    argument_parser.add_argument(
+        "--portfolio",
+        type=pathlib.Path,
+        nargs="?",
+        const=DEFAULT_PORTFOLIO_STATE,
+        metavar="<file>",
+        help="race the installed MiniZinc solvers on each model and learn the fastest one for each size of "
+             f"model into <file>, shared by all jobs, default {DEFAULT_PORTFOLIO_STATE}"
+    )
+    argument_parser.add_argument(
+        "-w", "--watch",
+        action="store_true",
+        help="keep running and recompile the changed loops whenever an input file changes"
+    )
+    argument_parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL,
+        metavar="<seconds>",
+        help=f"how often the input files are checked for changes, default {DEFAULT_WATCH_INTERVAL}"
+    )
+    args = argument_parser.parse_args(argv)
+    parameters = dict(args.param) if args.param is not None else None
+    if args.watch:
+        if args.profile is not None:
+            argument_parser.error("--profile cannot be used with --watch")
+        opoly_watch(
+            args.files,
+            args.output,
+            args.format,
+            args.verbose,
+            args.cache,
+            args.cache_size * 1024 * 1024,
+            not args.no_line_markers,
+            args.jobs,
+            args.glob,
+            args.watch_interval,
+            time_budget=args.time_budget,
+            parameters=parameters,
+            schedule_tolerance=args.schedule_tolerance,
+            schedule_objective=args.schedule_objective,
+            signed_schedules=args.signed_schedules,
+            assumptions=args.assume,
+            split_index_sets=args.split_index_sets,
+            portfolio=args.portfolio
+        )
+        return
+    ok = opoly_compile(
+        args.files,
         args.output,
         args.format,
-        args.verbose
+        args.verbose,
+        args.cache,
+        args.cache_size * 1024 * 1024,
+        args.profile,
+        not args.no_line_markers,
+        args.jobs,
+        args.glob,
+        args.time_budget,
+        parameters,
+        args.schedule_tolerance,
+        args.schedule_objective,
+        args.signed_schedules,
+        args.assume,
+        args.split_index_sets,
+        args.portfolio
     )
+    # Regions that failed are kept as they were, the build must still fail
+    sys.exit(0 if ok else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,370 @@
+import argparse
+import json
+import logging
+import os
+import pathlib
+import signal
+import socket
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from opoly.scripts.utils import setup_logger
+
+# The socket lives in a directory private to the user, so that without
+# XDG_RUNTIME_DIR no other user can bind the predictable path in /tmp first
+DEFAULT_SOCKET_PATH = pathlib.Path(
+    os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir())) / f"opoly-{os.getuid()}" / "opoly.sock"
+DEFAULT_WORKERS = 4
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_CONNECT_TIMEOUT = 1.0
+DEFAULT_REQUEST_TIMEOUT = 120.0
+ACCEPT_POLL_INTERVAL = 0.5
+
+
+def is_trusted(path: pathlib.Path) -> bool:
+    # Only a path owned by this user and writable by nobody else can have
+    # been created by a server of this user
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    return info.st_uid == os.getuid() and info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) == 0
+
+
+def make_socket_dir(directory: pathlib.Path):
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not is_trusted(directory):
+        raise RuntimeError(
+            f"The socket directory {directory} must be owned by the user and not writable by others")
+
+
+class DiagnosticsHandler(logging.Handler):
+
+    def __init__(self, thread_id: int, level: int = logging.NOTSET):
+        super().__init__(level)
+        self._thread_id = thread_id
+        self._diagnostics = []
+
+    @property
+    def diagnostics(self) -> list[dict]:
+        return self._diagnostics
+
+    def emit(self, record: logging.LogRecord):
+        # The logger is shared by all workers, keep only this request records
+        if record.thread == self._thread_id:
+            self._diagnostics.append({
+                "level": record.levelname,
+                "message": record.getMessage()
+            })
+
+
+class CompileServer():
+
+    def __init__(self,
+                 socket_path: pathlib.Path = DEFAULT_SOCKET_PATH,
+                 workers: int = DEFAULT_WORKERS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 cache=None
+                 ):
+        self._socket_path = pathlib.Path(socket_path)
+        self._workers = workers
+        self._idle_timeout = idle_timeout
+        self._cache = cache
+        self._caches = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._active_requests = 0
+        self._last_activity = time.monotonic()
+
+    @property
+    def socket_path(self) -> pathlib.Path:
+        return self._socket_path
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _is_idle(self) -> bool:
+        if self._idle_timeout is None or self._idle_timeout <= 0:
+            return False
+        with self._lock:
+            return (self._active_requests == 0 and
+                    time.monotonic() - self._last_activity > self._idle_timeout)
+
+    def _request_cache(self, request: dict):
+        # The client sends its own cache options, requests without them
+        # use the cache the server was started with
+        if "cache" not in request:
+            return self._cache
+        if request["cache"] is None:
+            return None
+        from opoly.modules.cache import CompilationCache
+        directory, max_size = request["cache"]
+        with self._lock:
+            if (directory, max_size) not in self._caches:
+                self._caches[(directory, max_size)] = CompilationCache(directory, max_size)
+            return self._caches[(directory, max_size)]
+
+    def _bind(self) -> socket.socket:
+        make_socket_dir(self.socket_path.parent)
+        if self.socket_path.exists():
+            if ping_server(self.socket_path):
+                raise RuntimeError(
+                    f"A server is already listening on {self.socket_path}")
+            # Stale socket left by a server that did not shut down cleanly
+            self.socket_path.unlink()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        sock.listen()
+        sock.settimeout(ACCEPT_POLL_INTERVAL)
+        return sock
+
+    def serve_forever(self, ready: threading.Event = None):
+        logger = logging.getLogger("logger_opoly")
+        # Import the compile pipeline once, every request then runs warm
+        import opoly.scripts.opoly
+
+        sock = self._bind()
+        logger.info(f"Listening on {self.socket_path}")
+        if ready is not None:
+            ready.set()
+        executor = ThreadPoolExecutor(max_workers=self._workers)
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    if self._is_idle():
+                        logger.info("Idle timeout expired. Shutting down")
+                        break
+                    continue
+                with self._lock:
+                    self._active_requests += 1
+                    self._last_activity = time.monotonic()
+                executor.submit(self._handle_connection, conn)
+        finally:
+            sock.close()
+            executor.shutdown(wait=True)
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+            logger.info("Server stopped")
+
+    def _handle_connection(self, conn: socket.socket):
+        try:
+            with conn, conn.makefile("r", encoding="utf-8") as reader:
+                for line in reader:
+                    if len(line.strip()) == 0:
+                        continue
+                    response = self._handle_request(line)
+                    conn.sendall((json.dumps(response) + "\n").encode("utf-8"))
+                    if self._stop.is_set():
+                        break
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._active_requests -= 1
+                self._last_activity = time.monotonic()
+
+    def _handle_request(self, line: str) -> dict:
+        try:
+            request = json.loads(line)
+        except ValueError as ex:
+            return {"error": f"Malformed request: {ex}", "diagnostics": []}
+        command = request.get("command", "compile")
+        if command == "ping":
+            return {"error": None, "diagnostics": []}
+        if command == "shutdown":
+            self.shutdown()
+            return {"error": None, "diagnostics": []}
+        if command != "compile":
+            return {"error": f"Unknown command: {command}", "diagnostics": []}
+        if "code" not in request:
+            return {"error": "Missing code in request", "diagnostics": []}
+        try:
+            cache = self._request_cache(request)
+        except (TypeError, ValueError) as ex:
+            return {"error": f"Invalid cache in request: {ex}", "diagnostics": []}
+
+        return compile_with_diagnostics(
+            request["code"], request.get("format", "CCODE"), cache,
+            level=logging.DEBUG if request.get("verbose", False) else logging.INFO)
+
+
+def compile_with_diagnostics(
+    code: str,
+    out_format: str = "CCODE",
+    cache=None,
+    compiler=None,
+    level: int = logging.NOTSET
+) -> dict:
+    from opoly.scripts.opoly import compile_loop
+    logger = logging.getLogger("logger_opoly")
+    handler = DiagnosticsHandler(threading.get_ident(), level)
+    logger.addHandler(handler)
+    try:
+        compiled, err = compile_loop(code, out_format, cache, compiler=compiler)
+    except Exception as ex:
+        compiled, err = None, f"An unexpected error as occourred: {ex}"
+    finally:
+        logger.removeHandler(handler)
+    response = compiled.to_dict() if compiled is not None else {}
+    response["error"] = err
+    response["diagnostics"] = handler.diagnostics
+    return response
+
+
+def send_request(
+    request: dict,
+    socket_path: pathlib.Path = DEFAULT_SOCKET_PATH,
+    timeout: float = DEFAULT_REQUEST_TIMEOUT
+) -> dict:
+    # A socket that is missing, untrusted or too slow to answer is treated
+    # as no server at all and the caller compiles in-process
+    socket_path = pathlib.Path(socket_path)
+    if not is_trusted(socket_path) or not is_trusted(socket_path.parent):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DEFAULT_CONNECT_TIMEOUT)
+            sock.connect(str(socket_path))
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as reader:
+                line = reader.readline()
+    except OSError:
+        return None
+    if len(line) == 0:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def request_compile(
+    code: str,
+    out_format: str = "CCODE",
+    socket_path: pathlib.Path = DEFAULT_SOCKET_PATH,
+    timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    cache=None,
+    verbose: bool = False
+) -> dict:
+    return send_request(
+        {
+            "command": "compile",
+            "code": code,
+            "format": out_format,
+            "cache": [str(cache.directory), cache.max_size] if cache is not None else None,
+            "verbose": verbose
+        },
+        socket_path,
+        timeout
+    )
+
+
+def ping_server(socket_path: pathlib.Path = DEFAULT_SOCKET_PATH) -> bool:
+    return send_request({"command": "ping"}, socket_path, timeout=1.0) is not None
+
+
+def stop_server(socket_path: pathlib.Path = DEFAULT_SOCKET_PATH) -> bool:
+    return send_request({"command": "shutdown"}, socket_path, timeout=1.0) is not None
+
+
+def opoly_serve(
+    socket_path: pathlib.Path = DEFAULT_SOCKET_PATH,
+    workers: int = DEFAULT_WORKERS,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    verbose: bool = False,
+    cache_dir: pathlib.Path = None,
+    cache_size: int = None
+):
+    # Every record reaches the diagnostics of the requests, which keep the
+    # level asked by each client, the server itself prints INFO unless verbose
+    logger = setup_logger(True, logging.NOTSET if verbose else logging.INFO)
+
+    cache = None
+    if cache_dir is not None:
+        from opoly.modules.cache import CompilationCache, DEFAULT_CACHE_SIZE
+        cache = CompilationCache(cache_dir, cache_size or DEFAULT_CACHE_SIZE)
+
+    server = CompileServer(socket_path, workers, idle_timeout, cache)
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+    except RuntimeError as ex:
+        logger.error(str(ex))
+
+
+def main(argv: list[str] = None):
+    argument_parser = argparse.ArgumentParser(
+        prog="opoly serve",
+        description="Run a resident opoly compile server on a Unix domain socket"
+    )
+    argument_parser.add_argument(
+        "-s", "--socket",
+        type=pathlib.Path,
+        default=DEFAULT_SOCKET_PATH,
+        metavar="<path>",
+        help=f"the socket to listen on, default {DEFAULT_SOCKET_PATH}"
+    )
+    argument_parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        metavar="<n>",
+        help=f"number of requests compiled concurrently, default {DEFAULT_WORKERS}"
+    )
+    argument_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        metavar="<seconds>",
+        help=f"shut down after <seconds> without requests (0 to disable), default {DEFAULT_IDLE_TIMEOUT}"
+    )
+    argument_parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="stop the server listening on the socket and exit"
+    )
+    argument_parser.add_argument(
+        "-c", "--cache",
+        type=pathlib.Path,
+        metavar="<dir>",
+        help="cache compiled loops into <dir>"
+    )
+    argument_parser.add_argument(
+        "--cache-size",
+        type=int,
+        metavar="<MiB>",
+        help="maximum size of the cache in MiB, default 64"
+    )
+    argument_parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="make output verbose"
+    )
+    args = argument_parser.parse_args(argv)
+    if args.stop:
+        if not stop_server(args.socket):
+            print(f"No server listening on {args.socket}")
+        return
+    opoly_serve(
+        args.socket,
+        args.workers,
+        args.idle_timeout,
+        args.verbose,
+        args.cache,
+        args.cache_size * 1024 * 1024 if args.cache_size is not None else None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import logging
+
+from opoly.statements import AssumptionStatement
+from opoly.modules.parser import parse_assumption_statement
+
+LOGGER_NAME = "logger_opoly"
+
+_stream_handler = None
+
+
+def setup_logger(verbose: bool = False, handler_level: int = logging.NOTSET) -> logging.Logger:
+    # Entry points can be called many times in the same process,
+    # the handler is added only once and then reconfigured
+    global _stream_handler
+    logger = logging.getLogger(LOGGER_NAME)
+    if _stream_handler is None:
+        _stream_handler = logging.StreamHandler()
+        _stream_handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+        logger.addHandler(_stream_handler)
+    _stream_handler.setLevel(handler_level)
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(logging.INFO)
+    return logger
+
+
+def parse_parameter(value: str) -> tuple[str, int]:
+    # Command line "name=value" parameter values, a "name=low..high" range
+    # of values is represented by its middle
+    name, sep, number = value.partition("=")
+    try:
+        if sep == "" or not name.strip():
+            raise ValueError
+        low, dots, high = number.partition("..")
+        if dots == "":
+            return name.strip(), int(number)
+        if int(low) > int(high):
+            raise ValueError
+        return name.strip(), (int(low) + int(high)) // 2
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid parameter value '{value}', expected <name>=<integer> or <name>=<integer>..<integer>")
+
+
+def parse_assumption(value: str) -> AssumptionStatement:
+    # Command line "<expression> >= <expression>" facts on the loop
+    # parameters, with the syntax of the ASSUME statements
+    assumption, err = parse_assumption_statement(value)
+    if assumption is None:
+        raise argparse.ArgumentTypeError(f"invalid assumption '{value}': {err}")
+    return assumption
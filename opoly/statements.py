@@ -16,6 +16,8 @@ class StatementType(Enum):
     FOR_LOOP = auto()
     DECLARATION = auto()
     ASSIGNMENT = auto()
+    ASSUMPTION = auto()
+    BLOCK = auto()
 
 
 class Statement(ABC):
@@ -83,6 +85,36 @@ class DeclarationStatement(SimpleStatement):
         return f"{decl_str}{init_str}"
 
 
+class AssumptionStatement(SimpleStatement):
+    # A fact about the loop parameters, such as n >= 3 or m == n, the loop
+    # is only compiled for the parameter values satisfying it
+
+    RELATIONS = (">=", "<=", "==")
+
+    def __init__(self, left_term: Expression, relation: str, right_term: Expression):
+        super().__init__(StatementType.ASSUMPTION)
+        if relation not in self.RELATIONS:
+            raise ValueError(f"Unknown assumption relation: {relation}")
+        self._left_term = left_term
+        self._relation = relation
+        self._right_term = right_term
+
+    @property
+    def left_term(self) -> Expression:
+        return self._left_term
+
+    @property
+    def relation(self) -> str:
+        return self._relation
+
+    @property
+    def right_term(self) -> Expression:
+        return self._right_term
+
+    def stringify(self) -> str:
+        return f"{self.left_term} {self.relation} {self.right_term}"
+
+
 class CompoundStatement(Statement, ABC):
 
     def __init__(self, stype: StatementType, body: tuple[Statement]):
@@ -113,7 +145,8 @@ class ForLoopStatement(CompoundStatement):
                  lowerbound: Expression,
                  upperbound: Expression,
                  step: Expression = ConstantExpression(1),
-                 is_parallel: bool = False
+                 is_parallel: bool = False,
+                 assumptions: tuple[AssumptionStatement] = ()
                  ):
         super().__init__(StatementType.FOR_LOOP, body)
         self._index = index
@@ -121,6 +154,8 @@ class ForLoopStatement(CompoundStatement):
         self._upperbound = upperbound
         self._step = step
         self._is_parallel = is_parallel
+        # Assumptions declared before the outermost loop of a nest
+        self._assumptions = tuple(assumptions)
 
     @property
     def index(self) -> VariableExpression:
@@ -142,6 +177,10 @@ class ForLoopStatement(CompoundStatement):
     def is_parallel(self) -> bool:
         return self._is_parallel
 
+    @property
+    def assumptions(self) -> tuple[AssumptionStatement]:
+        return self._assumptions
+
     def stringify_head(self) -> str:
         head = f"FOR {self.index} = {self.lowerbound}...{self.upperbound}"
         step = "" if isinstance(self.step, ConstantExpression) or self.step.value == 1 \
@@ -149,6 +188,20 @@ class ForLoopStatement(CompoundStatement):
         return f"{head}{step}"
 
 
+class BlockStatement(CompoundStatement):
+    # Statements run one after the other, like the pieces of a loop whose
+    # iterations are split into ranges with different bounds
+
+    def __init__(self, body: tuple[Statement]):
+        super().__init__(StatementType.BLOCK, body)
+
+    def stringify_head(self) -> str:
+        return ""
+
+    def stringify(self) -> str:
+        return "\n".join([str(s) for s in self.body])
+
+
 def divide_assignments(
     assignments: tuple[AssignmentStatement]
 ) -> (tuple[VariableExpression], tuple[VariableExpression]):
@@ -6,6 +6,7 @@ from opoly.modules.detector import LamportLoopDependenciesDetector
 from opoly.modules.scheduler import LamportCPScheduler
 from opoly.modules.allocator import LamportCPAllocator
 from opoly.modules.scanner import FourierMotzkinScanner
+from opoly.modules.generator import PseudoCodeGenerator
 
 
 class TestPseudocodeForLoopParserToFourierMotzkinScanner():
@@ -47,3 +48,90 @@ class TestPseudocodeForLoopParserToFourierMotzkinScanner():
         """
         reindexed_loop = self._pipeline_parser_scheduler(code)
         assert reindexed_loop is not None
+
+
+class TestGaussSeidelScan():
+
+    def _scan(self, code: str, allocation: list[list[int]]) -> str:
+        loop, _ = PseudocodeForLoopParser().parse_for_loop(code)
+        reindexed_loop = FourierMotzkinScanner().reindex(loop, np.array(allocation))
+        return PseudoCodeGenerator().generate(reindexed_loop)
+
+    def test_gauss_seidel_1d(self):
+        code = """
+        FOR q FROM 1 TO maxiter {
+            FOR i FROM 1 TO n-2 {
+                STM phi[i] = ( phi[i-1] + phi[i+1] ) * (1 / 2.0);
+            }
+        }
+        """
+        assert self._scan(code, [[2, 1], [1, 0]]) == (
+            "FOR new_q FROM 3 TO 2 * maxiter + n - 2 STEP 1 {\n"
+            "    FOR CONC new_i FROM ceil(fmax(1, (-n + new_q + 2) / 2.0)) "
+            "TO floor(fmin(maxiter, (new_q - 1) / 2.0)) STEP 1 {\n"
+            "        VAR q = new_i;\n"
+            "        VAR i = -2 * new_i + new_q;\n"
+            "        STM phi[i] = (phi[i - 1] + phi[i + 1]) * (1 / 2.0);\n"
+            "    }\n"
+            "}"
+        )
+
+    def test_gauss_seidel_2d(self):
+        code = """
+        FOR q FROM 1 TO maxiter {
+            FOR j FROM 1 TO m-2 {
+                FOR i FROM 1 TO n-2 {
+                    STM phi[i][j] = ( phi[i-1][j] + phi[i+1][j]
+                                    + phi[i][j-1] + phi[i][j+1] ) * (1 / 4.0);
+                }
+            }
+        }
+        """
+        assert self._scan(code, [[2, 1, 1], [1, 0, 0], [0, 0, 1]]) == (
+            "FOR new_q FROM 4 TO m + 2 * maxiter + n - 4 STEP 1 {\n"
+            "    FOR CONC new_j FROM ceil(fmax(1, (-m - n + new_q + 4) / 2.0)) "
+            "TO floor(fmin(maxiter, (new_q - 2) / 2.0)) STEP 1 {\n"
+            "        FOR new_i FROM fmax(1, -m - 2 * new_j + new_q + 2) "
+            "TO fmin(n - 2, -2 * new_j + new_q - 1) STEP 1 {\n"
+            "            VAR q = new_j;\n"
+            "            VAR j = -new_i - 2 * new_j + new_q;\n"
+            "            VAR i = new_i;\n"
+            "            STM phi[i][j] = (phi[i - 1][j] + phi[i + 1][j] + phi[i][j - 1] + phi[i][j + 1]) * (1 / 4.0);\n"
+            "        }\n"
+            "    }\n"
+            "}"
+        )
+
+    def test_gauss_seidel_3d(self):
+        code = """
+        FOR q FROM 1 TO maxiter {
+            FOR k FROM 1 TO l-2 {
+                FOR j FROM 1 TO m-2 {
+                    FOR i FROM 1 TO n-2 {
+                        STM phi[i][j][k] = ( phi[i-1][j][k] + phi[i+1][j][k]
+                                           + phi[i][j-1][k] + phi[i][j+1][k]
+                                           + phi[i][j][k-1] + phi[i][j][k+1] ) * (1 / 6.0);
+                    }
+                }
+            }
+        }
+        """
+        assert self._scan(code, [[2, 1, 1, 1], [1, 0, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]) == (
+            "FOR new_q FROM 5 TO l + m + 2 * maxiter + n - 6 STEP 1 {\n"
+            "    FOR CONC new_k FROM ceil(fmax(1, (-l - m - n + new_q + 6) / 2.0)) "
+            "TO floor(fmin(maxiter, (new_q - 3) / 2.0)) STEP 1 {\n"
+            "        FOR new_j FROM fmax(1, -l - n - 2 * new_k + new_q + 4) "
+            "TO fmin(m - 2, -2 * new_k + new_q - 2) STEP 1 {\n"
+            "            FOR new_i FROM fmax(1, -l - new_j - 2 * new_k + new_q + 2) "
+            "TO fmin(n - 2, -new_j - 2 * new_k + new_q - 1) STEP 1 {\n"
+            "                VAR q = new_k;\n"
+            "                VAR k = -new_i - new_j - 2 * new_k + new_q;\n"
+            "                VAR j = new_j;\n"
+            "                VAR i = new_i;\n"
+            "                STM phi[i][j][k] = (phi[i - 1][j][k] + phi[i + 1][j][k] + phi[i][j - 1][k] "
+            "+ phi[i][j + 1][k] + phi[i][j][k - 1] + phi[i][j][k + 1]) * (1 / 6.0);\n"
+            "            }\n"
+            "        }\n"
+            "    }\n"
+            "}"
+        )
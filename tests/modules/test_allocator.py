@@ -1,7 +1,9 @@
 import numpy as np
 import pytest
 
-from opoly.modules.allocator import LamportCPAllocator
+from opoly.modules.minizinc import LAMPORT_ALLOCATOR_PATH, LAMPORT_ALLOCATOR_INVERSE_PATH
+from opoly.modules.allocator import LamportCPAllocator, LamportUnimodularAllocator, batch_data
+from opoly.modules.unimodular import integer_determinant
 
 # @pytest.mark.skip(reason="too slow to test every time")
 class TestLamportCPAllocator():
@@ -26,6 +28,11 @@ class TestLamportCPAllocator():
         res, _ = LamportCPAllocator().allocate(np.array(schedule))
         assert res.tolist() == [[3, 2], [1, 1]]
 
+    def test_2d_signed(self):
+        schedule = [-2, 3]
+        res, _ = LamportCPAllocator().allocate(np.array(schedule))
+        assert res.tolist() == [[-2, 3], [-1, 1]]
+
     def test_3d_example4(self):
         schedule = [1, 1, 1]
         res, _ = LamportCPAllocator().allocate(np.array(schedule))
@@ -68,3 +75,146 @@ class TestLamportCPAllocator():
         schedule = [1.5, 0]
         res, _ = LamportCPAllocator().allocate(np.array(schedule))
         assert res is None
+
+
+
+class TestLamportCPAllocatorInverseEncoding():
+
+    def test_model_path(self):
+        assert LamportCPAllocator().model_path(3) == LAMPORT_ALLOCATOR_PATH
+        assert LamportCPAllocator().model_path(5) == LAMPORT_ALLOCATOR_INVERSE_PATH
+        assert LamportCPAllocator("inverse").model_path(2) == LAMPORT_ALLOCATOR_INVERSE_PATH
+        assert LamportCPAllocator("determinant").model_path(8) == LAMPORT_ALLOCATOR_PATH
+
+    def test_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            LamportCPAllocator("cholesky")
+
+    def test_3d_example5(self):
+        res, _ = LamportCPAllocator("inverse").allocate(np.array([2, 1, 1]))
+        assert res.tolist() == [
+            [2, 1, 1],
+            [1, 0, 0],
+            [0, 0, 1]
+        ]
+
+    def test_unsat(self):
+        res, _ = LamportCPAllocator("inverse").allocate(np.array([2, 2]))
+        assert res is None
+
+
+class TestLamportCPAllocatorBatch():
+
+    def test_batch(self):
+        schedules = [np.array([2, 1]), np.array([1, 1, 1]), np.array([3, 2])]
+        res = LamportCPAllocator().allocate_batch(schedules)
+        assert [alloc.tolist() for alloc, _ in res] == [
+            [[2, 1], [1, 0]],
+            [[1, 1, 1], [0, 1, 0], [0, 0, 1]],
+            [[3, 2], [1, 1]]
+        ]
+
+    def test_batch_unsat(self):
+        res = LamportCPAllocator().allocate_batch([np.array([1, 0]), np.array([2, 2])])
+        assert res[0][0].tolist() == [[1, 0], [0, 1]]
+        assert res[1] == (None, "Unsatisfiable!")
+
+    def test_batch_data(self):
+        assert batch_data([np.array([2, 1]), np.array([1, 1, 1])]) == {
+            "k": 2,
+            "n": [2, 3],
+            "max_n": 3,
+            "tau": [[2, 1, 0], [1, 1, 1]],
+            "signed": [False, False]
+        }
+        assert batch_data([np.array([1, -1]), np.array([1, 1])])["signed"] == [True, False]
+
+
+class CountingAllocator(LamportCPAllocator):
+
+    def __init__(self):
+        self.calls = 0
+        self.batches = []
+
+    def allocate(self, schedule: np.ndarray) -> (np.ndarray, str):
+        self.calls += 1
+        return None, "Unsatisfiable!"
+
+    def allocate_batch(self, schedules: list[np.ndarray]) -> list[tuple[np.ndarray, str]]:
+        self.batches.append(len(schedules))
+        return [self.allocate(schedule) for schedule in schedules]
+
+
+class TestLamportUnimodularAllocator():
+
+    def test_examples(self):
+        examples = [
+            ([1, 0], [[1, 0], [0, 1]]),
+            ([1, 1], [[1, 1], [0, 1]]),
+            ([2, 1], [[2, 1], [1, 0]]),
+            ([3, 2], [[3, 2], [1, 1]]),
+            ([1, 1, 1], [[1, 1, 1], [0, 1, 0], [0, 0, 1]]),
+            ([2, 1, 1], [[2, 1, 1], [1, 0, 0], [0, 0, 1]]),
+            ([1, 1, 1, 1], [[1, 1, 1, 1], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
+        ]
+        fallback = CountingAllocator()
+        allocator = LamportUnimodularAllocator(fallback=fallback)
+        for schedule, expected in examples:
+            res, err = allocator.allocate(np.array(schedule))
+            assert err is None
+            assert res.tolist() == expected
+        assert fallback.calls == 0
+
+    def test_deep_nest(self):
+        schedule = [3, 5, 7, 11, 13, 17, 19, 23]
+        res, _ = LamportUnimodularAllocator(fallback=CountingAllocator()).allocate(np.array(schedule))
+        assert res[0].tolist() == schedule
+        assert (res[1:] >= 0).all()
+        assert abs(integer_determinant(res.tolist())) == 1
+
+    def test_signed(self):
+        fallback = CountingAllocator()
+        allocator = LamportUnimodularAllocator(fallback=fallback)
+        res, err = allocator.allocate(np.array([-2, 3]))
+        assert err is None
+        assert res.tolist() == [[-2, 3], [-1, 1]]
+        res, _ = allocator.allocate(np.array([1, 0, -1]))
+        assert res.tolist() == [[1, 0, -1], [0, 1, 0], [0, 0, 1]]
+        assert fallback.calls == 0
+
+    def test_not_coprime(self):
+        fallback = CountingAllocator()
+        res, err = LamportUnimodularAllocator(fallback=fallback).allocate(np.array([2, 2]))
+        assert res is None
+        assert err == "Unsatisfiable!"
+        assert fallback.calls == 0
+
+    def test_no_coprime_pair(self):
+        # Coprime, but no two entries are
+        fallback = CountingAllocator()
+        res, err = LamportUnimodularAllocator(fallback=fallback).allocate(np.array([6, 10, 15]))
+        assert err is None
+        assert res[0].tolist() == [6, 10, 15]
+        assert (res[1:] >= 0).all()
+        assert abs(integer_determinant(res.tolist())) == 1
+        assert fallback.calls == 0
+
+    def test_base_options(self):
+        allocator = LamportUnimodularAllocator(unimodularity="inverse", timeout=7)
+        assert allocator.unimodularity == "inverse"
+        assert allocator.timeout(100) == 7
+
+    def test_not_integer(self):
+        res, _ = LamportUnimodularAllocator(fallback=CountingAllocator()).allocate(np.array([1.5, 0]))
+        assert res is None
+
+    def test_batch(self):
+        fallback = CountingAllocator()
+        res = LamportUnimodularAllocator(fallback=fallback).allocate_batch([
+            np.array([6, 10, 15]), np.array([2, 1]), np.array([2, 2]), np.array([10, 6, 15])])
+        assert res[0][0][0].tolist() == [6, 10, 15]
+        assert res[1][0].tolist() == [[2, 1], [1, 0]]
+        assert res[2] == (None, "Unsatisfiable!")
+        assert res[3][0][0].tolist() == [10, 6, 15]
+        # Every coprime schedule is completed without the solver
+        assert fallback.batches == []
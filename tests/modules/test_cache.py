@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+import opoly.modules.cache as cache_module
+from opoly.modules.parser import PseudocodeForLoopParser, parse_assumption_statement
+from opoly.modules.cache import CACHE_EVICTION_TARGET, CompilationCache, CompiledLoop, loop_cache_key
+
+
+class TestLoopCacheKey():
+
+    def test_same_loop_different_formatting(self):
+        loop1, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        loop2, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N {\n    STM a[i] = a[i + 1];\n}")
+        assert loop_cache_key(loop1, "CCODE") == loop_cache_key(loop2, "CCODE")
+
+    def test_different_format(self):
+        loop, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        assert loop_cache_key(loop, "CCODE") != loop_cache_key(loop, "PSEUDO")
+
+    def test_different_loop(self):
+        loop1, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        loop2, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i-1]; }")
+        assert loop_cache_key(loop1, "CCODE") != loop_cache_key(loop2, "CCODE")
+
+    def test_schedule_options(self):
+        loop, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        keys = {
+            loop_cache_key(loop, "CCODE"),
+            loop_cache_key(loop, "CCODE", {"N": 10}),
+            loop_cache_key(loop, "CCODE", {"N": 20}),
+            loop_cache_key(loop, "CCODE", {"N": 10}, 1),
+            loop_cache_key(loop, "CCODE", schedule_objective="WAVEFRONTS"),
+            loop_cache_key(loop, "CCODE", {"N": 10}, schedule_objective="WAVEFRONTS"),
+            loop_cache_key(loop, "CCODE", signed_schedules=True),
+            loop_cache_key(loop, "CCODE", assumptions=[parse_assumption_statement("N >= 3")[0]]),
+            loop_cache_key(loop, "CCODE", split_index_sets=True)
+        }
+        assert len(keys) == 9
+        assert loop_cache_key(loop, "CCODE", assumptions=[]) == loop_cache_key(loop, "CCODE")
+
+    def test_codegen_revision(self, monkeypatch):
+        loop, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        key = loop_cache_key(loop, "CCODE")
+        monkeypatch.setattr(cache_module, "CODEGEN_REVISION", cache_module.CODEGEN_REVISION + 1)
+        assert loop_cache_key(loop, "CCODE") != key
+
+    def test_loop_assumptions(self):
+        loop1, _ = PseudocodeForLoopParser().parse_for_loop(
+            "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        loop2, _ = PseudocodeForLoopParser().parse_for_loop(
+            "ASSUME N >= 3; FOR i FROM 0 TO N { STM a[i]=a[i+1]; }")
+        assert loop_cache_key(loop1, "CCODE") != loop_cache_key(loop2, "CCODE")
+
+
+class TestCompilationCache():
+
+    def test_miss(self, tmp_path):
+        cache = CompilationCache(tmp_path)
+        assert cache.get("missing") is None
+        assert cache.hits == 0
+        assert cache.misses == 1
+
+    def test_put_get(self, tmp_path):
+        cache = CompilationCache(tmp_path)
+        cache.put("key", CompiledLoop(
+            code="for(...) {}",
+            dependencies=[[1, 0], [0, 1]],
+            schedule=[1, 1],
+            allocation=[[1, 1], [0, 1]]
+        ))
+        entry = cache.get("key")
+        assert entry is not None
+        assert entry.code == "for(...) {}"
+        assert entry.dependencies == [[1, 0], [0, 1]]
+        assert entry.schedule == [1, 1]
+        assert entry.allocation == [[1, 1], [0, 1]]
+        assert cache.hits == 1
+        assert cache.misses == 0
+
+    def test_contains(self, tmp_path):
+        cache = CompilationCache(tmp_path)
+        assert "key" not in cache
+        cache.put("key", CompiledLoop(code="", dependencies=[], schedule=None, allocation=None))
+        assert "key" in cache
+        assert cache.hits == 0
+        assert cache.misses == 0
+
+    def test_shared_directory(self, tmp_path):
+        CompilationCache(tmp_path).put("key", CompiledLoop(code="code"))
+        entry = CompilationCache(tmp_path).get("key")
+        assert entry is not None
+        assert entry.code == "code"
+        assert entry.schedule is None
+
+    def test_no_temporary_files(self, tmp_path):
+        cache = CompilationCache(tmp_path)
+        cache.put("key", CompiledLoop(code="code"))
+        assert sorted(os.listdir(tmp_path)) == ["key.json"]
+
+    def test_corrupted_entry(self, tmp_path):
+        (tmp_path / "key.json").write_text("{not json")
+        cache = CompilationCache(tmp_path)
+        assert cache.get("key") is None
+        assert cache.misses == 1
+
+    def test_lru_eviction(self, tmp_path):
+        cache = CompilationCache(tmp_path, max_size=300)
+        cache.put("a", CompiledLoop(code="a" * 50))
+        cache.put("b", CompiledLoop(code="b" * 50))
+        os.utime(tmp_path / "a.json", (1, 1))
+        os.utime(tmp_path / "b.json", (2, 2))
+        # Accessing a makes b the least recently used entry
+        assert cache.get("a") is not None
+        cache.put("c", CompiledLoop(code="c" * 50))
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_eviction_target(self, tmp_path):
+        cache = CompilationCache(tmp_path, max_size=1000)
+        for i in range(9):
+            cache.put(str(i), CompiledLoop(code=str(i) * 50))
+        # The ninth entry goes over the budget, which is freed down to the target
+        entries = list(tmp_path.iterdir())
+        assert len(entries) == 7
+        assert sum(p.stat().st_size for p in entries) <= 1000 * CACHE_EVICTION_TARGET
+
+    def test_evict_only_when_full(self, tmp_path, monkeypatch):
+        cache = CompilationCache(tmp_path, max_size=1000)
+        evictions = []
+        evict = cache.evict
+        monkeypatch.setattr(cache, "evict", lambda: evictions.append(1) or evict())
+        for i in range(5):
+            cache.put(str(i), CompiledLoop(code=str(i) * 50))
+        # The directory is scanned once, then only when over the budget
+        assert len(evictions) == 1
+        cache.put("5", CompiledLoop(code="5" * 500))
+        assert len(evictions) == 2
+
+    def test_clear(self, tmp_path):
+        cache = CompilationCache(tmp_path)
+        cache.put("key", CompiledLoop(code="code"))
+        cache.clear()
+        assert cache.get("key") is None
+
+    def test_invalid_size(self, tmp_path):
+        with pytest.raises(ValueError):
+            CompilationCache(tmp_path, max_size=0)
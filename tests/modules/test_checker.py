@@ -1,4 +1,4 @@
-from opoly.statements import ForLoopStatement, AssignmentStatement, DeclarationStatement
+from opoly.statements import ForLoopStatement, AssignmentStatement, DeclarationStatement, AssumptionStatement
 from opoly.expressions import VariableExpression, ConstantExpression, Expression, GroupingExpression
 
 from opoly.modules.checker import is_perfectly_nested_loop, is_plain_loop, is_recursively_plain_loop, LamportForLoopChecker
@@ -549,3 +549,16 @@ class TestLamportForLoopChecker():
         res, error = LamportForLoopChecker().check(iloop)
         assert not res
         assert error == f"Variable expressions ({str(ajk)}) and ({str(akminus1k)}) have the same name but different indexes order!"
+
+    def test_assumption_on_index(self):
+        assumption = AssumptionStatement(VariableExpression("N"), ">=", VariableExpression("i"))
+        loop = ForLoopStatement(
+            body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i")]), ConstantExpression(0))],
+            index=VariableExpression("i"),
+            lowerbound=ConstantExpression(1),
+            upperbound=VariableExpression("N"),
+            assumptions=(assumption,)
+        )
+        res, error = LamportForLoopChecker().check(loop)
+        assert not res
+        assert error == f"Assumption ({str(assumption)}) is on the loop index i!"
@@ -0,0 +1,243 @@
+import threading
+
+import numpy as np
+import pytest
+
+from opoly.statements import ForLoopStatement
+from opoly.modules.parser import parse_assumption_statement
+from opoly.modules.profiler import Profiler
+from opoly.modules.scheduler import LamportCPScheduler, MemoizedScheduler
+from opoly.modules.allocator import LamportCPAllocator, MemoizedAllocator
+from opoly.modules.ranker import WavefrontScheduleRanker
+from opoly.modules.compiler import Compiler, CompilationError, CompilationResult
+
+STENCIL_CODE = "FOR i FROM 1 TO N-1 { FOR j FROM 2 TO M-1 { STM a[i][j] = (a[i-1][j] + a[i][j] + a[i][j-1]) / 3.0; } }"
+
+
+class FixedScheduler(LamportCPScheduler):
+
+    def __init__(self):
+        self.batches = []
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        return np.array([1, 1]), None
+
+    def schedule_batch(self, deps_list: list[np.ndarray], weights_list: list[np.ndarray] = None) -> list[tuple[np.ndarray, str]]:
+        self.batches.append(len(deps_list))
+        return [self.schedule(deps) for deps in deps_list]
+
+
+class FixedAllocator(LamportCPAllocator):
+
+    def __init__(self):
+        self.batches = []
+
+    def allocate(self, schedule: np.ndarray) -> (np.ndarray, str):
+        return np.array([[1, 1], [0, 1]]), None
+
+    def allocate_batch(self, schedules: list[np.ndarray]) -> list[tuple[np.ndarray, str]]:
+        self.batches.append(len(schedules))
+        return [self.allocate(schedule) for schedule in schedules]
+
+
+class RecordingScheduler(FixedScheduler):
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        self.deps = deps
+        return super().schedule(deps)
+
+
+class UnprovenScheduler(LamportCPScheduler):
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        return np.array([1, 1]), "Solution not proven optimal!"
+
+
+class FailingScheduler(LamportCPScheduler):
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        return None, "Unsatisfiable!"
+
+
+class TestCompiler():
+
+    def test_no_dependencies(self):
+        result = Compiler().compile("FOR i FROM 0 TO N { STM a[i]=b[i+1]; }", "PSEUDO")
+        assert isinstance(result, CompilationResult)
+        assert isinstance(result.loop, ForLoopStatement)
+        assert result.transformed_loop is result.loop
+        assert result.dependencies == ()
+        assert result.dependency_matrix is None
+        assert result.schedule is None
+        assert result.allocation is None
+        assert result.out_format == "PSEUDO"
+        assert result.code == """FOR i FROM 0 TO N STEP 1 {
+    STM a[i] = b[i + 1];
+}"""
+
+    def test_dependencies(self):
+        compiler = Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator())
+        result = compiler.compile(STENCIL_CODE)
+        assert sorted(result.dependency_matrix.tolist()) == [[0, 1], [1, 0]]
+        assert result.schedule.tolist() == [1, 1]
+        assert result.allocation.tolist() == [[1, 1], [0, 1]]
+        assert result.transformed_loop.index.name == "new_i"
+        assert "#pragma omp parallel for" in result.code
+
+    def test_reduced_dependencies(self):
+        scheduler = RecordingScheduler()
+        compiler = Compiler(scheduler=scheduler, allocator=FixedAllocator())
+        with Profiler() as profiler, profiler.region("loop"):
+            result = compiler.compile(
+                "FOR i FROM 1 TO N { FOR j FROM 1 TO M { STM a[i][j] = a[i-1][j] + a[i][j-1] + a[i-1][j-1]; } }")
+        assert sorted(result.dependency_matrix.tolist()) == [[0, 1], [1, 0], [1, 1]]
+        assert scheduler.deps.tolist() == [[0, 1], [1, 0]]
+        assert profiler.regions[0].counters["removed_dependencies"] == 1
+
+    def test_ranked_schedules(self):
+        code = "FOR i FROM 0 TO N { FOR j FROM 0 TO M { STM a[i][j] = a[i-1][j-1]; } }"
+        assert Compiler().compile(code).schedule.tolist() == [0, 1]
+        ranker = WavefrontScheduleRanker(threads=4)
+        # Both schedules have the same latency, the wavefronts follow the shorter loop
+        compiler = Compiler(parameters={"N": 1000, "M": 10}, ranker=ranker)
+        assert compiler.compile(code).schedule.tolist() == [0, 1]
+        compiler = Compiler(parameters={"N": 10, "M": 1000}, ranker=ranker)
+        result = compiler.compile(code)
+        assert result.schedule.tolist() == [1, 0]
+        assert result.allocation[0].tolist() == [1, 0]
+        # Parameters without a value keep the schedule of the solver
+        compiler = Compiler(parameters={"N": 10}, ranker=ranker)
+        assert compiler.compile(code).schedule.tolist() == [0, 1]
+
+    def test_ranked_near_optimal_schedules(self):
+        code = "FOR k FROM 1 TO q { FOR i FROM 1 TO n { STM a[i] = (a[i-1] + a[i] + a[i+1]) / 3.0; } }"
+        compiler = Compiler(parameters={"q": 10, "n": 100}, schedule_tolerance=2,
+                            ranker=WavefrontScheduleRanker(threads=4))
+        assert compiler.compile(code).schedule.tolist() == [2, 1]
+
+    def test_wavefronts_objective(self):
+        code = "FOR i FROM 0 TO N { FOR j FROM 0 TO M { FOR k FROM 0 TO K { " \
+               "STM a[i][j][k] = a[i-1][j-1][k] + a[i][j-1][k-1]; } } }"
+        assert Compiler().compile(code).schedule.tolist() == [0, 1, 0]
+        compiler = Compiler(parameters={"N": 10, "M": 1000, "K": 10}, schedule_objective="WAVEFRONTS")
+        assert compiler.compile(code).schedule.tolist() == [1, 0, 1]
+        # Without values the extents of the loops are the same
+        compiler = Compiler(schedule_objective="WAVEFRONTS")
+        assert compiler.compile(code).schedule.tolist() == [0, 1, 0]
+        # The parameters without a value have the default extent
+        compiler = Compiler(parameters={"M": 1000}, schedule_objective="WAVEFRONTS")
+        assert compiler.compile(code).schedule.tolist() == [1, 0, 1]
+
+    def test_signed_schedules(self):
+        code = "FOR i FROM 0 TO N { FOR j FROM 0 TO M { FOR k FROM 0 TO K { " \
+               "STM a[i][j][k] = a[i][j-1][k+2] + a[i-1][j+5][k]; } } }"
+        assert Compiler().compile(code).schedule.tolist() == [6, 1, 0]
+        result = Compiler(signed_schedules=True, out_format="PSEUDO").compile(code)
+        assert result.schedule.tolist() == [1, 0, -1]
+        assert result.code.startswith("FOR new_i FROM -K TO N STEP 1")
+
+    def test_unknown_schedule_objective(self):
+        with pytest.raises(ValueError):
+            Compiler(schedule_objective="THROUGHPUT")
+
+    def test_not_proven_optimal(self):
+        assert Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator()).compile(STENCIL_CODE).optimal
+        result = Compiler(scheduler=UnprovenScheduler(), allocator=FixedAllocator()).compile(STENCIL_CODE)
+        assert not result.optimal
+        assert result.schedule.tolist() == [1, 1]
+        assert "#pragma omp parallel for" in result.code
+
+    def test_default_format(self):
+        result = Compiler(out_format="PSEUDO").compile("FOR i FROM 0 TO N { STM a[i]=b[i+1]; }")
+        assert result.code.startswith("FOR i FROM 0 TO N STEP 1")
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            Compiler(out_format="FORTRAN")
+        with pytest.raises(ValueError):
+            Compiler().compile("FOR i FROM 0 TO N { STM a[i]=b[i+1]; }", "FORTRAN")
+
+    def test_parse_error(self):
+        with pytest.raises(CompilationError) as ex:
+            Compiler().compile("FOR i { }")
+        assert ex.value.stage == "parse"
+        assert str(ex.value).startswith("Error while parsing code")
+
+    def test_check_error(self):
+        with pytest.raises(CompilationError) as ex:
+            Compiler().compile("FOR i FROM 0 TO N { STM a[i]=b[i]; FOR j FROM 0 TO N { STM a[j]=b[j]; } }")
+        assert ex.value.stage == "check"
+
+    def test_assumptions(self):
+        assumption, _ = parse_assumption_statement("N <= 2")
+        compiler = Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator(), out_format="PSEUDO",
+                            assumptions=[assumption])
+        assert compiler.assumptions == (assumption,)
+        code = compiler.compile(STENCIL_CODE).code
+        assert code.startswith("ASSUME N <= 2;\nFOR new_i FROM 3 TO M + N - 2 STEP 1 {\n"
+                               "    FOR CONC new_j FROM -N + new_i + 1 TO new_i - 1 STEP 1 {")
+        # The assumptions of the loop are used as the given ones
+        compiler = Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator(), out_format="PSEUDO")
+        assert compiler.compile("ASSUME N <= 2; " + STENCIL_CODE).code == code
+
+    def test_split_index_sets(self):
+        compiler = Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator(), out_format="PSEUDO",
+                            split_index_sets=True)
+        assert compiler.split_index_sets
+        result = compiler.compile(STENCIL_CODE)
+        # The wavefronts are split where the bounds of the parallel loop change
+        pieces = result.transformed_loop.body
+        assert len(pieces) > 1
+        assert result.code.count("FOR new_i FROM") == len(pieces)
+        for piece in pieces:
+            assert "fm" not in str(piece.body[0].lowerbound) + str(piece.body[0].upperbound)
+
+    def test_assumption_errors(self):
+        assumption, _ = parse_assumption_statement("N >= i")
+        with pytest.raises(CompilationError) as ex:
+            Compiler(assumptions=[assumption]).compile(STENCIL_CODE)
+        assert ex.value.stage == "check"
+        with pytest.raises(CompilationError) as ex:
+            Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator()).compile(
+                "ASSUME N * M >= 4; " + STENCIL_CODE)
+        assert ex.value.stage == "scan"
+        assert str(ex.value) == "Error while scanning loop: Assumption (N * M >= 4) is not linear in the parameters"
+
+    def test_schedule_error(self):
+        with pytest.raises(CompilationError) as ex:
+            Compiler(scheduler=FailingScheduler()).compile(STENCIL_CODE)
+        assert ex.value.stage == "schedule"
+        assert str(ex.value) == "Error while scheduling loop: Unsatisfiable!"
+
+    def test_concurrent_compiles(self):
+        compiler = Compiler(scheduler=FixedScheduler(), allocator=FixedAllocator())
+        expected = compiler.compile(STENCIL_CODE).code
+        codes = [None] * 8
+
+        def compile_code(i):
+            codes[i] = compiler.compile(STENCIL_CODE).code
+
+        threads = [threading.Thread(target=compile_code, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert codes == [expected] * 8
+
+    def test_presolve(self):
+        scheduler = MemoizedScheduler(FixedScheduler())
+        allocator = MemoizedAllocator(FixedAllocator())
+        compiler = Compiler(scheduler=scheduler, allocator=allocator)
+        loops = [
+            compiler.parse(STENCIL_CODE),
+            compiler.parse("FOR i FROM 1 TO N { FOR j FROM 1 TO M { STM a[i][j] = a[i][j-1] + a[i-1][j]; } }"),
+            compiler.parse("FOR i FROM 0 TO N { STM a[i]=b[i+1]; }")
+        ]
+        compiler.presolve(loops)
+        # Both stencils share their dependence pattern, solved only once
+        assert scheduler._scheduler.batches == [1]
+        assert allocator._allocator.batches == [1]
+        result = compiler.compile_loop(loops[1])
+        assert result.schedule.tolist() == [1, 1]
+        assert scheduler.memo.hits == 1
+        assert allocator.memo.hits == 1
@@ -0,0 +1,28 @@
+from opoly.modules.parser import PseudocodeForLoopParser
+from opoly.modules.extents import loop_extents, DEFAULT_PARAMETER_VALUE
+
+
+def parse(code):
+    loop, _ = PseudocodeForLoopParser().parse_for_loop(code)
+    return loop
+
+
+class TestLoopExtents():
+
+    def test_parameters(self):
+        loop = parse("FOR k FROM 1 TO q { FOR i FROM 1 TO n-1 { STM a[i] = a[i-1] + a[i+1]; } }")
+        assert loop_extents(loop, {"q": 1000, "n": 11}) == [1000, 10]
+
+    def test_missing_parameters(self):
+        loop = parse("FOR k FROM 1 TO q { FOR i FROM 0 TO 7 { STM a[i] = a[i-1]; } }")
+        assert loop_extents(loop) == [DEFAULT_PARAMETER_VALUE, 8]
+        assert loop_extents(loop, default_value=10) == [10, 8]
+
+    def test_triangular(self):
+        # The inner loop runs i+1 times, N/2+1 on average
+        loop = parse("FOR i FROM 0 TO N { FOR j FROM 0 TO i { STM a[i][j] = a[i-1][j] + a[i][j-1]; } }")
+        assert loop_extents(loop, {"N": 100}) == [101, 51]
+
+    def test_empty(self):
+        loop = parse("FOR i FROM 5 TO N { STM a[i] = a[i-1]; }")
+        assert loop_extents(loop, {"N": 2}) == [1]
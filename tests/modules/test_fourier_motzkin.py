@@ -0,0 +1,167 @@
+from fractions import Fraction
+
+import numpy as np
+
+from opoly.modules.fourier_motzkin import (
+    normalize_rows,
+    eliminate,
+    remove_dominated,
+    is_feasible,
+    is_implied,
+    remove_redundant,
+    remove_implied_bounds,
+    variable_bounds,
+    fourier_motzkin_bounds
+)
+
+
+class TestFourierMotzkin():
+
+    def test_normalize_rows(self):
+        system = np.array([[2, -4, 6], [0, 0, 0], [3, 0, -1]])
+        assert normalize_rows(system).tolist() == [[1, -2, 3], [0, 0, 0], [3, 0, -1]]
+
+    def test_eliminate(self):
+        # Columns (i, j, n, 1): 1 <= j <= n, j <= i - 1 and i <= 2*n
+        system = np.array([
+            [0, 1, 0, -1],
+            [0, -1, 1, 0],
+            [1, -1, 0, -1],
+            [-1, 0, 2, 0]
+        ])
+        system, histories = eliminate(system, np.eye(4, dtype=bool), 1, 2)
+        assert system.tolist() == [
+            [-1, 0, 2, 0],
+            [1, 0, 0, -2]
+        ]
+        assert histories.tolist() == [
+            [False, False, False, True],
+            [True, False, True, False]
+        ]
+
+    def test_eliminate_parameter_constraints(self):
+        # 1 <= i <= n only implies n >= 1, which is not an index bound
+        system = np.array([[1, 0, -1], [-1, 1, 0]])
+        system, histories = eliminate(system, np.eye(2, dtype=bool), 0, 1)
+        assert system.shape == (0, 3)
+        assert histories.shape == (0, 2)
+
+    def test_remove_dominated(self):
+        # Columns (i, n, 1): i >= 1, i >= 3, i <= n, and a combination of
+        # three rows after one elimination
+        system = np.array([[1, 0, -1], [1, 0, -3], [-1, 1, 0], [1, 1, 0]])
+        histories = np.array([
+            [True, False, False, False],
+            [False, True, False, False],
+            [False, False, True, False],
+            [True, True, True, False]
+        ])
+        system, histories = remove_dominated(system, histories, 1)
+        assert system.tolist() == [[1, 0, -3], [-1, 1, 0]]
+        assert histories.tolist() == [
+            [False, True, False, False],
+            [False, False, True, False]
+        ]
+
+    def test_is_feasible(self):
+        # 1 <= i <= j <= n is feasible, with also n <= 0 it is not
+        system = np.array([[1, 0, 0, -1], [-1, 1, 0, 0], [0, -1, 1, 0]])
+        assert is_feasible(system)
+        assert not is_feasible(np.vstack([system, [[0, 0, -1, 0]]]))
+
+    def test_is_implied(self):
+        # i >= 1 and j >= i imply j >= 1 but not j >= 2
+        system = np.array([[1, 0, -1], [-1, 1, 0]])
+        assert is_implied(system, np.array([0, 1, -1]))
+        assert not is_implied(system, np.array([0, 1, -2]))
+
+    def test_remove_redundant(self):
+        # Columns (i, j, 1): j >= 1 follows from j >= i and i >= 1, it is not
+        # a syntactic duplicate of any row
+        system = np.array([[0, 1, -1], [-1, 1, 0], [1, 0, -1], [0, -1, 5]])
+        histories = np.eye(4, dtype=bool)
+        system, histories = remove_redundant(system, histories, 0)
+        assert system.tolist() == [[-1, 1, 0], [1, 0, -1], [0, -1, 5]]
+
+    def test_remove_implied_bounds(self):
+        # Columns (j, n, 1): j >= 1, j >= n - 2 and j <= n, the second lower
+        # bound is only inactive when n <= 2
+        system = np.array([[1, 0, -1], [1, -1, 2], [-1, 1, 0]])
+        assert remove_implied_bounds(system, 0, np.zeros((0, 3), dtype=int)).tolist() == system.tolist()
+        assert remove_implied_bounds(system, 0, np.array([[0, -1, 2]])).tolist() == [[1, 0, -1], [-1, 1, 0]]
+
+    def test_variable_bounds(self):
+        system = np.array([[2, 1, -1], [-3, 0, 4], [0, 1, 0]])
+        lowers, uppers = variable_bounds(system, 0)
+        assert lowers == [(0, Fraction(-1, 2), Fraction(1, 2))]
+        assert uppers == [(0, 0, Fraction(4, 3))]
+
+    def test_bounds(self):
+        # Columns (i, j, n, m, 1) of the skewed loop j - i in [1, n], j in [1, m]
+        system = np.array([
+            [0, 1, 0, 0, -1],
+            [0, -1, 0, 1, 0],
+            [-1, 1, 0, 0, -1],
+            [1, -1, 1, 0, 0]
+        ])
+        bounds = fourier_motzkin_bounds(system, 2, keep_redundant=True)
+        assert bounds[1] == (
+            [(0, 0, 0, 0, 1), (1, 0, 0, 0, 1)],
+            [(0, 0, 0, 1, 0), (1, 0, 1, 0, 0)]
+        )
+        assert bounds[0] == (
+            [(0, 0, -1, 0, 1)],
+            [(0, 0, 0, 1, -1)]
+        )
+
+    def test_redundant_bounds(self):
+        # Columns (i, j, n, 1): 1 <= j <= n, j <= i and 1 <= i <= n, j <= n
+        # is implied by the others and i >= 1 also follows from j
+        system = np.array([
+            [0, 1, 0, -1],
+            [0, -1, 1, 0],
+            [1, -1, 0, 0],
+            [1, 0, 0, -1],
+            [-1, 0, 1, 0]
+        ])
+        bounds = fourier_motzkin_bounds(system, 2)
+        assert bounds[1] == (
+            [(0, 0, 0, 1)],
+            [(1, 0, 0, 0)]
+        )
+        assert bounds[0] == (
+            [(0, 0, 0, 1)],
+            [(0, 0, 1, 0)]
+        )
+        bounds = fourier_motzkin_bounds(system, 2, keep_redundant=True)
+        assert bounds[1] == (
+            [(0, 0, 0, 1)],
+            [(0, 0, 1, 0), (1, 0, 0, 0)]
+        )
+        assert bounds[0] == (
+            [(0, 0, 0, 1), (0, 0, 0, 1)],
+            [(0, 0, 1, 0)]
+        )
+
+    def test_context_bounds(self):
+        # Columns (i, j, n, m, 1) of the skewed loop j - i in [1, n], j in
+        # [1, m], with n <= 1 the lower bound j >= 1 is never the tightest
+        system = np.array([
+            [0, 1, 0, 0, -1],
+            [0, -1, 0, 1, 0],
+            [-1, 1, 0, 0, -1],
+            [1, -1, 1, 0, 0],
+            [0, 0, -1, 0, 1]
+        ])
+        bounds = fourier_motzkin_bounds(system, 2)
+        assert bounds[1] == (
+            [(1, 0, 0, 0, 1)],
+            [(1, 0, 1, 0, 0)]
+        )
+
+    def test_large_coefficients(self):
+        # Combinations that overflow int64 are computed with python integers
+        big = 2**40
+        system = np.array([[-1, big, 0], [1, -big - 1, big**2]])
+        bounds = fourier_motzkin_bounds(system, 2)
+        assert bounds[0] == ([], [(0, 0, big**3)])
@@ -1,5 +1,6 @@
 from opoly.expressions import Expression, VariableExpression, ConstantExpression
-from opoly.statements import ForLoopStatement, DeclarationStatement, AssignmentStatement
+from opoly.statements import (
+    ForLoopStatement, DeclarationStatement, AssignmentStatement, AssumptionStatement, BlockStatement)
 from opoly.modules.generator import PseudoCodeGenerator, CCodeGenerator
 
 
@@ -77,6 +78,17 @@ class TestPseudoCodeGenerator():
         code = PseudoCodeGenerator().generate(outer_loop)
         assert code == "FOR i FROM 1 TO N STEP 1 {\n    FOR CONC j FROM 1 TO M STEP 1 {\n        VAR x = 1;\n        STM a[j] = x + 1;\n    }\n}"
 
+    def test_assumptions(self):
+        stmt = ForLoopStatement(
+            body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i")]), ConstantExpression(0))],
+            index=VariableExpression("i"),
+            lowerbound=ConstantExpression(1),
+            upperbound=VariableExpression("N"),
+            assumptions=(AssumptionStatement(VariableExpression("N"), ">=", ConstantExpression(3)),)
+        )
+        code = PseudoCodeGenerator().generate(stmt)
+        assert code == "ASSUME N >= 3;\nFOR i FROM 1 TO N STEP 1 {\n    STM a[i] = 0;\n}"
+
 
 class TestCCodeGenerator():
 
@@ -151,3 +163,28 @@ class TestCCodeGenerator():
         )
         code = CCodeGenerator().generate(outer_loop)
         assert code == "for(int i = 1; i <= N; i++) {\n    #pragma omp parallel for\n    for(int j = 1; j <= M; j++) {\n        int x = 1;\n        a[j] = x + 1;\n    }\n}"
+
+    def test_assumptions(self):
+        stmt = ForLoopStatement(
+            body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i")]), ConstantExpression(0))],
+            index=VariableExpression("i"),
+            lowerbound=ConstantExpression(1),
+            upperbound=VariableExpression("N"),
+            is_parallel=True,
+            assumptions=(AssumptionStatement(VariableExpression("N"), "==", VariableExpression("M")),)
+        )
+        code = CCodeGenerator().generate(stmt)
+        assert code == "// assume N == M\n#pragma omp parallel for\nfor(int i = 1; i <= N; i++) {\n    a[i] = 0;\n}"
+
+    def test_block(self):
+        loops = tuple(ForLoopStatement(
+            body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i")]), ConstantExpression(0))],
+            index=VariableExpression("i"),
+            lowerbound=lowerbound,
+            upperbound=upperbound
+        ) for lowerbound, upperbound in [(ConstantExpression(1), VariableExpression("M")),
+                                         (Expression([VariableExpression("M"), ConstantExpression(1)], ["+"]),
+                                          VariableExpression("N"))])
+        code = CCodeGenerator().generate(BlockStatement(loops))
+        assert code == "for(int i = 1; i <= M; i++) {\n    a[i] = 0;\n}\n" \
+                       "for(int i = M + 1; i <= N; i++) {\n    a[i] = 0;\n}"
@@ -0,0 +1,195 @@
+import numpy as np
+import pytest
+
+from opoly.modules.memo import LRUMemo, canonical_dependencies, matrix_key
+from opoly.modules.scheduler import LamportCPScheduler, MemoizedScheduler
+from opoly.modules.allocator import LamportCPAllocator, MemoizedAllocator
+
+
+class CountingScheduler(LamportCPScheduler):
+
+    def __init__(self):
+        self.calls = []
+        self.weights = []
+        self.batches = []
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        self.calls.append(deps.tolist())
+        self.weights.append(weights.tolist() if weights is not None else None)
+        return np.ones(deps.shape[1], dtype=int), None
+
+    def schedule_batch(
+        self,
+        deps_list: list[np.ndarray],
+        weights_list: list[np.ndarray] = None
+    ) -> list[tuple[np.ndarray, str]]:
+        self.batches.append(len(deps_list))
+        weights_list = weights_list if weights_list is not None else [None] * len(deps_list)
+        return [self.schedule(deps, weights) for deps, weights in zip(deps_list, weights_list)]
+
+
+class CountingAllocator(LamportCPAllocator):
+
+    def __init__(self):
+        self.calls = 0
+        self.batches = []
+
+    def allocate(self, schedule: np.ndarray) -> (np.ndarray, str):
+        self.calls += 1
+        return np.identity(schedule.shape[0], dtype=int), None
+
+    def allocate_batch(self, schedules: list[np.ndarray]) -> list[tuple[np.ndarray, str]]:
+        self.batches.append(len(schedules))
+        return [self.allocate(schedule) for schedule in schedules]
+
+
+class TestLRUMemo():
+
+    def test_hit_miss(self):
+        memo = LRUMemo(2)
+        assert memo.get("a") == (False, None)
+        memo.put("a", 1)
+        assert memo.get("a") == (True, 1)
+        assert memo.hits == 1
+        assert memo.misses == 1
+        assert memo.hit_rate == 0.5
+
+    def test_eviction(self):
+        memo = LRUMemo(2)
+        memo.put("a", 1)
+        memo.put("b", 2)
+        memo.get("a")
+        memo.put("c", 3)
+        assert len(memo) == 2
+        assert memo.get("b") == (False, None)
+        assert memo.get("a") == (True, 1)
+        assert memo.get("c") == (True, 3)
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            LRUMemo(0)
+
+
+class TestCanonicalDependencies():
+
+    def test_deduplicate_and_sort(self):
+        deps = np.array([
+            [1, 1],
+            [0, 1],
+            [1, 1],
+            [1, -1]
+        ])
+        assert canonical_dependencies(deps).tolist() == [
+            [0, 1],
+            [1, -1],
+            [1, 1]
+        ]
+
+    def test_same_key_for_permuted_rows(self):
+        deps1 = np.array([[1, 0], [0, 1]])
+        deps2 = np.array([[0, 1], [1, 0], [0, 1]], dtype=np.int32)
+        assert matrix_key(canonical_dependencies(deps1)) == \
+            matrix_key(canonical_dependencies(deps2))
+
+
+class TestMemoizedScheduler():
+
+    def test_solve_once(self):
+        inner = CountingScheduler()
+        scheduler = MemoizedScheduler(inner)
+        sched1, _ = scheduler.schedule(np.array([[1, 0], [0, 1]]))
+        sched2, _ = scheduler.schedule(np.array([[0, 1], [1, 0], [1, 0]]))
+        assert sched1.tolist() == sched2.tolist() == [1, 1]
+        assert inner.calls == [[[0, 1], [1, 0]]]
+        assert scheduler.memo.hits == 1
+        assert scheduler.memo.misses == 1
+
+    def test_weights(self):
+        inner = CountingScheduler()
+        scheduler = MemoizedScheduler(inner)
+        deps = np.array([[1, 0], [0, 1]])
+        scheduler.schedule(deps)
+        scheduler.schedule(deps, np.array([3, 3]))
+        scheduler.schedule(deps, np.array([10, 20]))
+        scheduler.schedule(deps, np.array([1, 2]))
+        scheduler.schedule_batch([deps, deps], [np.array([2, 4]), np.array([2, 1])])
+        # Equal weights are the latency objective, scaled weights the same objective
+        assert inner.weights == [None, [1, 2], [2, 1]]
+        assert scheduler.memo.hits == 3
+
+    def test_wrapped_options(self):
+        scheduler = MemoizedScheduler(LamportCPScheduler(timeout=7, signed=True))
+        assert scheduler.timeout(100) == 7
+        assert scheduler.signed
+
+    def test_invalid_dependencies(self):
+        scheduler = MemoizedScheduler(LamportCPScheduler())
+        sched, err = scheduler.schedule(np.array([1, 0]))
+        assert sched is None
+        assert err == "Dependencies must be a matrix!"
+
+    def test_batch(self):
+        inner = CountingScheduler()
+        scheduler = MemoizedScheduler(inner)
+        scheduler.schedule(np.array([[1, 0]]))
+        res = scheduler.schedule_batch([
+            np.array([[1, 0], [0, 1]]),
+            np.array([[1, 0]]),
+            np.array([[0, 1], [1, 0]]),
+            np.array([[1, 1, 0]])
+        ])
+        assert [sched.tolist() if sched is not None else err for sched, err in res] == [
+            [1, 1], [1, 1], [1, 1], [1, 1, 1]]
+        # One batch with the two distinct missing patterns
+        assert inner.batches == [2]
+        assert scheduler.schedule(np.array([[1, 1, 0]]))[0].tolist() == [1, 1, 1]
+        assert len(inner.calls) == 3
+
+    def test_not_proven_optimal(self):
+        inner = UnprovenScheduler()
+        scheduler = MemoizedScheduler(inner)
+        for _ in range(2):
+            sched, err = scheduler.schedule(np.array([[1, 0], [0, 1]]))
+            assert sched.tolist() == [1, 1]
+            assert err == "Solution not proven optimal!"
+        assert inner.calls == 2
+        assert len(scheduler.memo) == 0
+
+
+class UnprovenScheduler(LamportCPScheduler):
+
+    def __init__(self):
+        self.calls = 0
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        self.calls += 1
+        return np.ones(deps.shape[1], dtype=int), "Solution not proven optimal!"
+
+
+class TestMemoizedAllocator():
+
+    def test_allocate_once(self):
+        inner = CountingAllocator()
+        allocator = MemoizedAllocator(inner)
+        alloc1, _ = allocator.allocate(np.array([1, 1]))
+        alloc1[0][0] = 42
+        alloc2, _ = allocator.allocate(np.array([1, 1]))
+        assert alloc2.tolist() == [[1, 0], [0, 1]]
+        assert inner.calls == 1
+        assert allocator.memo.hit_rate == 0.5
+
+    def test_wrapped_options(self):
+        allocator = MemoizedAllocator(LamportCPAllocator(unimodularity="inverse", timeout=7))
+        assert allocator.unimodularity == "inverse"
+        assert allocator.timeout(100) == 7
+        assert allocator.model_path(2) == LamportCPAllocator(unimodularity="inverse").model_path(2)
+
+    def test_batch(self):
+        inner = CountingAllocator()
+        allocator = MemoizedAllocator(inner)
+        allocator.allocate(np.array([1, 1]))
+        res = allocator.allocate_batch([np.array([1, 1]), np.array([1, 0, 1]), np.array([1, 0, 1])])
+        assert [alloc.tolist() for alloc, _ in res] == [
+            [[1, 0], [0, 1]], [[1, 0, 0], [0, 1, 0], [0, 0, 1]], [[1, 0, 0], [0, 1, 0], [0, 0, 1]]]
+        assert inner.batches == [1]
+        assert inner.calls == 2
@@ -8,6 +8,7 @@ from opoly.modules.parser import (
     parse_operator,
     parse_expression,
     parse_assignment_statement,
+    parse_assumption_statement,
     parse_unary_expression,
     PseudocodeForLoopParser
 )
@@ -285,6 +286,27 @@ class TestParsingFunctions():
             assert error == err
 
 
+    def test_assumption_statement_parser(self):
+        goods = {
+            "n >= 3": ("n", ">=", "3"),
+            "m==n": ("m", "==", "n"),
+            "2*n - 1 <= m": ("2 * n - 1", "<=", "m")
+        }
+        bads = {
+            "n > 3": "Expected assumption <expression> >=, <= or == <expression>",
+            "n >= m >= 2": "Expected assumption <expression> >=, <= or == <expression>",
+            "n >= 3 x": "Unsupported operator"
+        }
+        for code, res in goods.items():
+            parsed, err = parse_assumption_statement(code)
+            assert parsed is not None
+            assert (str(parsed.left_term), parsed.relation, str(parsed.right_term)) == res
+        for code, err in bads.items():
+            parsed, error = parse_assumption_statement(code)
+            assert parsed is None
+            assert error == err
+
+
 class TestPseudocodeForLoopParser():
 
     def test_simple_parse_loop_body(self):
@@ -393,3 +415,15 @@ class TestPseudocodeForLoopParser():
         """
         loop, err = PseudocodeForLoopParser().parse_for_loop(code)
         assert loop is not None
+
+    def test_assumptions(self):
+        code = "ASSUME n >= 3; ASSUME m == n;\nFOR i FROM 1 TO n { STM a[i] = a[i-1]; }"
+        loop, err = PseudocodeForLoopParser().parse_for_loop(code)
+        assert loop is not None
+        assert list(str(a) for a in loop.assumptions) == ["n >= 3", "m == n"]
+        assert str(loop.index) == "i"
+
+    def test_wrong_assumption(self):
+        code = "ASSUME n > 3; FOR i FROM 1 TO n { STM a[i] = a[i-1]; }"
+        loop, err = PseudocodeForLoopParser().parse_for_loop(code)
+        assert loop is None
@@ -0,0 +1,187 @@
+import json
+import sys
+import time
+
+import numpy as np
+
+from opoly.modules.scheduler import LamportCPScheduler
+from opoly.modules.minizinc import LAMPORT_SCHEDULER_PATH
+from opoly.modules.minizinc.utils import solve_model, scaled_timeout, SolverBudget, active_budget
+from opoly.modules.minizinc.portfolio import SolverPortfolio, parse_output, instance_shape
+
+
+class RecordingPortfolio(SolverPortfolio):
+
+    def __init__(self, status="OPTIMAL_SOLUTION", duration=0.0):
+        super().__init__(solvers=["chuffed"])
+        self.status = status
+        self.duration = duration
+        self.timeouts = []
+
+    def _race(self, model, data, solvers, timeout):
+        self.timeouts.append(timeout)
+        time.sleep(self.duration)
+        winner = solvers[0] if self.status == "OPTIMAL_SOLUTION" else None
+        return winner, self.status, {"tau": [2, 1]}, {}
+
+
+class FakePortfolio(SolverPortfolio):
+
+    def __init__(self, winners, **kwargs):
+        super().__init__(solvers=["chuffed", "gecode", "cbc"], **kwargs)
+        self.winners = list(winners)
+        self.races = []
+
+    def _race(self, model, data, solvers, timeout):
+        self.races.append(list(solvers))
+        winner = self.winners.pop(0)
+        if winner not in solvers:
+            return None, "SATISFIED", None, {}
+        return winner, "OPTIMAL_SOLUTION", {"tau": [1] * data["n"]}, {}
+
+
+class ScriptedPortfolio(SolverPortfolio):
+
+    def __init__(self, outputs):
+        super().__init__(solvers=list(outputs))
+        self.outputs = outputs
+
+    def _command(self, model, data, solver, timeout):
+        # Each solver prints its scripted output instead of running MiniZinc
+        return [sys.executable, "-c", f"import sys; sys.stdout.write({self.outputs[solver]!r})"]
+
+
+class TestParseOutput():
+
+    def test_optimal(self):
+        output = '{\n  "tau" : [3, 1]\n}\n----------\n{\n  "tau" : [2, 1]\n}\n----------\n==========\n%%%mzn-stat: nodes=4\n'
+        assert parse_output(output) == ("OPTIMAL_SOLUTION", {"tau": [2, 1]})
+
+    def test_timeout(self):
+        assert parse_output('{"tau" : [3, 1]}\n----------\n') == ("SATISFIED", {"tau": [3, 1]})
+        assert parse_output("") == ("UNKNOWN", None)
+
+    def test_unsatisfiable(self):
+        assert parse_output("=====UNSATISFIABLE=====\n") == ("UNSATISFIABLE", None)
+
+
+class TestSolverPortfolio():
+
+    def test_instance_shape(self):
+        data = {"r": 3, "n": 2, "D": [[1, -1], [1, 1], [0, 1]]}
+        assert instance_shape(LAMPORT_SCHEDULER_PATH, data) == "lamport_scheduler(n=2,r=3)"
+
+    def test_scheduler(self):
+        portfolio = FakePortfolio(["gecode"])
+        sched, err = LamportCPScheduler(portfolio).schedule(np.array([[1, 0], [0, 1]]))
+        assert err is None
+        assert sched.tolist() == [1, 1]
+        assert portfolio.races == [["chuffed", "gecode", "cbc"]]
+
+    def test_learn_preferred_solver(self):
+        portfolio = FakePortfolio(["gecode"] * 3 + ["gecode"], min_races=3)
+        data = {"n": 2, "tau": [1, 1]}
+        for _ in range(3):
+            portfolio.solve("lamport_allocator.mzn", data)
+        assert portfolio.wins("lamport_allocator(n=2)") == {"gecode": 3}
+        assert portfolio.preferred_solver("lamport_allocator(n=2)") == "gecode"
+        portfolio.solve("lamport_allocator.mzn", data)
+        assert portfolio.races[-1] == ["gecode"]
+        # Other shapes are still raced
+        assert portfolio.preferred_solver("lamport_allocator(n=3)") is None
+
+    def test_no_confident_winner(self):
+        portfolio = FakePortfolio(["gecode", "chuffed", "gecode", "chuffed"], min_races=4)
+        for _ in range(4):
+            portfolio.solve("lamport_allocator.mzn", {"n": 2, "tau": [1, 1]})
+        assert portfolio.preferred_solver("lamport_allocator(n=2)") is None
+
+    def test_preferred_solver_fails(self):
+        portfolio = FakePortfolio(["chuffed", "cbc", "cbc"], min_races=1)
+        data = {"n": 2, "tau": [1, 1]}
+        portfolio.solve("lamport_allocator.mzn", data)
+        sol, err = portfolio.solve("lamport_allocator.mzn", data)
+        assert err is None
+        assert portfolio.races[1:] == [["chuffed"], ["chuffed", "gecode", "cbc"]]
+
+    def test_state_file(self, tmp_path):
+        state_file = str(tmp_path / "portfolio.json")
+        portfolio = FakePortfolio(["cbc"], state_file=state_file)
+        portfolio.solve("lamport_allocator.mzn", {"n": 2, "tau": [1, 1]})
+        with open(state_file) as file:
+            assert json.load(file) == {"lamport_allocator(n=2)": {"cbc": 1}}
+        assert SolverPortfolio(state_file=state_file).wins("lamport_allocator(n=2)") == {"cbc": 1}
+
+    def test_no_solvers(self):
+        sol, err = SolverPortfolio(solvers=[]).solve(LAMPORT_SCHEDULER_PATH, {"r": 1, "n": 1, "D": [[1]]})
+        assert sol is None
+        assert err.startswith("An error occurred!")
+
+    def test_not_proven_optimal(self):
+        sol, err = RecordingPortfolio(status="SATISFIED").solve(LAMPORT_SCHEDULER_PATH, {"r": 1, "n": 2})
+        assert sol == {"tau": [2, 1]}
+        assert err == "Solution not proven optimal!"
+        sched, err = LamportCPScheduler(RecordingPortfolio(status="SATISFIED")).schedule(np.array([[1, -1]]))
+        assert sched.tolist() == [2, 1]
+        assert err == "Solution not proven optimal!"
+
+
+class TestRace():
+
+    def test_optimal_ends_race(self):
+        portfolio = ScriptedPortfolio({
+            "chuffed": '{"tau" : [2, 1], "_objective" : 3}\n----------\n==========\n',
+            "gecode": "=====UNKNOWN=====\n"
+        })
+        winner, status, solution, _ = portfolio._race("lamport_scheduler.mzn", {}, portfolio.solvers, 5)
+        assert (winner, status, solution) == ("chuffed", "OPTIMAL_SOLUTION", {"tau": [2, 1]})
+
+    def test_best_objective(self):
+        portfolio = ScriptedPortfolio({
+            "chuffed": '{"tau" : [4, 1], "_objective" : 5}\n----------\n',
+            "gecode": '{"tau" : [2, 1], "_objective" : 3}\n----------\n',
+            "cbc": '{"tau" : [3, 1], "_objective" : 4}\n----------\n',
+            "or-tools": "=====UNKNOWN=====\n"
+        })
+        winner, status, solution, _ = portfolio._race("lamport_scheduler.mzn", {}, portfolio.solvers, 5)
+        assert (winner, status, solution) == (None, "SATISFIED", {"tau": [2, 1]})
+
+    def test_objective_statistic(self):
+        # Without the objective in the solution, the one of the statistics is used
+        portfolio = ScriptedPortfolio({
+            "chuffed": '{"tau" : [3, 1]}\n----------\n%%%mzn-stat: objective=4\n',
+            "gecode": '{"tau" : [2, 1]}\n----------\n%%%mzn-stat: objective=3\n',
+            "cbc": '{"tau" : [1, 1]}\n----------\n'
+        })
+        sol, err = portfolio.solve("lamport_scheduler.mzn", {})
+        assert sol == {"tau": [2, 1]}
+        assert err == "Solution not proven optimal!"
+
+
+class TestSolverBudget():
+
+    def test_scaled_timeout(self):
+        assert scaled_timeout(1) == 2
+        assert scaled_timeout(25) == 4
+        assert scaled_timeout(10 ** 6) == 30
+        portfolio = RecordingPortfolio()
+        LamportCPScheduler(portfolio).schedule(np.array([[1, 0], [0, 1]]))
+        LamportCPScheduler(portfolio, timeout=7).schedule(np.array([[1, 0], [0, 1]]))
+        assert portfolio.timeouts == [2, 7]
+
+    def test_shared_budget(self):
+        portfolio = RecordingPortfolio(duration=0.2)
+        data = {"r": 1, "n": 2, "D": [[1, -1]]}
+        assert active_budget() is None
+        with SolverBudget(0.3) as budget:
+            assert active_budget() is budget
+            assert solve_model(LAMPORT_SCHEDULER_PATH, data, timeout=5, portfolio=portfolio)[1] is None
+            assert budget.remaining < 0.3
+            assert solve_model(LAMPORT_SCHEDULER_PATH, data, timeout=5, portfolio=portfolio)[1] is None
+            # Nothing is left for a third model
+            assert budget.remaining == 0
+            sol, err = solve_model(LAMPORT_SCHEDULER_PATH, data, timeout=5, portfolio=portfolio)
+        assert active_budget() is None
+        assert sol is None
+        assert err == "Solution not found in time!"
+        assert portfolio.timeouts == [1, 1]
@@ -0,0 +1,156 @@
+import json
+
+import pymzn
+
+from opoly.modules.profiler import (
+    Profiler,
+    active_profiler,
+    profile_region,
+    profile_stage,
+    profile_count,
+    profile_solver_run
+)
+from opoly.modules.minizinc.utils import parse_statistics, statistics_solver, _solve_model
+from opoly.scripts.opoly import compile_loop
+
+# Output of minizinc -s with chuffed for a minimization model, the solution
+# lines are not part of the log
+CHUFFED_LOG = """%%%mzn-stat: flatBoolVars=3
+%%%mzn-stat: flatIntVars=4
+%%%mzn-stat: flatIntConstraints=5
+%%%mzn-stat: method="minimize"
+%%%mzn-stat: flatTime=0.0402113
+%%%mzn-stat-end
+%%%mzn-stat: nodes=12
+%%%mzn-stat: failures=4
+%%%mzn-stat: restarts=0
+%%%mzn-stat: variables=25
+%%%mzn-stat: propagations=151
+%%%mzn-stat: peakDepth=3
+%%%mzn-stat: nogoods=4
+%%%mzn-stat: peakMem=0.00
+%%%mzn-stat: time=0.001
+%%%mzn-stat: initTime=0.000
+%%%mzn-stat: solveTime=0.001
+%%%mzn-stat-end"""
+
+
+class SolutionsStub(list):
+
+    def __init__(self, solutions, status, log, stderr=""):
+        super().__init__(solutions)
+        self.status = status
+        self.log = log
+        self.stderr = stderr
+
+
+class SilentSolver(pymzn.Solver):
+
+    def args(self, **kwargs):
+        return [flag for flag in super().args(**kwargs) if flag != "-s"]
+
+
+class TestProfiler():
+
+    def test_inactive(self):
+        assert active_profiler() is None
+        with profile_region():
+            with profile_stage("parse"):
+                profile_count("dependencies", 3)
+                profile_solver_run({"status": "COMPLETE"})
+
+    def test_stages(self):
+        with Profiler() as profiler:
+            assert active_profiler() is profiler
+            with profile_region("loop"):
+                with profile_stage("parse"):
+                    sum(range(1000))
+                with profile_stage("detect"):
+                    profile_count("dependencies", 2)
+                    profile_count("dependencies", 1)
+        assert active_profiler() is None
+        assert len(profiler.regions) == 1
+        region = profiler.regions[0]
+        assert region.name == "loop"
+        assert [s["stage"] for s in region.stages] == ["parse", "detect"]
+        for stage in region.stages:
+            assert stage["wall_time"] >= 0
+            assert stage["cpu_time"] >= 0
+            assert stage["peak_memory"] >= 0
+        assert region.counters == {"dependencies": 3}
+
+    def test_stage_without_region(self):
+        with Profiler(trace_memory=False) as profiler:
+            with profile_stage("parse"):
+                pass
+        assert len(profiler.regions) == 1
+        assert "peak_memory" not in profiler.regions[0].stages[0]
+
+    def test_solver_runs(self):
+        with Profiler() as profiler:
+            with profile_region():
+                profile_solver_run({"model": "lamport_scheduler", "status": "COMPLETE"})
+        assert profiler.regions[0].solver_runs == [
+            {"model": "lamport_scheduler", "status": "COMPLETE"}]
+
+    def test_json_totals(self):
+        with Profiler() as profiler:
+            for _ in range(2):
+                with profile_region():
+                    with profile_stage("parse"):
+                        pass
+        result = json.loads(profiler.to_json())
+        assert len(result["regions"]) == 2
+        assert result["regions"][1]["region"] == "#2"
+        assert result["totals"]["parse"]["wall_time"] == \
+            sum(r["stages"][0]["wall_time"] for r in result["regions"])
+
+    def test_compile_loop(self):
+        with Profiler() as profiler:
+            compiled, _ = compile_loop("FOR i FROM 0 TO N { STM a[i]=b[i+1]; }")
+        assert compiled is not None
+        region = profiler.regions[0]
+        assert [s["stage"] for s in region.stages] == ["parse", "check", "detect", "generate"]
+        assert region.counters == {"dependencies": 0}
+
+
+class TestParseStatistics():
+
+    def test_statistics(self):
+        log = "%%%mzn-stat: nodes=12\n%%%mzn-stat: solveTime=0.002\n%%%mzn-stat-end\nx"
+        stderr = '%%%mzn-stat: method="minimize"'
+        assert parse_statistics(log, stderr) == {
+            "nodes": 12,
+            "solveTime": 0.002,
+            "method": "minimize"
+        }
+
+    def test_empty(self):
+        assert parse_statistics(None, "") == {}
+
+    def test_chuffed_log(self):
+        statistics = parse_statistics(CHUFFED_LOG, "")
+        assert statistics["nodes"] == 12
+        assert statistics["solveTime"] == 0.001
+        assert statistics["method"] == "minimize"
+
+    def test_statistics_flag(self):
+        assert statistics_solver(SilentSolver("chuffed")).args(all_solutions=True).count("-s") == 1
+        assert statistics_solver(pymzn.chuffed).args().count("-s") == 1
+
+    def test_solver_run_statistics(self, monkeypatch):
+        solver_args = []
+
+        def minizinc(**kwargs):
+            solver_args.append(kwargs["solver"].args(all_solutions=True))
+            return SolutionsStub([{"x": 3}], pymzn.Status.COMPLETE, CHUFFED_LOG)
+
+        monkeypatch.setattr(pymzn, "minizinc", minizinc)
+        with Profiler() as profiler:
+            with profile_region():
+                assert _solve_model("model.mzn", {}, SilentSolver("chuffed"), 1) == ({"x": 3}, None)
+        assert "-s" in solver_args[0]
+        run = profiler.regions[0].solver_runs[0]
+        assert run["nodes"] == 12
+        assert run["solve_time"] == 0.001
+        assert run["status"] == "COMPLETE"
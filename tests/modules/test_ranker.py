@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from opoly.modules.parser import PseudocodeForLoopParser
+from opoly.modules.ranker import WavefrontScheduleRanker, iteration_points
+
+GAUSS_SEIDEL_CODE = "FOR k FROM 1 TO q { FOR i FROM 1 TO n { STM a[i] = (a[i-1] + a[i] + a[i+1]) / 3.0; } }"
+TRIANGULAR_CODE = "FOR i FROM 0 TO N { FOR j FROM 0 TO i { STM a[i][j] = a[i-1][j] + a[i][j-1]; } }"
+
+
+def parse(code):
+    loop, _ = PseudocodeForLoopParser().parse_for_loop(code)
+    return loop
+
+
+class TestIterationPoints():
+
+    def test_rectangular(self):
+        points = iteration_points(parse(GAUSS_SEIDEL_CODE), {"q": 2, "n": 3})
+        assert points.tolist() == [[1, 1], [1, 2], [1, 3], [2, 1], [2, 2], [2, 3]]
+
+    def test_triangular(self):
+        points = iteration_points(parse(TRIANGULAR_CODE), {"N": 2})
+        assert points.tolist() == [[0, 0], [1, 0], [1, 1], [2, 0], [2, 1], [2, 2]]
+
+    def test_offset_bounds(self):
+        points = iteration_points(parse("FOR i FROM 1 TO N-1 { FOR j FROM 2 TO i+1 { STM a[i][j] = a[i-1][j]; } }"),
+                                  {"N": 3})
+        assert points.tolist() == [[1, 2], [2, 2], [2, 3]]
+
+    def test_empty(self):
+        assert iteration_points(parse(GAUSS_SEIDEL_CODE), {"q": 0, "n": 3}).shape == (0, 2)
+
+    def test_too_many_points(self):
+        assert iteration_points(parse(GAUSS_SEIDEL_CODE), {"q": 100, "n": 100}, max_points=9999) is None
+
+    def test_missing_parameter(self):
+        with pytest.raises(ValueError):
+            iteration_points(parse(GAUSS_SEIDEL_CODE), {"q": 2})
+
+
+class TestWavefrontScheduleRanker():
+
+    def test_score(self):
+        points = iteration_points(parse(GAUSS_SEIDEL_CODE), {"q": 2, "n": 3})
+        score = WavefrontScheduleRanker(threads=2).score(points, np.array([2, 1]))
+        # Times 3, 4, 5 for k = 1 and 5, 6, 7 for k = 2
+        assert (score.wavefronts, score.max_width, score.parallel_steps) == (5, 2, 5)
+        score = WavefrontScheduleRanker(threads=2).score(points, np.array([1, 0]))
+        assert (score.wavefronts, score.max_width, score.parallel_steps) == (2, 3, 4)
+
+    def test_rank(self):
+        ranker = WavefrontScheduleRanker(threads=4)
+        schedules = [np.array([3, 1]), np.array([2, 1]), np.array([3, 2])]
+        ranking = ranker.rank(parse(GAUSS_SEIDEL_CODE), {"q": 10, "n": 100}, schedules)
+        assert [schedule.tolist() for schedule, _ in ranking] == [[2, 1], [3, 1], [3, 2]]
+        assert ranking[0][1].wavefronts == 118
+        assert ranker.rank(parse(GAUSS_SEIDEL_CODE), {"q": 10, "n": 100}, []) == []
+        assert WavefrontScheduleRanker(max_points=10).rank(
+            parse(GAUSS_SEIDEL_CODE), {"q": 10, "n": 100}, schedules) is None
@@ -0,0 +1,57 @@
+import numpy as np
+
+from opoly.modules.reducer import LamportDependenciesReducer, primitive_rows
+from opoly.modules.scheduler import LamportEnumerationScheduler
+
+
+class TestLamportDependenciesReducer():
+
+    def test_duplicates_and_multiples(self):
+        deps = np.array([[1, 0], [2, 0], [1, 0], [0, 3]])
+        assert LamportDependenciesReducer().reduce(deps).tolist() == [[0, 1], [1, 0]]
+
+    def test_combinations(self):
+        deps = np.array([[1, 0], [0, 1], [1, 1], [2, 3]])
+        assert LamportDependenciesReducer().reduce(deps).tolist() == [[0, 1], [1, 0]]
+        deps = np.array([[1, -1], [1, 1], [0, 1]])
+        assert LamportDependenciesReducer().reduce(deps).tolist() == [[0, 1], [1, -1]]
+
+    def test_not_implied(self):
+        deps = np.array([[1, 0, 0], [0, 1, 0], [1, -1, 1], [0, 0, 1]])
+        assert LamportDependenciesReducer().reduce(deps).tolist() == [
+            [0, 0, 1], [0, 1, 0], [1, -1, 1], [1, 0, 0]]
+        # Opposite dependencies make the loop unschedulable, both are kept
+        deps = np.array([[1, 0], [-1, 0]])
+        assert LamportDependenciesReducer().reduce(deps).tolist() == [[-1, 0], [1, 0]]
+
+    def test_zero_rows(self):
+        deps = np.array([[0, 0], [1, 0], [0, 0]])
+        assert LamportDependenciesReducer().reduce(deps).tolist() == [[0, 0], [1, 0]]
+
+    def test_canonical(self):
+        reducer = LamportDependenciesReducer()
+        deps = np.array([[1, 1, 0], [0, 1, -1], [2, 0, 0], [1, 2, -1]])
+        assert reducer.reduce(deps).tolist() == reducer.reduce(deps[::-1]).tolist()
+        assert reducer.reduce(reducer.reduce(deps)).tolist() == reducer.reduce(deps).tolist()
+
+    def test_same_schedules(self):
+        reducer = LamportDependenciesReducer()
+        scheduler = LamportEnumerationScheduler()
+        rng = np.random.default_rng(42)
+        for _ in range(200):
+            deps = rng.integers(-2, 3, size=(rng.integers(1, 6), 3))
+            reduced = reducer.reduce(deps)
+            assert reduced.shape[0] <= deps.shape[0]
+            sched, _ = scheduler.schedule(deps)
+            reduced_sched, _ = scheduler.schedule(reduced)
+            if sched is None:
+                assert reduced_sched is None
+            else:
+                assert sched.tolist() == reduced_sched.tolist()
+
+    def test_invalid(self):
+        deps = np.array([[1.5, 0]])
+        assert LamportDependenciesReducer().reduce(deps) is deps
+
+    def test_primitive_rows(self):
+        assert primitive_rows(np.array([[2, -4], [0, 0], [3, 5]])).tolist() == [[1, -2], [0, 0], [3, 5]]
@@ -3,8 +3,10 @@ import numpy as np
 import sympy as sp
 
 from opoly.expressions import Expression, VariableExpression, ConstantExpression, GroupingExpression
-from opoly.statements import AssignmentStatement, ForLoopStatement
-from opoly.modules.scanner import reindex, invert_integer_matrix
+from opoly.statements import AssignmentStatement, ForLoopStatement, AssumptionStatement
+from opoly.statements import BlockStatement
+from opoly.modules.scanner import reindex, invert_integer_matrix, enclose_bounds, to_expression
+from opoly.modules.scanner import fourier_motzkin, reindex_system, split_bounds
 from opoly.modules.scanner import FourierMotzkinScanner
 
 
@@ -156,9 +158,121 @@ class TestReindexerFunctions():
                              sp.Min(l, i - 2*j + m, i - j - 1))
         assert bounds[j] == (sp.ceiling(sp.Max(2, i - l - n, sp.together((i - l + 1)/2))),
                              sp.floor(sp.Min(i - 2, m + n, sp.together((i + m - 1)/2))))
+        # The other bounds of i only differ for empty loops, l < 1 or m < 1
+        assert bounds[i] == (4, l + m + 2*n)
+
+    def test_example5a_redundant(self):
+        l, m, n = sp.symbols("l m n", integers=True)
+        i, j, k = sp.symbols("i j k", integers=True)
+        T = np.array([
+            [2, 1, 1],
+            [1, 1, 0],
+            [0, 0, 1]
+        ], dtype=int)
+        idxs = sp.Matrix([[i], [j], [k]])
+        ls = sp.Matrix([[1], [1], [1]])
+        us = sp.Matrix([[n], [m], [l]])
+        bounds = reindex(
+            invert_integer_matrix(T),
+            idxs,
+            ls,
+            us,
+            keep_redundant=True
+        )
+        assert bounds[k] == (sp.Max(1, i - 2*j + 1, i - j - n),
+                             sp.Min(l, i - 2*j + m, i - j - 1))
         assert bounds[i] == (sp.Max(4, 5 - l, 5 - m),
                              sp.Min(l + m + 2*n, l + 2*m + 2*n - 1, 2*l + m + 2*n - 1))
 
+    def test_signed(self):
+        n, m = sp.symbols("n m", integer=True)
+        i, j = sp.symbols("i j", integer=True)
+        T = np.array([
+            [-2, 3],
+            [-1, 1]
+        ], dtype=int)
+        bounds = reindex(
+            invert_integer_matrix(T),
+            sp.Matrix([[i], [j]]),
+            sp.Matrix([[0], [1]]),
+            sp.Matrix([[n], [m]])
+        )
+        assert bounds[i] == (3 - 2*n, 3*m)
+        assert bounds[j] == (sp.ceiling(sp.Max(sp.together((i - m)/2), sp.together((i - n)/3))),
+                             sp.floor(sp.Min(i/3, sp.together((i - 1)/2))))
+        # Every point of the original loop is scanned once
+        points = set()
+        for ii in range(3 - 2*3, 3*4 + 1):
+            lower = bounds[j][0].subs({i: ii, n: 3, m: 4})
+            upper = bounds[j][1].subs({i: ii, n: 3, m: 4})
+            points.update((ii, jj) for jj in range(int(lower), int(upper) + 1))
+        assert points == set((-2*x + 3*y, -x + y) for x in range(0, 4) for y in range(1, 5))
+
+    def test_context(self):
+        n, m = sp.symbols("n m", integer=True)
+        i, j = sp.symbols("i j", integer=True)
+        T = np.array([
+            [1, 1],
+            [0, 1]
+        ], dtype=int)
+        args = (invert_integer_matrix(T), sp.Matrix([[i], [j]]), sp.Matrix([[1], [1]]), sp.Matrix([[n], [m]]))
+        assert reindex(*args)[j] == (sp.Max(1, i - n), sp.Min(m, i - 1))
+        # With n <= 1 the index j - i can only be n, j >= 1 always holds
+        bounds = reindex(*args, context=(1 - n,))
+        assert bounds[j] == (i - n, i - 1)
+        assert bounds[i] == (2, m + n)
+
+    def test_enclose_rational_constants(self):
+        n = sp.symbols("n", integer=True)
+        i = sp.symbols("i", integer=True)
+        bounds = enclose_bounds({i: ((sp.Rational(1, 2), -n/3), (n,))})
+        assert bounds[i] == (sp.ceiling(sp.Max(sp.Rational(1, 2), -n/3)), n)
+
+    def test_split_bounds(self):
+        n, m = sp.symbols("n m", integer=True)
+        i, j = sp.symbols("i j", integer=True)
+        T = np.array([
+            [1, 1],
+            [0, 1]
+        ], dtype=int)
+        exprs = reindex_system(invert_integer_matrix(T), sp.Matrix([[i], [j]]), sp.Matrix([[1], [1]]),
+                               sp.Matrix([[n], [m]]))
+        bounds = fourier_motzkin(exprs, (i, j))
+        pieces = split_bounds(exprs, (i, j), bounds)
+        assert len(pieces) == 4
+        assert all(len(piece[j][0]) == 1 and len(piece[j][1]) == 1 for piece in pieces)
+        for values in ({n: 3, m: 4}, {n: 4, m: 3}, {n: 3, m: 3}):
+            # Every point is scanned once, the pieces follow the split index
+            points = []
+            for piece in pieces:
+                piece_bounds = enclose_bounds(piece)
+                for ii in range(int(piece_bounds[i][0].subs(values)), int(piece_bounds[i][1].subs(values)) + 1):
+                    lower = piece_bounds[j][0].subs(values).subs(i, ii)
+                    upper = piece_bounds[j][1].subs(values).subs(i, ii)
+                    points.extend((ii, jj) for jj in range(int(lower), int(upper) + 1))
+            assert [p[0] for p in points] == sorted(p[0] for p in points)
+            assert sorted(points) == sorted((x + y, y) for x in range(1, values[n] + 1) for y in range(1, values[m] + 1))
+        # A single pair of bounds is not split
+        assert split_bounds(exprs, (i,), {i: ((sp.Integer(1),), (n,))}) is None
+
+    def test_to_expression(self):
+        n, m = sp.symbols("n m", integer=True)
+        i = sp.symbols("i", integer=True)
+        assert str(to_expression(i - n)) == "i - n"
+        assert str(to_expression(-n + i)) == "i - n"
+        assert str(to_expression(-2*n - m + 1)) == "-m - 2 * n + 1"
+        assert str(to_expression(sp.Integer(-3))) == "-3"
+        assert str(to_expression(sp.Rational(-1, 2))) == "-1 / 2.0"
+        nested = to_expression(sp.Max(1, i - n, m))
+        assert nested.name == "fmax" and len(nested.args) == 2
+        assert nested.args[1].name == "fmax" and len(nested.args[1].args) == 2
+        # The numerator of a rational bound is divided once by its denominator
+        bounds = enclose_bounds({i: ((sp.Integer(1), sp.together((n - 1)/2)), (sp.together(-m/3),))})
+        assert str(to_expression(bounds[i][0])) == "ceil(fmax(1, (n - 1) / 2.0))"
+        assert str(to_expression(bounds[i][1])) == "floor(-m / 3.0)"
+        with pytest.raises(ValueError):
+            to_expression(n**2)
+
 
 # @pytest.mark.skip(reason="too slow to test every time")
 class TestFourierMotzkinScanner():
@@ -328,3 +442,66 @@ class TestFourierMotzkinScanner():
         allocation = np.array([[1, 1], [0, 1]])
         reindexed_loop = FourierMotzkinScanner().reindex(outer_loop, allocation)
         assert reindexed_loop is not None
+
+    def test_assumptions(self):
+        loop = ForLoopStatement(
+            body=[ForLoopStatement(
+                body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i"), VariableExpression("j")]),
+                                          ConstantExpression(0))],
+                index=VariableExpression("j"),
+                lowerbound=ConstantExpression(1),
+                upperbound=VariableExpression("M")
+            )],
+            index=VariableExpression("i"),
+            lowerbound=ConstantExpression(1),
+            upperbound=VariableExpression("N")
+        )
+        allocation = np.array([[1, 1], [0, 1]])
+        assumption = AssumptionStatement(VariableExpression("N"), "<=", ConstantExpression(1))
+        reindexed_loop = FourierMotzkinScanner().reindex(loop, allocation, assumptions=(assumption,))
+        assert reindexed_loop.assumptions == (assumption,)
+        inner_loop = reindexed_loop.body[0]
+        assert str(inner_loop.lowerbound) == "-N + new_i"
+        assert str(inner_loop.upperbound) == "new_i - 1"
+        assert inner_loop.assumptions == ()
+
+    def test_nonlinear_assumption(self):
+        loop = ForLoopStatement(
+            body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i")]), ConstantExpression(0))],
+            index=VariableExpression("i"),
+            lowerbound=ConstantExpression(1),
+            upperbound=VariableExpression("N")
+        )
+        assumption = AssumptionStatement(
+            Expression([VariableExpression("N"), VariableExpression("N")], ["*"]), ">=", ConstantExpression(4))
+        with pytest.raises(ValueError):
+            FourierMotzkinScanner().reindex(loop, np.array([[1]]), assumptions=(assumption,))
+
+    def test_split(self):
+        loop = ForLoopStatement(
+            body=[ForLoopStatement(
+                body=[AssignmentStatement(VariableExpression("a", [VariableExpression("i"), VariableExpression("j")]),
+                                          ConstantExpression(0))],
+                index=VariableExpression("j"),
+                lowerbound=ConstantExpression(1),
+                upperbound=VariableExpression("M")
+            )],
+            index=VariableExpression("i"),
+            lowerbound=ConstantExpression(1),
+            upperbound=VariableExpression("N"),
+            assumptions=(AssumptionStatement(VariableExpression("N"), ">=", ConstantExpression(1)),)
+        )
+        allocation = np.array([[1, 1], [0, 1]])
+        assert not FourierMotzkinScanner().split
+        reindexed = FourierMotzkinScanner(split=True).reindex(loop, allocation)
+        assert isinstance(reindexed, BlockStatement)
+        assert len(reindexed.body) == 4
+        # The assumptions are declared once, before the first piece
+        assert reindexed.body[0].assumptions == loop.assumptions
+        assert all(piece.assumptions == () for piece in reindexed.body[1:])
+        for piece in reindexed.body:
+            inner_loop = piece.body[0]
+            assert inner_loop.is_parallel
+            assert "fm" not in str(inner_loop.lowerbound) + str(inner_loop.upperbound)
+        assert str(reindexed.body[0].body[0].lowerbound) == "1"
+        assert str(reindexed.body[0].body[0].upperbound) == "new_i - 1"
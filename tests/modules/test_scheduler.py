@@ -1,6 +1,13 @@
 import numpy as np
 
-from opoly.modules.scheduler import LamportCPScheduler
+from opoly.modules.minizinc.utils import scaled_timeout
+from opoly.modules.scheduler import (
+    LamportCPScheduler,
+    LamportEnumerationScheduler,
+    compositions,
+    signed_compositions,
+    batch_data
+)
 
 class TestlamportCPScheduler():
 
@@ -53,4 +60,198 @@ class TestlamportCPScheduler():
         ])
         sched, _ = LamportCPScheduler().schedule(deps)
         assert sched is not None
-        assert sched.tolist() == [2,1,1]
\ No newline at end of file
+        assert sched.tolist() == [2,1,1]
+
+    def test_signed(self):
+        deps = np.array([
+            [0, 1, -2],
+            [1, -5, 0]
+        ])
+        sched, _ = LamportCPScheduler().schedule(deps)
+        assert sched.tolist() == [6, 1, 0]
+        sched, _ = LamportCPScheduler(signed=True).schedule(deps)
+        assert sched.tolist() == [1, 0, -1]
+
+    def test_batch(self):
+        deps_list = [
+            np.array([[1, 0], [0, 1]]),
+            np.array([[1, -1], [1, 1], [0, 1]]),
+            np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]]),
+            np.array([1, 0])
+        ]
+        res = LamportCPScheduler().schedule_batch(deps_list)
+        assert [sched.tolist() if sched is not None else err for sched, err in res] == [
+            [1, 1], [2, 1], [1, 1, 1], "Dependencies must be a matrix!"]
+
+    def test_batch_unsatisfiable(self):
+        res = LamportCPScheduler().schedule_batch([np.array([[1, 0]]), np.array([[1, -1], [-1, 1]])])
+        assert res[0][0].tolist() == [1, 0]
+        assert res[1] == (None, "Unsatisfiable!")
+
+    def test_batch_data(self):
+        data = batch_data([np.array([[1, 0], [0, 1]]), np.array([[1, -1, 2]])])
+        assert data == {
+            "k": 2,
+            "n": [2, 3],
+            "r": [2, 1],
+            "max_n": 3,
+            "max_r": 2,
+            "D": [[[1, 0, 0], [0, 1, 0]], [[1, -1, 2], [0, 0, 0]]],
+            "w": [[1, 1, 1], [1, 1, 1]],
+            "signed": False
+        }
+        data = batch_data([np.array([[1, 0]]), np.array([[1, -1, 2]])], [np.array([10, 1]), None])
+        assert data["w"] == [[10, 1, 1], [1, 1, 1]]
+
+    def test_weighted(self):
+        deps = np.array([
+            [1, -1],
+            [0, 1]
+        ])
+        sched, _ = LamportCPScheduler().schedule(deps, np.array([1, 10]))
+        assert sched is not None
+        assert sched.tolist() == [2, 1]
+        sched, _ = LamportCPScheduler().schedule(deps, np.array([10, 1]))
+        assert sched.tolist() == [2, 1]
+
+
+class CountingScheduler(LamportCPScheduler):
+
+    def __init__(self):
+        self.calls = 0
+        self.batches = []
+
+    def schedule(self, deps: np.ndarray, weights: np.ndarray = None) -> (np.ndarray, str):
+        self.calls += 1
+        return np.ones(deps.shape[1], dtype=int), None
+
+    def schedule_batch(self, deps_list: list[np.ndarray], weights_list: list[np.ndarray] = None) -> list[tuple[np.ndarray, str]]:
+        self.batches.append(len(deps_list))
+        return [self.schedule(deps) for deps in deps_list]
+
+
+class TestLamportEnumerationScheduler():
+
+    def test_examples(self):
+        examples = [
+            ([[1, 0]], [1, 0]),
+            ([[1, 0], [0, 1]], [1, 1]),
+            ([[1, -1], [1, 1], [0, 1]], [2, 1]),
+            ([[1, 0, 0], [0, 1, 0], [0, 0, 1]], [1, 1, 1]),
+            ([[1, 0, 0], [1, -1, 0], [1, 1, 0], [0, 1, 0], [1, 0, -1], [1, 0, 1], [0, 0, 1]], [2, 1, 1])
+        ]
+        fallback = CountingScheduler()
+        scheduler = LamportEnumerationScheduler(fallback=fallback)
+        for deps, expected in examples:
+            sched, err = scheduler.schedule(np.array(deps))
+            assert err is None
+            assert sched.tolist() == expected
+        assert fallback.calls == 0
+
+    def test_lexicographic_ties(self):
+        sched, _ = LamportEnumerationScheduler().schedule(np.array([[1, 1]]))
+        assert sched.tolist() == [0, 1]
+
+    def test_large_coefficients(self):
+        sched, _ = LamportEnumerationScheduler().schedule(np.array([[1, -50], [0, 1]]))
+        assert sched.tolist() == [51, 1]
+
+    def test_weighted(self):
+        scheduler = LamportEnumerationScheduler()
+        sched, _ = scheduler.schedule(np.array([[1, 1]]), np.array([10, 1]))
+        assert sched.tolist() == [0, 1]
+        sched, _ = scheduler.schedule(np.array([[1, 1]]), np.array([1, 10]))
+        assert sched.tolist() == [1, 0]
+        # A higher latency with fewer steps along the largest loop
+        deps = np.array([[1, 1, 0], [0, 1, 1]])
+        assert scheduler.schedule(deps)[0].tolist() == [0, 1, 0]
+        assert scheduler.schedule(deps, np.array([1, 100, 1]))[0].tolist() == [1, 0, 1]
+        # Equal weights are the latency objective
+        deps = np.array([[1, -1], [1, 1], [0, 1]])
+        assert scheduler.schedule(deps, np.array([7, 7]))[0].tolist() == [2, 1]
+
+    def test_weighted_invalid(self):
+        scheduler = LamportEnumerationScheduler()
+        sched, err = scheduler.schedule(np.array([[1, 1]]), np.array([1, 0]))
+        assert sched is None
+        assert err == "Weights must be positive integers, one for each index!"
+        assert scheduler.schedule(np.array([[1, 1]]), np.array([1, 1, 1]))[0] is None
+
+    def test_unsatisfiable(self):
+        sched, err = LamportEnumerationScheduler().schedule(np.array([[1, 0], [-1, 0]]))
+        assert sched is None
+        assert err == "Unsatisfiable!"
+
+    def test_fallback(self):
+        fallback = CountingScheduler()
+        scheduler = LamportEnumerationScheduler(max_candidates=2, fallback=fallback)
+        sched, _ = scheduler.schedule(np.array([[1, -1], [1, 1], [0, 1]]))
+        assert fallback.calls == 1
+        assert sched.tolist() == [1, 1]
+
+    def test_batch_fallback(self):
+        fallback = CountingScheduler()
+        scheduler = LamportEnumerationScheduler(max_candidates=3, fallback=fallback)
+        res = scheduler.schedule_batch([
+            np.array([[1, -1], [1, 1], [0, 1]]),
+            np.array([[1, 0]]),
+            np.array([[1, 0], [-1, 0]]),
+            np.array([[1, -1], [0, 1]])
+        ])
+        assert [sched.tolist() if sched is not None else err for sched, err in res] == [
+            [1, 1], [1, 0], "Unsatisfiable!", [1, 1]]
+        # The dependencies over the candidates limit share one fallback batch
+        assert fallback.batches == [2]
+
+    def test_base_options(self):
+        scheduler = LamportEnumerationScheduler(signed=True)
+        assert scheduler.signed
+        assert scheduler.timeout(4) == scaled_timeout(4)
+
+    def test_candidates(self):
+        scheduler = LamportEnumerationScheduler()
+        deps = np.array([[1, -1], [0, 1]])
+        assert [tau.tolist() for tau in scheduler.candidates(deps)] == [[2, 1]]
+        assert [tau.tolist() for tau in scheduler.candidates(deps, tolerance=2)] == [
+            [2, 1], [3, 1], [3, 2], [4, 1]]
+        assert [tau.tolist() for tau in scheduler.candidates(np.array([[1, 1]]))] == [[0, 1], [1, 0]]
+        assert scheduler.candidates(np.array([[1, 0], [-1, 0]])) == []
+
+    def test_candidates_fallback(self):
+        fallback = CountingScheduler()
+        scheduler = LamportEnumerationScheduler(max_candidates=3, fallback=fallback)
+        candidates = scheduler.candidates(np.array([[1, -1], [1, 1], [0, 1]]))
+        assert [tau.tolist() for tau in candidates] == [[1, 1]]
+        assert fallback.calls == 1
+
+    def test_invalid(self):
+        assert LamportEnumerationScheduler().schedule(np.array([1, 0]))[0] is None
+        assert LamportEnumerationScheduler().schedule(np.array([[1.5, 0]]))[0] is None
+
+    def test_signed(self):
+        deps = np.array([[0, 1, -2], [1, -5, 0]])
+        assert LamportEnumerationScheduler().schedule(deps)[0].tolist() == [6, 1, 0]
+        scheduler = LamportEnumerationScheduler(signed=True)
+        assert scheduler.signed
+        assert scheduler.schedule(deps)[0].tolist() == [1, 0, -1]
+        # Nonnegative schedules are kept when they are as good
+        assert scheduler.schedule(np.array([[1, -1], [1, 1], [0, 1]]))[0].tolist() == [2, 1]
+        assert scheduler.schedule(np.array([[1, 0], [-1, 1]]))[0].tolist() == [1, 2]
+        # Dependencies without positive entries are satisfied by negative coefficients
+        assert scheduler.schedule(np.array([[-1, 0], [-1, -1]]))[0].tolist() == [-1, 0]
+        sched, err = scheduler.schedule(np.array([[0, 0], [1, 1]]))
+        assert sched is None
+        assert err == "Unsatisfiable!"
+        assert [tau.tolist() for tau in scheduler.candidates(np.array([[1, -1]]))] == [[1, 0], [0, -1]]
+
+    def test_compositions(self):
+        assert compositions(2, 3).tolist() == [
+            [0, 0, 2], [0, 1, 1], [0, 2, 0], [1, 0, 1], [1, 1, 0], [2, 0, 0]]
+        assert compositions(3, 1).tolist() == [[3]]
+        assert compositions(0, 2).tolist() == [[0, 0]]
+
+    def test_signed_compositions(self):
+        assert signed_compositions(1, 2).tolist() == [[0, 1], [1, 0], [0, -1], [-1, 0]]
+        assert signed_compositions(2, 2).tolist() == [
+            [0, 2], [1, 1], [2, 0], [0, -2], [1, -1], [-1, 1], [-2, 0], [-1, -1]]
+        assert signed_compositions(0, 3).tolist() == [[0, 0, 0]]
@@ -0,0 +1,90 @@
+import io
+
+from opoly.modules.splicer import find_pragma_regions, map_file, splice_regions, line_marker
+
+SOURCE = (b"int main() {\n"
+          b"    int x = 0;\n"
+          b"    #pragma omp parallel poly\n"
+          b"    FOR i FROM 0 TO N { STM a[i]=a[i+1]; }\n"
+          b"    #pragma end\n"
+          b"    x++;\n"
+          b"#pragma   omp  parallel\tpoly FOR j FROM 0 TO M { STM b[j]=b[j+1]; } #pragma end\n"
+          b"}\n")
+
+
+class TestFindPragmaRegions():
+
+    def test_regions(self):
+        regions = list(find_pragma_regions(SOURCE))
+        assert len(regions) == 2
+        assert regions[0].code.strip() == "FOR i FROM 0 TO N { STM a[i]=a[i+1]; }"
+        assert regions[1].code.strip() == "FOR j FROM 0 TO M { STM b[j]=b[j+1]; }"
+
+    def test_lines(self):
+        regions = list(find_pragma_regions(SOURCE))
+        assert (regions[0].line, regions[0].end_line) == (3, 5)
+        assert (regions[1].line, regions[1].end_line) == (7, 7)
+
+    def test_indentation(self):
+        regions = list(find_pragma_regions(SOURCE))
+        assert regions[0].indentation == "    "
+        assert regions[1].indentation == ""
+
+    def test_no_regions(self):
+        assert list(find_pragma_regions(b"int main() {}\n#pragma once\n")) == []
+
+    def test_unterminated_region(self):
+        assert list(find_pragma_regions(b"#pragma omp parallel poly\nFOR i FROM 0 TO N {}\n")) == []
+
+
+class TestSpliceRegions():
+
+    def test_splice(self):
+        regions = list(find_pragma_regions(SOURCE))
+        output = io.BytesIO()
+        splice_regions(SOURCE, output, regions, ["A;\nB;", "C;"])
+        assert output.getvalue() == (b"int main() {\n"
+                                     b"    int x = 0;\n"
+                                     b"    A;\n"
+                                     b"    B;\n"
+                                     b"    x++;\n"
+                                     b"C;\n"
+                                     b"}\n")
+
+    def test_splice_line_markers(self):
+        regions = list(find_pragma_regions(SOURCE))
+        output = io.BytesIO()
+        splice_regions(SOURCE, output, regions, ["A;\nB;", "C;"], "main.c")
+        lines = output.getvalue().decode("utf-8").split("\n")
+        assert lines[2] == '    #line 3 "main.c"'
+        assert lines[3:5] == ["    A;", "    B;"]
+        # Both markers are indented like the pragma they replace
+        assert lines[5] == '    #line 5 "main.c"'
+        # The line after a marker must be the line it names
+        assert lines[7] == "    x++;"
+        assert lines[8:12] == ['#line 7 "main.c"', "C;", '#line 7 "main.c"', ""]
+
+    def test_unchanged_without_regions(self):
+        output = io.BytesIO()
+        splice_regions(b"int x;\n", output, [], [])
+        assert output.getvalue() == b"int x;\n"
+
+    def test_line_marker_escaping(self):
+        assert line_marker(1, 'a"b\\c.c') == '#line 1 "a\\"b\\\\c.c"'
+
+
+class TestMapFile():
+
+    def test_map_file(self, tmp_path):
+        path = tmp_path / "main.c"
+        path.write_bytes(SOURCE)
+        with open(path, "rb") as file, map_file(file) as buffer:
+            assert len(list(find_pragma_regions(buffer))) == 2
+            assert buffer[:len(SOURCE)] == SOURCE
+
+    def test_map_empty_file(self, tmp_path):
+        path = tmp_path / "empty.c"
+        path.write_bytes(b"")
+        with open(path, "rb") as file, map_file(file) as buffer:
+            assert len(buffer) == 0
+            assert list(find_pragma_regions(buffer)) == []
@@ -0,0 +1,82 @@
+import pytest
+
+from opoly.modules.unimodular import (
+    vector_gcd,
+    integer_determinant,
+    integer_inverse,
+    two_support_solutions,
+    unimodular_completion
+)
+
+
+class TestIntegerMatrices():
+
+    def test_gcd(self):
+        assert vector_gcd([6, 10, 15]) == 1
+        assert vector_gcd([4, 6]) == 2
+        assert vector_gcd([0, 0]) == 0
+
+    def test_determinant(self):
+        assert integer_determinant([[2, 1], [1, 0]]) == -1
+        assert integer_determinant([[0, 1, 0], [1, 0, 0], [0, 0, 1]]) == -1
+        assert integer_determinant([[1, 2], [2, 4]]) == 0
+        assert integer_determinant([[2, 0, 1], [1, 3, 2], [1, 1, 2]]) == 6
+
+    def test_inverse(self):
+        assert integer_inverse([[2, 1], [1, 0]]) == [[0, 1], [1, -2]]
+        assert integer_inverse([[2, 1, 1], [1, 0, 0], [0, 0, 1]]) == [[0, 1, 0], [1, -2, -1], [0, 0, 1]]
+
+    def test_inverse_large(self):
+        # Far beyond the precision of a float inverse
+        big = 10 ** 20
+        assert integer_inverse([[1, big], [0, 1]]) == [[1, -big], [0, 1]]
+
+    def test_inverse_singular(self):
+        with pytest.raises(ValueError):
+            integer_inverse([[1, 2], [2, 4]])
+        with pytest.raises(ValueError):
+            integer_inverse([[2, 0], [0, 1]])
+
+
+class TestUnimodularCompletion():
+
+    def test_two_support_solutions(self):
+        for a, b in [(3, 2), (2, 3), (1, 1), (5, 0), (1, 0), (7, -3)]:
+            for x, y in two_support_solutions(a, b):
+                assert x >= 0 and y >= 0
+                assert abs(a * y - b * x) == 1
+        assert (1, 1) in two_support_solutions(3, 2)
+        assert two_support_solutions(5, 0) == []
+
+    def test_completion(self):
+        for tau in [[1], [1, 0], [5, 3], [2, 3, 5], [4, 1, 6, 9], [3, 5, 7, 11, 13, 17]]:
+            res = unimodular_completion(tau)
+            assert res[0] == tau
+            assert all(v >= 0 for row in res[1:] for v in row)
+            assert abs(integer_determinant(res)) == 1
+
+    def test_signed_completion(self):
+        # Negative schedules only need signed rows when no nonnegative one fits
+        assert unimodular_completion([2, -1]) == [[2, -1], [1, 0]]
+        assert unimodular_completion([1, 0, -1]) == [[1, 0, -1], [0, 1, 0], [0, 0, 1]]
+        assert two_support_solutions(-2, 3) == []
+        for tau in [[-2, 3], [3, -5, 7], [-4, -9]]:
+            res = unimodular_completion(tau)
+            assert res[0] == tau
+            assert abs(integer_determinant(res)) == 1
+        for x, y in two_support_solutions(-2, 3, signed=True):
+            assert abs(-2 * y - 3 * x) == 1
+
+    def test_gcd_completion(self):
+        # Coprime entries without any coprime pair
+        for tau in [[6, 10, 15], [6, 0, 10, 15], [30, 42, 70, 105], [-6, 10, 15]]:
+            res = unimodular_completion(tau)
+            assert res[0] == tau
+            assert abs(integer_determinant(res)) == 1
+            if all(v >= 0 for v in tau):
+                assert all(v >= 0 for row in res[1:] for v in row)
+
+    def test_no_completion(self):
+        assert unimodular_completion([2]) is None
+        assert unimodular_completion([4, 6]) is None
+        assert unimodular_completion([6, 10, 14]) is None
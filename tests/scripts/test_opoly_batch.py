@@ -0,0 +1,146 @@
+import io
+import json
+import threading
+
+from opoly.modules.compiler import Compiler
+from opoly.modules.parser import parse_assumption_statement
+import opoly.scripts.opoly_batch as opoly_batch_module
+from opoly.scripts.opoly_batch import MAX_PENDING_PER_WORKER, BatchWriter, compile_record, opoly_batch
+
+
+def batch_input(n):
+    return "".join(
+        json.dumps({"id": i, "pseudocode": f"FOR i FROM 0 TO N{chr(97 + i)} {{ STM a[i]=b[i]; }}"}) + "\n"
+        for i in range(n))
+
+
+class TestCompileRecord():
+
+    def test_compile(self):
+        result = compile_record(json.dumps(
+            {"id": "loop", "pseudocode": "FOR i FROM 0 TO N { STM a[i]=b[i+1]; }", "format": "PSEUDO"}))
+        assert result["id"] == "loop"
+        assert result["error"] is None
+        assert result["code"] == """FOR i FROM 0 TO N STEP 1 {
+    STM a[i] = b[i + 1];
+}"""
+        assert any(d["level"] == "WARNING" for d in result["diagnostics"])
+
+    def test_compile_error(self):
+        result = compile_record(json.dumps({"id": 3, "pseudocode": "FOR i { }"}))
+        assert result["id"] == 3
+        assert result["error"].startswith("Error while parsing code")
+
+    def test_malformed(self):
+        assert compile_record("{not json")["error"].startswith("Malformed record")
+        assert compile_record("[1, 2]")["error"].startswith("Malformed record")
+
+    def test_missing_pseudocode(self):
+        assert compile_record('{"id": 1}')["error"] == "Missing pseudocode in record"
+
+    def test_compiler(self):
+        assumption, _ = parse_assumption_statement("N >= i")
+        result = compile_record(json.dumps({"id": 1, "pseudocode": "FOR i FROM 0 TO N { STM a[i]=b[i]; }"}),
+                                compiler=Compiler(assumptions=[assumption]))
+        assert result["error"].endswith("Assumption (N >= i) is on the loop index i!")
+
+    def test_unknown_format(self):
+        result = compile_record('{"id": 1, "pseudocode": "", "format": "FORTRAN"}')
+        assert result["error"] == "Unknown format: FORTRAN"
+
+
+class TestBatchWriter():
+
+    def test_ordered(self):
+        output = io.StringIO()
+        writer = BatchWriter(output, ordered=True)
+        writer.write(1, {"id": 1})
+        assert output.getvalue() == ""
+        writer.write(0, {"id": 0})
+        writer.write(2, {"id": 2})
+        assert [json.loads(line)["id"] for line in output.getvalue().splitlines()] == [0, 1, 2]
+
+    def test_unordered(self):
+        output = io.StringIO()
+        writer = BatchWriter(output, ordered=False)
+        writer.write(1, {"id": 1})
+        writer.write(0, {"id": 0})
+        assert [json.loads(line)["id"] for line in output.getvalue().splitlines()] == [1, 0]
+
+
+class TestOpolyBatch():
+
+    def test_ordered(self):
+        output = io.StringIO()
+        assert opoly_batch(io.StringIO(batch_input(10)), output, workers=4) == 10
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [r["id"] for r in results] == list(range(10))
+        for i, result in enumerate(results):
+            assert result["error"] is None
+            assert f"i <= N{chr(97 + i)};" in result["code"]
+
+    def test_unordered(self):
+        output = io.StringIO()
+        assert opoly_batch(io.StringIO(batch_input(10)), output, workers=4, ordered=False) == 10
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert sorted(r["id"] for r in results) == list(range(10))
+
+    def test_options(self):
+        assumption, _ = parse_assumption_statement("N >= i")
+        output = io.StringIO()
+        assert opoly_batch(io.StringIO(batch_input(2)), output, options={"assumptions": [assumption]}) == 2
+        for line in output.getvalue().splitlines():
+            assert json.loads(line)["error"].endswith("is on the loop index i!")
+
+    def test_skip_blank_lines(self):
+        output = io.StringIO()
+        assert opoly_batch(io.StringIO("\n" + batch_input(2) + "\n\n"), output) == 2
+        assert len(output.getvalue().splitlines()) == 2
+
+    def test_streaming(self):
+        # The first result is written before the input is over
+        output_ready = threading.Event()
+
+        class Output(io.StringIO):
+            def flush(self):
+                output_ready.set()
+
+        class Input():
+            def __iter__(self):
+                yield batch_input(1)
+                assert output_ready.wait(timeout=10)
+                yield from batch_input(2).splitlines(keepends=True)[1:]
+
+        output = Output()
+        assert opoly_batch(Input(), output, workers=2) == 2
+        assert len(output.getvalue().splitlines()) == 2
+
+    def test_bounded_pending(self, monkeypatch):
+        # While the first record is compiling, the later ones that completed
+        # hold their slot until they are written
+        release_first = threading.Event()
+        compile_record = opoly_batch_module.compile_record
+
+        def stalled_compile_record(line, cache=None, compiler=None):
+            if json.loads(line)["id"] == 0:
+                assert release_first.wait(timeout=10)
+            return compile_record(line, cache, compiler)
+
+        monkeypatch.setattr(opoly_batch_module, "compile_record", stalled_compile_record)
+        read = []
+
+        class Input():
+            def __iter__(self):
+                for line in batch_input(20).splitlines(keepends=True):
+                    read.append(line)
+                    yield line
+
+        output = io.StringIO()
+        thread = threading.Thread(target=opoly_batch, args=(Input(), output, 2))
+        thread.start()
+        threading.Event().wait(1)
+        # The reader blocks on the record after the last free slot
+        assert len(read) == 2 * MAX_PENDING_PER_WORKER + 1
+        release_first.set()
+        thread.join(timeout=10)
+        assert [json.loads(line)["id"] for line in output.getvalue().splitlines()] == list(range(20))
@@ -0,0 +1,189 @@
+import pytest
+
+import opoly.scripts.opoly_compile as opoly_compile_module
+from opoly.modules.memo import LRUMemo
+from opoly.scripts.opoly import make_compiler, default_compiler, DEFAULT_PORTFOLIO_STATE
+from opoly.scripts.opoly_compile import (
+    opoly_compile,
+    opoly_watch,
+    main,
+    collect_source_files,
+    compile_source_files,
+    scan_source_files,
+    RegionCompiler,
+    init_region_compiler,
+    region_compiler,
+    compile_region,
+    output_path
+)
+
+SOURCE = ("int main() {\n"
+          "    #pragma omp parallel poly\n"
+          "    FOR i FROM 0 TO N { STM a[i]=b[i+1]; }\n"
+          "    #pragma end\n"
+          "#pragma omp parallel poly\n"
+          "FOR k FROM 0 TO M { STM c[k]=1; }\n"
+          "#pragma end\n"
+          "}\n")
+BAD_REGION = ("#pragma omp parallel poly\n"
+              "FOR i FROM 0 TO N { STM a[i]=; }\n"
+              "#pragma end\n")
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for path in ["a.c", "b.c", "sub/c.c"]:
+        (tmp_path / path).write_text(SOURCE)
+    (tmp_path / "notes.txt").write_text(SOURCE)
+    return tmp_path
+
+
+class TestCollectSourceFiles():
+
+    def test_directory(self, source_tree):
+        files = collect_source_files([source_tree])
+        assert files == [source_tree / "a.c", source_tree / "b.c", source_tree / "sub" / "c.c"]
+
+    def test_skip_outputs(self, source_tree):
+        (source_tree / "omp-a.c").write_text("")
+        assert source_tree / "omp-a.c" not in collect_source_files([source_tree])
+
+    def test_files(self, source_tree):
+        files = collect_source_files([source_tree / "notes.txt", source_tree / "sub"])
+        assert files == [source_tree / "notes.txt", source_tree / "sub" / "c.c"]
+
+
+class TestOpolyCompile():
+
+    def test_directory(self, source_tree):
+        assert opoly_compile([source_tree], line_markers=False)
+        for path in ["a.c", "b.c", "sub/c.c"]:
+            output = output_path(source_tree / path).read_text()
+            assert "#pragma" not in output
+            assert "for(int i = 0; i <= N; i++) {" in output
+        assert not output_path(source_tree / "notes.txt").exists()
+
+    def test_parallel_same_output(self, source_tree):
+        assert opoly_compile([source_tree])
+        serial = {p: output_path(source_tree / p).read_text() for p in ["a.c", "b.c", "sub/c.c"]}
+        assert opoly_compile([source_tree], jobs=3)
+        for path, output in serial.items():
+            assert output_path(source_tree / path).read_text() == output
+
+    def test_error_isolated(self, source_tree):
+        input_file = source_tree / "a.c"
+        input_file.write_text(BAD_REGION + input_file.read_text())
+        assert not opoly_compile([source_tree], jobs=2, line_markers=False)
+        output = output_path(input_file).read_text()
+        assert output.startswith(BAD_REGION)
+        assert output.count("#pragma") == 2
+        assert "for(int i = 0; i <= N; i++) {" in output
+        assert "#pragma" not in output_path(source_tree / "b.c").read_text()
+
+    def test_output_file(self, source_tree, tmp_path_factory):
+        output_file = tmp_path_factory.mktemp("out") / "out.c"
+        assert opoly_compile(source_tree / "a.c", output_file)
+        assert "for(int i = 0; i <= N; i++) {" in output_file.read_text()
+        assert not output_path(source_tree / "a.c").exists()
+
+    def test_output_file_many_inputs(self, source_tree, tmp_path_factory):
+        output_file = tmp_path_factory.mktemp("out") / "out.c"
+        assert not opoly_compile([source_tree / "a.c", source_tree / "b.c"], output_file)
+        assert not output_file.exists()
+
+    def test_exit_status(self, source_tree):
+        with pytest.raises(SystemExit) as ex:
+            main([str(source_tree)])
+        assert ex.value.code == 0
+        (source_tree / "a.c").write_text(BAD_REGION)
+        with pytest.raises(SystemExit) as ex:
+            main([str(source_tree)])
+        assert ex.value.code == 1
+
+    def test_compiler_per_worker(self):
+        init_region_compiler(None, 1024, False, split_index_sets=True)
+        compiler = region_compiler().compiler
+        assert compiler.split_index_sets
+        code, err, _ = compile_region(("FOR i FROM 0 TO N { STM a[i]=b[i]; }", "PSEUDO", "a.c:1", None))
+        assert err is None
+        assert region_compiler().compiler is compiler
+        init_region_compiler(None, 1024, False)
+
+    def test_portfolio(self, tmp_path):
+        state_file = tmp_path / "state" / "portfolio.json"
+        init_region_compiler(None, 1024, False, portfolio=state_file)
+        compiler = region_compiler().compiler
+        assert compiler.portfolio is not None
+        assert state_file.parent.is_dir()
+        # The compilers racing the same portfolio share their solvers
+        assert make_compiler(portfolio=state_file) is compiler
+        assert default_compiler() is not compiler
+        assert default_compiler().portfolio is None
+        init_region_compiler(None, 1024, False)
+
+    def test_portfolio_option(self, source_tree, monkeypatch):
+        calls = []
+        monkeypatch.setattr(opoly_compile_module, "opoly_compile", lambda *args: calls.append(args) or True)
+        for argv in [[], ["--portfolio"], ["--portfolio", str(source_tree / "portfolio.json")]]:
+            with pytest.raises(SystemExit):
+                main([str(source_tree)] + argv)
+        assert [args[-1] for args in calls] == [None, DEFAULT_PORTFOLIO_STATE, source_tree / "portfolio.json"]
+
+
+class TestTimeBudget():
+
+    def test_shared_by_file(self):
+        region_compiler = RegionCompiler(None)
+        budget = region_compiler.budget((1, "a.c", 2.0))
+        budget.spend(0.5)
+        assert region_compiler.budget((1, "a.c", 2.0)) is budget
+        assert region_compiler.budget((1, "b.c", 2.0)).remaining == 2.0
+        # Every run starts with full budgets
+        assert region_compiler.budget((2, "a.c", 2.0)).remaining == 2.0
+
+    def test_loops_without_dependencies(self, source_tree):
+        assert opoly_compile([source_tree], time_budget=0, line_markers=False)
+        assert "for(int i = 0; i <= N; i++) {" in output_path(source_tree / "a.c").read_text()
+
+
+class TestIncrementalCompile():
+
+    def test_unchanged_regions_reused(self, source_tree):
+        memo = LRUMemo()
+        input_file = source_tree / "a.c"
+        output_file = source_tree / "out.c"
+        assert compile_source_files(scan_source_files([input_file]), output_file=output_file, memo=memo)
+        assert (memo.hits, len(memo)) == (0, 2)
+        input_file.write_text(input_file.read_text().replace("c[k]=1", "c[k]=2"))
+        assert compile_source_files(scan_source_files([input_file]), output_file=output_file, memo=memo)
+        assert (memo.hits, len(memo)) == (1, 3)
+        assert "c[k] = 2;" in output_file.read_text()
+
+    def test_failed_regions_not_reused(self, source_tree):
+        memo = LRUMemo()
+        input_file = source_tree / "a.c"
+        input_file.write_text(BAD_REGION)
+        assert not compile_source_files(scan_source_files([input_file]), memo=memo, single_file=False)
+        assert len(memo) == 0
+
+    def test_changed_while_compiling(self, source_tree):
+        input_file = source_tree / "a.c"
+        output_file = source_tree / "out.c"
+        file_regions = scan_source_files([input_file])
+        # The regions offsets do not hold for the new contents
+        input_file.write_text("/* edited */\n" + SOURCE)
+        assert not compile_source_files(file_regions, output_file=output_file, line_markers=False)
+        assert not output_file.exists()
+        assert compile_source_files(scan_source_files([input_file]), output_file=output_file, line_markers=False)
+        assert output_file.read_text().startswith("/* edited */\nint main() {\n    for(int i = 0; i <= N; i++) {")
+
+    def test_watch(self, source_tree):
+        opoly_watch([source_tree], interval=0, max_polls=2)
+        for path in ["a.c", "b.c", "sub/c.c"]:
+            assert "#pragma" not in output_path(source_tree / path).read_text()
+
+    def test_watch_same_output_file(self, source_tree):
+        input_file = source_tree / "a.c"
+        opoly_watch(input_file, input_file, interval=0, max_polls=1)
+        assert "#pragma" in input_file.read_text()
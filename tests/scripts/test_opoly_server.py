@@ -0,0 +1,138 @@
+import logging
+import os
+import socket
+import threading
+
+import pytest
+
+import opoly.scripts.opoly_server as opoly_server_module
+from opoly.modules.cache import CompilationCache
+from opoly.scripts.opoly_server import (
+    CompileServer,
+    request_compile,
+    send_request,
+    ping_server,
+    stop_server,
+    main
+)
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = tmp_path / "opoly.sock"
+    server = CompileServer(socket_path, workers=2, idle_timeout=0)
+    ready = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, args=(ready,))
+    thread.start()
+    ready.wait(timeout=10)
+    yield server
+    server.shutdown()
+    thread.join(timeout=10)
+
+
+class TestCompileServer():
+
+    def test_ping(self, server):
+        assert ping_server(server.socket_path)
+
+    def test_compile(self, server):
+        response = request_compile(
+            "FOR i FROM 0 TO N { STM a[i]=b[i+1]; }", "PSEUDO", server.socket_path)
+        assert response["error"] is None
+        assert response["code"] == """FOR i FROM 0 TO N STEP 1 {
+    STM a[i] = b[i + 1];
+}"""
+        assert response["dependencies"] == []
+        assert any(d["level"] == "WARNING" for d in response["diagnostics"])
+
+    def test_compile_error(self, server):
+        response = request_compile("FOR i { }", "CCODE", server.socket_path)
+        assert response["error"].startswith("Error while parsing code")
+
+    def test_concurrent_requests(self, server):
+        responses = [None] * 8
+
+        def compile_request(i):
+            responses[i] = request_compile(
+                f"FOR i FROM 0 TO N{chr(97 + i)} {{ STM a[i]=b[i]; }}", "CCODE", server.socket_path)
+
+        threads = [threading.Thread(target=compile_request, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i, response in enumerate(responses):
+            assert response["error"] is None
+            assert f"i <= N{chr(97 + i)};" in response["code"]
+
+    def test_client_cache(self, server, tmp_path):
+        cache = CompilationCache(tmp_path / "cache")
+        code = "FOR i FROM 0 TO N { STM a[i]=b[i+1]; }"
+        response = request_compile(code, "PSEUDO", server.socket_path, cache=cache)
+        assert response["error"] is None
+        assert len(list(cache.directory.iterdir())) == 1
+        assert request_compile(code, "PSEUDO", server.socket_path, cache=cache)["code"] == response["code"]
+
+    def test_verbose_diagnostics(self, server, monkeypatch):
+        # The level of the diagnostics is the client one, not the server one
+        logger = logging.getLogger("logger_opoly")
+        monkeypatch.setattr(logger, "level", logger.level)
+        logger.setLevel(logging.DEBUG)
+        code = "FOR i FROM 0 TO N { STM a[i]=b[i+1]; }"
+        levels = {d["level"] for d in request_compile(code, "PSEUDO", server.socket_path)["diagnostics"]}
+        assert "DEBUG" not in levels
+        levels = {d["level"] for d in request_compile(
+            code, "PSEUDO", server.socket_path, verbose=True)["diagnostics"]}
+        assert "DEBUG" in levels
+
+    def test_socket_permissions(self, server):
+        assert os.stat(server.socket_path).st_mode & 0o077 == 0
+
+    def test_unknown_command(self, server):
+        response = send_request({"command": "foo"}, server.socket_path)
+        assert response["error"] == "Unknown command: foo"
+
+    def test_stop(self, server):
+        assert stop_server(server.socket_path)
+        for _ in range(50):
+            if not server.socket_path.exists():
+                break
+            threading.Event().wait(0.1)
+        assert not server.socket_path.exists()
+
+
+class TestMain():
+
+    def test_cache_size(self, tmp_path, monkeypatch):
+        calls = []
+        monkeypatch.setattr(opoly_server_module, "opoly_serve", lambda *args: calls.append(args))
+        main(["--cache", str(tmp_path), "--cache-size", "8"])
+        assert calls[0][-2:] == (tmp_path, 8 * 1024 * 1024)
+
+
+class TestClient():
+
+    def test_no_server(self, tmp_path):
+        assert request_compile("FOR i FROM 0 TO N { STM a[i]=b[i]; }",
+                               socket_path=tmp_path / "missing.sock") is None
+        assert not ping_server(tmp_path / "missing.sock")
+
+    def test_untrusted_socket(self, tmp_path):
+        socket_path = tmp_path / "opoly.sock"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(str(socket_path))
+            sock.listen()
+            os.chmod(socket_path, 0o666)
+            assert not ping_server(socket_path)
+            os.chmod(socket_path, 0o600)
+            os.chmod(tmp_path, 0o777)
+            assert not ping_server(socket_path)
+
+    def test_timeout(self, tmp_path):
+        socket_path = tmp_path / "opoly.sock"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(str(socket_path))
+            sock.listen()
+            # The listener never answers, the client gives up
+            assert request_compile("FOR i FROM 0 TO N { STM a[i]=b[i]; }",
+                                   socket_path=socket_path, timeout=0.2) is None
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ("numpy", "sympy", "pymzn")
+
+
+def imported_heavy_modules(code: str) -> list[str]:
+    run_res = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys\nprint(' '.join(m for m in "
+         f"{HEAVY_MODULES!r} if m in sys.modules))"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return run_res.stdout.split()
+
+
+class TestStartup():
+
+    def test_cli_import(self):
+        assert imported_heavy_modules("import opoly.scripts.opoly") == []
+
+    def test_compile_import(self):
+        assert imported_heavy_modules("import opoly.scripts.opoly_compile") == []
+
+    def test_no_dependencies_loop(self):
+        code = ("from opoly.scripts.opoly import compile_loop\n"
+                "compile_loop('FOR i FROM 0 TO N { STM a[i]=b[i+1]; }')")
+        assert imported_heavy_modules(code) == []
+
+    def test_solver_models_found(self):
+        run_res = subprocess.run(
+            [sys.executable, "-c", "import os, opoly.modules.minizinc as m\n"
+             "print(all(os.path.isfile(p) for p in (m.LAMPORT_SCHEDULER_PATH, m.LAMPORT_ALLOCATOR_PATH, m.LAMPORT_ALLOCATOR_INVERSE_PATH)))"],
+            stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        assert run_res.stdout.strip() == "True"
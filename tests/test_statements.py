@@ -12,6 +12,7 @@ from opoly.statements import (
     StatementType,
     AssignmentStatement,
     DeclarationStatement,
+    AssumptionStatement,
     ForLoopStatement,
     divide_assignments,
     prune_expressions
@@ -175,6 +176,22 @@ class TestDeclarationStatement():
         assert stmt.stype == StatementType.DECLARATION
         assert str(stmt) == "int i = j - 2"
 
+
+class TestAssumptionStatement():
+
+    def test_assumption(self):
+        stmt = AssumptionStatement(
+            left_term=Expression([VariableExpression("n"), ConstantExpression(1)], ["-"]),
+            relation=">=",
+            right_term=VariableExpression("m")
+        )
+        assert stmt.stype == StatementType.ASSUMPTION
+        assert str(stmt) == "n - 1 >= m"
+
+    def test_unknown_relation(self):
+        with pytest.raises(ValueError):
+            AssumptionStatement(VariableExpression("n"), ">", ConstantExpression(3))
+
 class TestForLoopStatement():
 
     def test_plain_loop(self):